@@ -0,0 +1,84 @@
+"""
+Cold-start import time of the `src` modules.
+Imports each module in a fresh interpreter and reports the median wall time
+and which heavy third-party packages the import pulled in.
+
+Run from the repository root:
+    python -m benchmarks.bench_import --repeat 5
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+# Statements timed in a fresh interpreter, from cheapest to most expensive
+TARGETS = {
+    "config": "import src.config",
+    "normalize_text (SMT)": "from src.preprocessing_smt import normalize_text",
+    "normalize_text (NMT)": "from src.preprocessing_nmt import normalize_text",
+    "vocab": "import src.vocab",
+    "pipeline": "import src.pipeline",
+    "inference": "import src.inference",
+    "deferred SMT dependencies": "import gensim.models, nltk, sklearn.cluster",
+}
+HEAVY_PACKAGES = ("numpy", "pandas", "nltk", "gensim", "sklearn", "torch", "sacrebleu")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+
+def time_import(statement: str, repeat: int) -> dict:
+    """Median import time of `statement` over `repeat` fresh interpreters."""
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                PROBE.format(statement=statement, heavy=HEAVY_PACKAGES),
+            ],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return {
+        "seconds": statistics.median(r["seconds"] for r in runs),
+        "heavy": runs[-1]["heavy"],
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", default=None, help="Also write results to a file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, statement in TARGETS.items():
+        try:
+            results[name] = time_import(statement, args.repeat)
+        except subprocess.CalledProcessError as e:
+            print(f"[Bench] {name}: failed ({e.stderr.strip().splitlines()[-1]})")
+            continue
+        heavy = ", ".join(results[name]["heavy"]) or "-"
+        print(f"[Bench] {name:<24} {results[name]['seconds'] * 1000:8.1f} ms  {heavy}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Training-step throughput of the Seq2Seq model on CPU.
+Compares `src.model.Seq2Seq` against the notebook's original forward pass
+(repeated attention projection, unmasked, outputs concatenated at the end).
+
+Run from the repository root:
+    python -m benchmarks.bench_seq2seq --batch-size 64 --src-len 30 --tgt-len 30
+"""
+
+import argparse
+import time
+
+import torch
+import torch.nn as nn
+
+from src.model import Seq2Seq, build_model
+from src.vocab import PAD_ID, SOS_ID
+
+# ============================================================
+# Reference implementation
+# ============================================================
+
+
+class ReferenceSeq2Seq(Seq2Seq):
+    """The original notebook forward pass, on the same parameters."""
+
+    def forward(self, src, tgt):
+        encoder_outputs, hidden = self.encoder(src)
+        attention = self.decoder.attention
+        outputs = []
+        for t in range(tgt.size(1) - 1):
+            query = hidden[-1].unsqueeze(1).repeat(1, encoder_outputs.size(1), 1)
+            energy = torch.tanh(
+                attention.attn(torch.cat((query, encoder_outputs), dim=2))
+            )
+            attn = torch.softmax(attention.v(energy).squeeze(2), dim=1).unsqueeze(1)
+            output, hidden = self._step(tgt[:, t], hidden, encoder_outputs, attn)
+            outputs.append(output.unsqueeze(1))
+        return torch.cat(outputs, dim=1)
+
+    def _step(self, input_tok, hidden, encoder_outputs, attn):
+        dec = self.decoder
+        embedded = dec.dropout(dec.embedding(input_tok.unsqueeze(1)))
+        context = attn.bmm(encoder_outputs)
+        output, hidden = dec.rnn(torch.cat((embedded, context), dim=2), hidden)
+        prediction = dec.fc_out(
+            torch.cat((output, context, embedded), dim=2).squeeze(1)
+        )
+        return prediction, hidden
+
+
+# ============================================================
+# Benchmark
+# ============================================================
+
+
+def random_batch(
+    batch_size: int, src_len: int, tgt_len: int, vocab_size: int, padded: bool
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """Random id batch; with `padded`, sources get lengths down to half `src_len`."""
+    src = torch.randint(4, vocab_size, (batch_size, src_len))
+    tgt = torch.randint(4, vocab_size, (batch_size, tgt_len))
+    src[:, 0] = tgt[:, 0] = SOS_ID
+    if padded:
+        lengths = torch.randint(src_len // 2, src_len + 1, (batch_size,))
+        lengths[0] = src_len
+        src[torch.arange(src_len) >= lengths.unsqueeze(1)] = PAD_ID
+    return src, tgt
+
+
+def steps_per_second(
+    model: nn.Module, src: torch.Tensor, tgt: torch.Tensor, steps: int
+) -> float:
+    """Time full training steps (forward, loss, backward, Adam update)."""
+    optimizer = torch.optim.Adam(model.parameters())
+    criterion = nn.CrossEntropyLoss(ignore_index=PAD_ID)
+    model.train()
+
+    def step():
+        optimizer.zero_grad()
+        output = model(src, tgt)
+        loss = criterion(output.reshape(-1, output.size(-1)), tgt[:, 1:].reshape(-1))
+        loss.backward()
+        optimizer.step()
+
+    step()  # warm-up
+    start = time.perf_counter()
+    for _ in range(steps):
+        step()
+    return steps / (time.perf_counter() - start)
+
+
+def max_difference(model: Seq2Seq, reference: Seq2Seq, src, tgt) -> float:
+    """Largest absolute logit difference between the two forward passes."""
+    model.eval()
+    reference.eval()
+    with torch.no_grad():
+        return (model(src, tgt) - reference(src, tgt)).abs().max().item()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--src-len", type=int, default=30)
+    parser.add_argument("--tgt-len", type=int, default=30)
+    parser.add_argument("--vocab-size", type=int, default=15000)
+    parser.add_argument("--steps", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=None, help="Torch CPU threads")
+    args = parser.parse_args(argv)
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    torch.manual_seed(0)
+    device = torch.device("cpu")
+    model = build_model(args.vocab_size, args.vocab_size, device)
+    reference = ReferenceSeq2Seq(model.encoder, model.decoder, device)
+
+    src, tgt = random_batch(
+        args.batch_size, args.src_len, args.tgt_len, args.vocab_size, padded=False
+    )
+    print(
+        f"[Bench] Max logit difference on an unpadded batch: "
+        f"{max_difference(model, reference, src, tgt):.2e}"
+    )
+
+    for padded in (False, True):
+        src, tgt = random_batch(
+            args.batch_size, args.src_len, args.tgt_len, args.vocab_size, padded
+        )
+        label = "padded" if padded else "unpadded"
+        base = steps_per_second(reference, src, tgt, args.steps)
+        fast = steps_per_second(model, src, tgt, args.steps)
+        print(
+            f"[Bench] {label} batch {args.batch_size}x{args.src_len}->{args.tgt_len}: "
+            f"reference {base:.2f} steps/s, optimized {fast:.2f} steps/s "
+            f"({fast / base:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
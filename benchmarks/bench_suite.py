@@ -0,0 +1,538 @@
+"""
+End-to-end benchmark suite on synthetic parallel corpora (CPU only, offline).
+Times every data-path component at several corpus sizes, reports throughput
+and memory scaling, saves the results as JSON, and compares two runs.
+
+Run from the repository root:
+    python -m benchmarks.bench_suite run --sizes 10000 100000 1000000 --output new.json
+    python -m benchmarks.bench_suite compare old.json new.json --threshold 0.1
+"""
+
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from benchmarks.synthetic import write_corpus
+from src.instrumentation import peak_rss_mb, reset_peak_rss, rss_mb
+
+DEFAULT_SIZES = [10_000, 100_000]
+AUX_RATIO = 0.25  # auxiliary (mixing) corpus size relative to the base corpus
+REPEAT = 3  # timed runs per component and size; the fastest is reported
+DECODE_SENTENCES = 256  # decoding is timed on a fixed-size subset
+DECODE_VOCAB_SENTENCES = 100_000  # sentences the decoding vocabularies are built from
+MEMORY_NOISE_MB = 32.0  # memory changes below this are never regressions
+
+# Returned by a component's setup: the timed callable (which may return a
+# token count known only afterwards), the number of rows, and the input tokens.
+Setup = tuple[Callable[[], int | None], int, int | None]
+
+# ============================================================
+# Components
+# ============================================================
+
+
+def _read(path: Path, columns: list[str] | None = None):
+    import pandas as pd
+
+    return pd.read_parquet(path, columns=columns)
+
+
+def _tokens(texts) -> int:
+    return sum(len(t.split()) for t in texts)
+
+
+def setup_normalize_text(data: Path, args: argparse.Namespace) -> Setup:
+    from src.config import SOURCE_COL, TARGET_COL
+    from src.preprocessing_nmt import normalize_text
+
+    raw = _read(data / "corpus.parquet", [SOURCE_COL, TARGET_COL])
+    texts = raw[SOURCE_COL].tolist() + raw[TARGET_COL].tolist()
+
+    def run() -> None:
+        for text in texts:
+            normalize_text(text)
+
+    return run, len(raw), _tokens(texts)
+
+
+def setup_preprocess_corpus(data: Path, args: argparse.Namespace) -> Setup:
+    from src.config import SOURCE_COL, TARGET_COL
+    from src.preprocessing_nmt import preprocess_corpus
+
+    raw = _read(data / "corpus.parquet")
+    tokens = _tokens(raw[SOURCE_COL]) + _tokens(raw[TARGET_COL])
+
+    def run() -> None:
+        preprocess_corpus(raw, n_jobs=args.n_jobs)
+
+    return run, len(raw), tokens
+
+
+def setup_inject_noise(data: Path, args: argparse.Namespace) -> Setup:
+    from src.augmentation import inject_noise
+
+    sentences = [s.split() for s in _read(data / "clean.parquet")["src_tokens"]]
+
+    def run() -> None:
+        for tokens in sentences:
+            inject_noise(tokens)
+
+    return run, len(sentences), sum(map(len, sentences))
+
+
+def setup_augment_dataset(data: Path, args: argparse.Namespace) -> Setup:
+    from src.augmentation import augment_dataset
+
+    clean = _read(data / "clean.parquet")
+
+    def run() -> None:
+        augment_dataset(clean, n_jobs=args.n_jobs)
+
+    return run, len(clean), _tokens(clean["src_tokens"])
+
+
+def setup_mix_datasets(data: Path, args: argparse.Namespace) -> Setup:
+    from src.augmentation import mix_datasets
+
+    base, aux = _read(data / "clean.parquet"), _read(data / "aux_clean.parquet")
+    tokens = _tokens(base["src_tokens"]) + _tokens(base["tgt_tokens"])
+
+    def run() -> None:
+        mix_datasets(base, aux)
+
+    return run, len(base), tokens
+
+
+def setup_split_and_export(data: Path, args: argparse.Namespace) -> Setup:
+    import sklearn.model_selection  # noqa: F401  (imported lazily by the stage)
+
+    from src.preprocessing_nmt import split_and_export
+
+    clean = _read(data / "clean.parquet")
+    tokens = _tokens(clean["src_tokens"]) + _tokens(clean["tgt_tokens"])
+
+    def run() -> None:
+        with tempfile.TemporaryDirectory() as output_dir:
+            split_and_export(clean, output_dir=Path(output_dir))
+
+    return run, len(clean), tokens
+
+
+def setup_filter_files(data: Path, args: argparse.Namespace) -> Setup:
+    from src.filter_parallel_corpus import filter_files
+    from src.utils import iter_line_pairs
+
+    rows = tokens = 0
+    for src, tgt in iter_line_pairs(data / "corpus.src", data / "corpus.tgt"):
+        rows += 1
+        tokens += len(src.split()) + len(tgt.split())
+
+    def run() -> None:
+        with tempfile.TemporaryDirectory() as output_dir:
+            out = Path(output_dir)
+            filter_files(
+                data / "corpus.src",
+                data / "corpus.tgt",
+                out / "kept.src",
+                out / "kept.tgt",
+                out_csv=out / "kept.csv",
+                n_jobs=args.n_jobs,
+            )
+
+    return run, rows, tokens
+
+
+def setup_decode(data: Path, args: argparse.Namespace) -> Setup:
+    """
+    Greedy decoding of the first `--decode-sentences` clean sentences with a
+    randomly initialized model of the configured size. Weights do not change
+    the cost of a decoding step; untrained models rarely emit EOS, so every
+    sentence runs to `MAX_DECODE_LEN`, which makes this a worst case.
+    """
+    import torch
+
+    from src.inference import translate_batch
+    from src.model import build_model
+    from src.vocab import Vocab
+
+    torch.manual_seed(0)
+    clean = _read(data / "clean.parquet").iloc[:DECODE_VOCAB_SENTENCES]
+    src_vocab = Vocab.build(clean["src_tokens"])
+    tgt_vocab = Vocab.build(clean["tgt_tokens"])
+    model = build_model(len(src_vocab), len(tgt_vocab), torch.device("cpu"))
+    model.eval()
+    sentences = clean["src_tokens"].iloc[: args.decode_sentences].tolist()
+
+    def run() -> int:
+        return _tokens(translate_batch(model, sentences, src_vocab, tgt_vocab))
+
+    return run, len(sentences), None
+
+
+COMPONENTS: dict[str, Callable[[Path, argparse.Namespace], Setup]] = {
+    "normalize_text": setup_normalize_text,
+    "preprocess_corpus": setup_preprocess_corpus,
+    "inject_noise": setup_inject_noise,
+    "augment_dataset": setup_augment_dataset,
+    "mix_datasets": setup_mix_datasets,
+    "split_and_export": setup_split_and_export,
+    "filter_files": setup_filter_files,
+    "decode": setup_decode,
+}
+
+# ============================================================
+# Worker (one component at one size per process)
+# ============================================================
+
+
+def prepare(data: Path, size: int, seed: int) -> None:
+    """Generate the raw corpora of one size and their preprocessed versions."""
+    from src.preprocessing_nmt import preprocess_corpus
+
+    if (data / "aux_clean.parquet").exists():
+        return
+    for prefix, n_pairs, corpus_seed in (
+        ("", size, seed),
+        ("aux_", max(1, int(size * AUX_RATIO)), seed + 1),
+    ):
+        corpus_dir = data / prefix.rstrip("_")
+        write_corpus(corpus_dir, n_pairs, corpus_seed)
+        clean = preprocess_corpus(_read(corpus_dir / "corpus.parquet"))
+        clean[["src_tokens", "tgt_tokens"]].to_parquet(data / f"{prefix}clean.parquet")
+
+
+def measure(component: str, data: Path, args: argparse.Namespace) -> dict:
+    """
+    Set up `component` on the corpus in `data` and time `args.repeat` runs.
+
+    The fastest run is reported, which also keeps one-off costs (lazy
+    imports, cold caches) out of the result; peak memory covers all runs.
+    """
+    run, rows, tokens = COMPONENTS[component](data, args)
+    gc.collect()
+    base_rss = rss_mb()
+    exact = reset_peak_rss()
+
+    timings = []
+    for _ in range(args.repeat):
+        wall, cpu = time.perf_counter(), time.process_time()
+        produced = run()
+        timings.append((time.perf_counter() - wall, time.process_time() - cpu))
+        gc.collect()
+    seconds, cpu_seconds = min(timings)
+
+    peak = rss_mb("VmHWM") if exact else None
+    tokens = produced if produced is not None else tokens
+    return {
+        "component": component,
+        "rows": rows,
+        "tokens": tokens,
+        "seconds": round(seconds, 4),
+        "cpu_seconds": round(cpu_seconds, 4),
+        "all_seconds": [round(wall, 4) for wall, _ in timings],
+        "rows_per_s": round(rows / seconds, 1) if seconds > 0 else None,
+        "tokens_per_s": round(tokens / seconds, 1) if tokens and seconds > 0 else None,
+        # Without a resettable high-water mark the peak includes the setup
+        "peak_rss_mb": round(peak if peak is not None else peak_rss_mb() or 0, 1),
+        "delta_rss_mb": (
+            round(peak - base_rss, 1) if peak is not None and base_rss else None
+        ),
+        "peak_rss_children_mb": round(peak_rss_mb(children=True) or 0, 1),
+    }
+
+
+def _worker(args: argparse.Namespace) -> None:
+    data = Path(args.data_dir)
+    if args.component == "prepare":
+        prepare(data, args.size, args.seed)
+        return
+    result = measure(args.component, data, args)
+    Path(args.result).write_text(json.dumps(result), encoding="utf-8")
+
+
+def _spawn(component: str, data: Path, size: int, args: argparse.Namespace) -> dict:
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        result_path = Path(f.name)
+    command = [
+        sys.executable,
+        "-m",
+        "benchmarks.bench_suite",
+        "_worker",
+        component,
+        str(data),
+        "--size", str(size),
+        "--seed", str(args.seed),
+        "--n-jobs", str(args.n_jobs),
+        "--repeat", str(args.repeat),
+        "--decode-sentences", str(args.decode_sentences),
+        "--result", str(result_path),
+    ]  # fmt: skip
+    try:
+        subprocess.run(
+            command,
+            check=True,
+            stdout=None if args.verbose else subprocess.DEVNULL,
+        )
+        if component == "prepare":
+            return {}
+        return {"size": size, **json.loads(result_path.read_text(encoding="utf-8"))}
+    finally:
+        result_path.unlink(missing_ok=True)
+
+
+# ============================================================
+# Reporting
+# ============================================================
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def _slope(xs: list[float], ys: list[float]) -> float | None:
+    """Least-squares slope of log(y) against log(x)."""
+    points = [(math.log(x), math.log(y)) for x, y in zip(xs, ys, strict=True) if y > 0]
+    if len(points) < 2:
+        return None
+    mx = sum(x for x, _ in points) / len(points)
+    my = sum(y for _, y in points) / len(points)
+    var = sum((x - mx) ** 2 for x, _ in points)
+    if var == 0:
+        return None
+    return sum((x - mx) * (y - my) for x, y in points) / var
+
+
+def scaling(results: list[dict]) -> dict[str, dict]:
+    """
+    Per component: the exponent of time against rows (1.0 is linear), and
+    the peak-memory growth per thousand rows between the smallest and
+    largest size.
+    """
+    summary = {}
+    for component in dict.fromkeys(r["component"] for r in results):
+        runs = sorted(
+            (r for r in results if r["component"] == component),
+            key=lambda r: r["rows"],
+        )
+        first, last = runs[0], runs[-1]
+        extra_rows = last["rows"] - first["rows"]
+        summary[component] = {
+            "time_exponent": _round(
+                _slope([r["rows"] for r in runs], [r["seconds"] for r in runs])
+            ),
+            "memory_mb_per_1k_rows": _round(
+                (last["peak_rss_mb"] - first["peak_rss_mb"]) * 1000 / extra_rows
+                if extra_rows > 0
+                else None
+            ),
+        }
+    return summary
+
+
+def _round(value: float | None, digits: int = 3) -> float | None:
+    return None if value is None else round(value, digits)
+
+
+def print_results(results: list[dict], summary: dict[str, dict]) -> None:
+    print(
+        f"\n{'component':<18} {'size':>10} {'seconds':>9} {'rows/s':>12} "
+        f"{'tokens/s':>12} {'peak MB':>9} {'delta MB':>9}"
+    )
+    for r in results:
+        tokens_per_s = f"{r['tokens_per_s']:,.0f}" if r["tokens_per_s"] else "-"
+        delta = f"{r['delta_rss_mb']:.1f}" if r["delta_rss_mb"] is not None else "-"
+        print(
+            f"{r['component']:<18} {r['size']:>10,} {r['seconds']:>9.3f} "
+            f"{r['rows_per_s'] or 0:>12,.0f} {tokens_per_s:>12} "
+            f"{r['peak_rss_mb']:>9.1f} {delta:>9}"
+        )
+    print(f"\n{'component':<18} {'time ~ n^k':>11} {'MB / 1k rows':>13}")
+    for component, s in summary.items():
+        exponent = s["time_exponent"]
+        memory = s["memory_mb_per_1k_rows"]
+        print(
+            f"{component:<18} {'-' if exponent is None else f'{exponent:.2f}':>11} "
+            f"{'-' if memory is None else f'{memory:.3f}':>13}"
+        )
+
+
+# ============================================================
+# Commands
+# ============================================================
+
+
+def run_suite(args: argparse.Namespace) -> dict:
+    components = args.components or list(COMPONENTS)
+    unknown = sorted(set(components) - set(COMPONENTS))
+    if unknown:
+        raise SystemExit(f"Unknown components {unknown}, expected {list(COMPONENTS)}")
+
+    data_root = Path(args.data_dir or tempfile.mkdtemp(prefix="pmt-bench-"))
+    results = []
+    for size in sorted(args.sizes):
+        data = data_root / str(size)
+        print(f"[Bench] Preparing {size:,} synthetic pairs in {data}...")
+        _spawn("prepare", data, size, args)
+        for component in components:
+            result = _spawn(component, data, size, args)
+            results.append(result)
+            print(
+                f"[Bench] {component:<18} {size:>10,} pairs: "
+                f"{result['seconds']:.3f} s, {result['peak_rss_mb']:.1f} MB peak"
+            )
+
+    summary = scaling(results)
+    print_results(results, summary)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "n_jobs": args.n_jobs,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "decode_sentences": args.decode_sentences,
+        },
+        "results": results,
+        "scaling": summary,
+    }
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\n[Bench] Results written to {output}")
+    return report
+
+
+def compare(old: dict, new: dict, threshold: float) -> list[dict]:
+    """
+    Compare the runs that both reports share (same component and size).
+
+    A run regresses when its row throughput drops by more than `threshold`,
+    or its peak memory grows by more than `threshold` (and by more than
+    `MEMORY_NOISE_MB`).
+    """
+    old_runs = {(r["component"], r["size"]): r for r in old["results"]}
+    changes = []
+    for r in new["results"]:
+        before = old_runs.get((r["component"], r["size"]))
+        if before is None:
+            continue
+        speed = r["rows_per_s"] / before["rows_per_s"] - 1
+        memory_mb = r["peak_rss_mb"] - before["peak_rss_mb"]
+        memory = memory_mb / before["peak_rss_mb"] if before["peak_rss_mb"] else 0.0
+        reasons = []
+        if speed < -threshold:
+            reasons.append("throughput")
+        if memory > threshold and memory_mb > MEMORY_NOISE_MB:
+            reasons.append("memory")
+        changes.append(
+            {
+                "component": r["component"],
+                "size": r["size"],
+                "throughput_change": round(speed, 4),
+                "memory_change": round(memory, 4),
+                "regressions": reasons,
+            }
+        )
+    return changes
+
+
+def run_compare(args: argparse.Namespace) -> None:
+    old, new = (
+        json.loads(Path(path).read_text(encoding="utf-8"))
+        for path in (args.old, args.new)
+    )
+    for key in ("cpu_count", "python", "n_jobs"):
+        if old["meta"].get(key) != new["meta"].get(key):
+            print(
+                f"[Bench] Warning: {key} differs "
+                f"({old['meta'].get(key)} vs {new['meta'].get(key)})"
+            )
+
+    changes = compare(old, new, args.threshold)
+    print(f"\n{'component':<18} {'size':>10} {'rows/s':>9} {'peak MB':>9}  status")
+    for c in changes:
+        status = "REGRESSION (" + ", ".join(c["regressions"]) + ")"
+        print(
+            f"{c['component']:<18} {c['size']:>10,} "
+            f"{c['throughput_change']:>+9.1%} {c['memory_change']:>+9.1%}  "
+            f"{status if c['regressions'] else 'ok'}"
+        )
+    regressions = [c for c in changes if c["regressions"]]
+    print(
+        f"\n[Bench] {len(regressions)} regression(s) in {len(changes)} runs "
+        f"(threshold {args.threshold:.0%})."
+    )
+    if regressions:
+        raise SystemExit(1)
+
+
+# ============================================================
+# Command-line entry point
+# ============================================================
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="benchmark components at several sizes")
+    run.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    run.add_argument(
+        "--components", nargs="+", default=None, help=f"subset of {list(COMPONENTS)}"
+    )
+    run.add_argument("--output", default="bench_results.json")
+    run.add_argument(
+        "--data-dir", default=None, help="keep and reuse generated corpora here"
+    )
+    run.add_argument("--verbose", action="store_true", help="show component output")
+
+    cmp = commands.add_parser("compare", help="flag regressions between two runs")
+    cmp.add_argument("old")
+    cmp.add_argument("new")
+    cmp.add_argument("--threshold", type=float, default=0.10)
+
+    worker = commands.add_parser("_worker")
+    worker.add_argument("component", choices=["prepare", *COMPONENTS])
+    worker.add_argument("data_dir")
+    worker.add_argument("--size", type=int, required=True)
+    worker.add_argument("--result", default=None)
+    worker.add_argument("--verbose", action="store_true")
+
+    for sub in (run, worker):
+        sub.add_argument("--seed", type=int, default=0)
+        sub.add_argument("--n-jobs", type=int, default=1)
+        sub.add_argument("--repeat", type=int, default=REPEAT, help="best of N runs")
+        sub.add_argument("--decode-sentences", type=int, default=DECODE_SENTENCES)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        run_suite(args)
+    elif args.command == "compare":
+        run_compare(args)
+    else:
+        _worker(args)
+
+
+if __name__ == "__main__":
+    main()
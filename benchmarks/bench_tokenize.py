@@ -0,0 +1,69 @@
+"""
+SMT tokenization throughput: per-sentence `nltk.word_tokenize` vs the batch tokenizer.
+Checks that both produce the same tokens, then times them on a corpus of
+Bible size built by repeating the lines of the given files.
+
+Run from the repository root:
+    python -m benchmarks.bench_tokenize data/translations/test.src --sentences 31000
+"""
+
+import argparse
+import time
+from itertools import cycle, islice
+from pathlib import Path
+
+from src.preprocessing_smt import (
+    normalize_text,
+    preprocess_batch,
+    tokenize_sentence,
+    tokenizer_mismatches,
+)
+
+BASELINE_SAMPLE = 5000  # sentences timed with nltk; scaled up to the corpus
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "files",
+        nargs="*",
+        default=["data/translations/test.src", "data/translations/test.tgt"],
+    )
+    parser.add_argument("--sentences", type=int, default=31_000)
+    parser.add_argument("--n-jobs", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    lines = [
+        line
+        for path in args.files
+        for line in Path(path).read_text(encoding="utf8").splitlines()
+    ]
+    corpus = list(islice(cycle(lines), args.sentences))
+
+    try:
+        mismatches = tokenizer_mismatches(lines)
+    except LookupError:
+        print("[Bench] nltk Punkt data missing: nltk.download('punkt_tab')")
+        return
+    print(f"[Bench] {len(lines):,} distinct lines, {len(mismatches)} mismatches")
+    for text, expected, actual in mismatches[:5]:
+        print(f"  {text!r}: nltk {expected} != batch {actual}")
+
+    sample = corpus[:BASELINE_SAMPLE]
+    start = time.perf_counter()
+    for text in sample:
+        tokenize_sentence(normalize_text(text))
+    baseline = (time.perf_counter() - start) * len(corpus) / len(sample)
+
+    start = time.perf_counter()
+    preprocess_batch(corpus, n_jobs=args.n_jobs)
+    batch = time.perf_counter() - start
+
+    print(
+        f"[Bench] {len(corpus):,} sentences: nltk {baseline:.2f} s (extrapolated), "
+        f"batch {batch:.2f} s ({baseline / batch:.0f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
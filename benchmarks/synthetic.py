@@ -0,0 +1,263 @@
+"""
+Synthetic Cebuano/Spanish-like parallel corpora for benchmarking.
+Generates Bible-style verse pairs from syllable-built vocabularies with a
+Zipfian word distribution, mixed with the kinds of noise that
+`filter_parallel_corpus.bad_patterns` rejects. Runs offline and is seeded.
+
+Write a corpus to disk:
+    python -m benchmarks.synthetic data/cache/bench/100k --pairs 100000
+"""
+
+import argparse
+from collections.abc import Iterator
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.config import SOURCE_COL, TARGET_COL
+from src.filter_parallel_corpus import filter_rules
+
+GENERATE_CHUNK_SIZE = 100_000
+VOCAB_SIZE = 20_000
+MIN_WORDS, MAX_WORDS = 3, 40
+NOISE_RATE = 0.1  # share of pairs replaced by filter-rule noise
+INVALID_RATE = 0.005  # share of "N/A" / empty translations
+
+# ============================================================
+# Vocabularies
+# ============================================================
+
+CEBUANO = {
+    "onsets": ["", "b", "d", "g", "h", "k", "l", "m", "n", "ng", "p", "s", "t", "w"],
+    "vowels": [*"aaaaiiiuuoe"],
+    "codas": ["", "", "", "n", "ng", "g", "y", "s", "t", "w", "l"],
+    "function_words": [
+        "ang", "sa", "nga", "ug", "mga", "si", "kay", "siya", "ni", "kini",
+        "niya", "sila", "mao", "kanila", "usab", "dili", "kamo", "ako", "ila",
+    ],
+}  # fmt: skip
+SPANISH = {
+    "onsets": [
+        "", "b", "c", "d", "f", "g", "l", "m", "n", "p", "r", "s", "t", "v",
+        "ll", "ch", "qu", "br", "tr", "pl", "gr", "j", "ñ",
+    ],
+    "vowels": [*"aaaaeeeeiiooouu", "á", "é", "í", "ó", "ú"],
+    "codas": ["", "", "", "", "n", "s", "r", "l", "z"],
+    "function_words": [
+        "el", "la", "de", "que", "y", "en", "los", "se", "del", "las", "por",
+        "un", "con", "no", "una", "su", "para", "al", "lo", "como", "más",
+        "sus", "le", "fue", "porque", "cuando", "sobre", "todo", "él", "ellos",
+    ],
+}  # fmt: skip
+
+
+def make_vocabulary(
+    rng: np.random.Generator, language: dict, size: int = VOCAB_SIZE
+) -> np.ndarray:
+    """Function words followed by unique 1-4 syllable words, as an object array."""
+    words = dict.fromkeys(language["function_words"])
+    while len(words) < size:
+        n_syllables = int(rng.choice([1, 2, 3, 4], p=[0.2, 0.45, 0.25, 0.1]))
+        words.setdefault(
+            "".join(
+                rng.choice(language["onsets"])
+                + rng.choice(language["vowels"])
+                + rng.choice(language["codas"])
+                for _ in range(n_syllables)
+            )
+        )
+    return np.array(list(words), dtype=object)
+
+
+def zipf_probabilities(size: int, exponent: float = 1.07) -> np.ndarray:
+    """Zipf-Mandelbrot word frequencies by rank, as seen in natural text."""
+    weights = 1.0 / (np.arange(size) + 2.7) ** exponent
+    return weights / weights.sum()
+
+
+# ============================================================
+# Noise
+# ============================================================
+
+# One template per `filter_rules` entry; {a}, {b}, {c} are short phrases and
+# {W} a capitalized word from the corpus.
+NOISE_TEMPLATES = {
+    "placeholder": "{a} $1 {b} {c}",
+    "wiki_emphasis": "{a} '''{b}''' {c}",
+    "html_tag": "<strong>{a}</strong> {b} {c}",
+    "wiki_link": "{a} [[{b}|{c}]]",
+    "external_link": "{a} [https://example.org {b}] {c}",
+    "link_placeholder": "{a} [$1 {b}] {c}",
+    "format_placeholder": "{a} %(count)s {b} {c}",
+    "url": "{a} {b} http://example.org/{c}",
+    "parenthetical": "({a} {b} {c})",
+    "error_message": "Problema sa ekspresyon: {a} {b}",
+    "scan_failed": "{a} scan failed {b} {c}",
+    "template": "{a} {{{{PLURAL:$1|{b}|{c}}}}}",
+    "user_n": "{a} user_n {b} {c}",
+    "capitalized_word": "{W}",
+    "lowercase_word": "{a}",
+    "acronym": "DOM",
+}
+
+
+def _plain_word(rng: np.random.Generator, vocab: np.ndarray) -> str:
+    # The single-word rules only match unaccented ASCII letters
+    while not ((word := str(rng.choice(vocab))).isascii() and len(word) > 1):
+        pass
+    return word
+
+
+def noise_sentence(rng: np.random.Generator, vocab: np.ndarray, rule: str) -> str:
+    """A sentence that `filter_rules[rule]` matches."""
+    phrase = lambda n: " ".join(rng.choice(vocab, n))  # noqa: E731
+    word = _plain_word(rng, vocab)
+    return NOISE_TEMPLATES[rule].format(
+        a=word if rule == "lowercase_word" else phrase(2),
+        b=phrase(2),
+        c=phrase(1),
+        W=word.capitalize(),
+    )
+
+
+# ============================================================
+# Corpus generation
+# ============================================================
+
+
+class CorpusGenerator:
+    """
+    Seeded generator of Cebuano-like -> Spanish-like verse pairs.
+
+    Target sentences translate most source words through a fixed random
+    lexicon and add a few extra words, so the pairs share real alignment
+    structure (and vocabulary statistics) without any external data.
+    """
+
+    def __init__(self, seed: int = 0, vocab_size: int = VOCAB_SIZE):
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self.src_vocab = make_vocabulary(rng, CEBUANO, vocab_size)
+        self.tgt_vocab = make_vocabulary(rng, SPANISH, vocab_size)
+        self.probs = zipf_probabilities(vocab_size)
+        self.lexicon = rng.permutation(vocab_size)
+        self.rules = [rule for rule in filter_rules if rule in NOISE_TEMPLATES]
+
+    def _sentences(
+        self, vocab: np.ndarray, ids: np.ndarray, lengths: np.ndarray, question: bool
+    ) -> list[str]:
+        words = vocab[ids]
+        ends = np.cumsum(lengths)
+        out = []
+        for start, end in zip((ends - lengths).tolist(), ends.tolist(), strict=True):
+            text = " ".join(words[start:end])
+            out.append(text[0].upper() + text[1:] + ".")
+        if question:  # Spanish-style questions exercise the ¿ normalization
+            for i in range(0, len(out), 17):
+                out[i] = "¿" + out[i][:-1] + "?"
+        return out
+
+    def chunk(self, n_pairs: int, chunk_index: int = 0) -> pd.DataFrame:
+        """`n_pairs` pairs in the raw CSV layout (metadata columns included)."""
+        rng = np.random.default_rng([self.seed, chunk_index])
+        vocab_size = len(self.probs)
+
+        src_len = np.minimum(MIN_WORDS + rng.poisson(12, n_pairs), MAX_WORDS).astype(
+            np.int64
+        )
+        tgt_len = src_len + rng.integers(0, 4, n_pairs)
+        src_ids = rng.choice(vocab_size, src_len.sum(), p=self.probs)
+        tgt_ids = rng.choice(vocab_size, tgt_len.sum(), p=self.probs)
+
+        # Translate the aligned prefix of each target through the lexicon
+        tgt_starts = np.cumsum(tgt_len) - tgt_len
+        src_starts = np.cumsum(src_len) - src_len
+        row = np.repeat(np.arange(n_pairs), tgt_len)
+        offset = np.arange(len(tgt_ids)) - tgt_starts[row]
+        aligned = (offset < src_len[row]) & (rng.random(len(tgt_ids)) < 0.8)
+        tgt_ids[aligned] = self.lexicon[
+            src_ids[src_starts[row[aligned]] + offset[aligned]]
+        ]
+
+        src = self._sentences(self.src_vocab, src_ids, src_len, question=False)
+        tgt = self._sentences(self.tgt_vocab, tgt_ids, tgt_len, question=True)
+
+        for i in np.flatnonzero(rng.random(n_pairs) < NOISE_RATE).tolist():
+            rule = self.rules[int(rng.integers(len(self.rules)))]
+            if rng.random() < 0.5:
+                src[i] = noise_sentence(rng, self.src_vocab, rule)
+            else:
+                tgt[i] = noise_sentence(rng, self.tgt_vocab, rule)
+        for i in np.flatnonzero(rng.random(n_pairs) < INVALID_RATE).tolist():
+            tgt[i] = "N/A"
+
+        verse = np.arange(n_pairs) + chunk_index * GENERATE_CHUNK_SIZE
+        return pd.DataFrame(
+            {
+                "usfm": [f"GEN.{v // 30 + 1}.{v % 30 + 1}" for v in verse.tolist()],
+                "book": "GEN",
+                "chapter": verse // 30 + 1,
+                "verse": verse % 30 + 1,
+                SOURCE_COL: src,
+                TARGET_COL: tgt,
+            }
+        )
+
+    def chunks(
+        self, n_pairs: int, chunk_size: int = GENERATE_CHUNK_SIZE
+    ) -> Iterator[pd.DataFrame]:
+        """The corpus of `n_pairs` pairs in chunks; identical for any chunk size."""
+        for index, start in enumerate(range(0, n_pairs, GENERATE_CHUNK_SIZE)):
+            frame = self.chunk(min(GENERATE_CHUNK_SIZE, n_pairs - start), index)
+            for sub in range(0, len(frame), chunk_size):
+                yield frame.iloc[sub : sub + chunk_size]
+
+
+def generate_corpus(n_pairs: int, seed: int = 0) -> pd.DataFrame:
+    """A whole synthetic corpus in memory."""
+    parts = list(CorpusGenerator(seed).chunks(n_pairs))
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+
+def write_corpus(output_dir: Path, n_pairs: int, seed: int = 0) -> dict[str, Path]:
+    """
+    Stream a corpus to `corpus.parquet` plus aligned `corpus.src`/`corpus.tgt`.
+
+    Memory use is bounded by one generation chunk, so 10M-pair corpora can
+    be written on a small machine.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = {ext: output_dir / f"corpus.{ext}" for ext in ("parquet", "src", "tgt")}
+    writer = None
+    with (
+        open(paths["src"], "w", encoding="utf-8") as f_src,
+        open(paths["tgt"], "w", encoding="utf-8") as f_tgt,
+    ):
+        for frame in CorpusGenerator(seed).chunks(n_pairs):
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            writer = writer or pq.ParquetWriter(paths["parquet"], table.schema)
+            writer.write_table(table)
+            f_src.write("".join(f"{s}\n" for s in frame[SOURCE_COL]))
+            f_tgt.write("".join(f"{t}\n" for t in frame[TARGET_COL]))
+    if writer:
+        writer.close()
+    return paths
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("output_dir")
+    parser.add_argument("--pairs", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    paths = write_corpus(Path(args.output_dir), args.pairs, args.seed)
+    print(f"[Bench] {args.pairs:,} synthetic pairs written to {paths['parquet']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,27 @@
 import random
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from functools import partial
+from itertools import chain
+from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
-from src.config import AUGMENT_N_COPIES, DROP_PROB, DUP_PROB, MIX_RATIO, SWAP_PROB
+from src.config import (
+    AUGMENT_N_COPIES,
+    DROP_PROB,
+    DUP_PROB,
+    LANGUAGE_PAIRS,
+    MIX_RATIO,
+    PROCESSED_DIR,
+    RANDOM_SEED,
+    SWAP_PROB,
+    pair_name,
+)
+from src.instrumentation import frame_tokens, instrument
+from src.utils import count_lines, iter_line_pairs, load_file, parallel_imap
+
+AUGMENT_CHUNK_SIZE = 50_000
 
 
 def inject_noise(
@@ -40,11 +59,168 @@ def inject_noise(
     return new_tokens
 
 
+# ============================================================
+# Batched noise injection
+# ============================================================
+
+_SWAP, _DROP, _DUP = 0, 1, 2
+
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """SplitMix64 finalizer: a fast, well-mixed bijection on uint64."""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _row_keys(row_ids: np.ndarray, seed: int) -> np.ndarray:
+    """Derive an independent random key for every row from the global seed."""
+    base = np.random.SeedSequence(seed).generate_state(1, dtype=np.uint64)[0]
+    return _mix64(_mix64(row_ids.astype(np.uint64)) ^ base)
+
+
+def _uniforms(keys: np.ndarray, stream: int, pos: np.ndarray) -> np.ndarray:
+    """Uniform [0, 1) draws addressed by (row key, stream, token position)."""
+    counters = (np.uint64(stream) << np.uint64(40)) | pos.astype(np.uint64)
+    bits = _mix64(keys ^ _mix64(counters))
+    return (bits >> np.uint64(11)).astype(np.float64) * 2.0**-53
+
+
+def inject_noise_batch(
+    sentences: Sequence[str],
+    n_copies: int = 1,
+    swap_prob: float = SWAP_PROB,
+    drop_prob: float = DROP_PROB,
+    dup_prob: float = DUP_PROB,
+    seed: int = RANDOM_SEED,
+    row_ids: np.ndarray | None = None,
+) -> list[list[str]]:
+    """
+    Apply the `inject_noise` operations to many sentences at once.
+
+    All tokens are held in one flat id array with per-sentence offsets, and
+    every swap/drop/duplicate decision for the batch is drawn in a single
+    vectorized step. Each draw is a counter-based function of
+    (seed, row id, copy, operation, token position) rather than the next
+    value of a shared generator, so a row gets the same noise no matter how
+    the corpus is split into chunks or across workers.
+
+    Args:
+        sentences: Whitespace-tokenized sentences.
+        n_copies: Number of noisy variants to generate per sentence.
+        swap_prob: Probability of swapping each token with its right neighbor.
+        drop_prob: Probability of dropping each token.
+        dup_prob: Probability of duplicating each token.
+        seed: Global seed.
+        row_ids: Stable id of each sentence (defaults to its position).
+
+    Returns:
+        `n_copies` lists, each holding one noisy variant of every sentence.
+    """
+    batch = _TokenBatch(sentences, row_ids, seed)
+    probs = (swap_prob, drop_prob, dup_prob)
+    return [batch.noisy_copy(copy, *probs) for copy in range(n_copies)]
+
+
+class _TokenBatch:
+    """Sentences stored as one flat token-id array plus per-sentence lengths."""
+
+    def __init__(
+        self,
+        sentences: Sequence[str],
+        row_ids: np.ndarray | None = None,
+        seed: int = RANDOM_SEED,
+    ):
+        n_rows = len(sentences)
+        if row_ids is None:
+            row_ids = np.arange(n_rows)
+        self.n_rows = n_rows
+        self.keys = _row_keys(np.asarray(row_ids), seed)
+
+        token_lists = [sentence.split() for sentence in sentences]
+        self.lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=n_rows)
+        codes, vocab = pd.factorize(
+            np.fromiter(chain.from_iterable(token_lists), dtype=object)
+        )
+        self.codes = codes
+        self.vocab = np.asarray(vocab, dtype=object)
+        self.rows = np.repeat(np.arange(n_rows), self.lengths)
+
+    def noisy_copy(
+        self, copy: int, swap_prob: float, drop_prob: float, dup_prob: float
+    ) -> list[str]:
+        """Build noisy variant number `copy` of every sentence in the batch."""
+        ids, rows, lengths, keys = self.codes, self.rows, self.lengths, self.keys
+        streams = [copy * 3 + op for op in (_SWAP, _DROP, _DUP)]
+
+        # 1. Swap neighboring tokens. Swaps are applied left to right, so a run
+        #    of consecutive swaps carries the run's first token to its end.
+        pos = _positions(rows, lengths)
+        swap = _uniforms(keys[rows], streams[_SWAP], pos) < swap_prob
+        swap &= pos < lengths[rows] - 1
+        if swap.any():
+            idx = np.arange(len(ids))
+            prev = np.concatenate([[False], swap[:-1]])
+            run_start = np.maximum.accumulate(np.where(swap & ~prev, idx, 0))
+            source = idx.copy()
+            source[swap] += 1
+            run_end = prev & ~swap
+            source[run_end] = run_start[np.flatnonzero(run_end) - 1]
+            ids = ids[source]
+
+        # 2. Drop tokens
+        keep = _uniforms(keys[rows], streams[_DROP], pos) > drop_prob
+        ids, rows = ids[keep], rows[keep]
+        lengths = np.bincount(rows, minlength=self.n_rows)
+
+        # 3. Duplicate tokens (duplicates themselves are never re-duplicated)
+        pos = _positions(rows, lengths)
+        dup = _uniforms(keys[rows], streams[_DUP], pos) < dup_prob
+        ids = np.repeat(ids, 1 + dup)
+        lengths = lengths + np.bincount(rows[dup], minlength=self.n_rows)
+
+        return _join_rows(self.vocab[ids].tolist(), lengths)
+
+
+def _positions(rows: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Position of every flat token within its own sentence."""
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    return np.arange(len(rows)) - starts[rows]
+
+
+def _join_rows(tokens: list[str], lengths: np.ndarray) -> list[str]:
+    ends = np.cumsum(lengths).tolist()
+    starts = [0, *ends[:-1]]
+    return [" ".join(tokens[a:b]) for a, b in zip(starts, ends, strict=True)]
+
+
+def _augment_chunk(
+    args: tuple[list[str], int, int, int, float, float, float],
+) -> list[list[str]]:
+    sentences, start, n_copies, seed, swap_prob, drop_prob, dup_prob = args
+    return inject_noise_batch(
+        sentences,
+        n_copies=n_copies,
+        swap_prob=swap_prob,
+        drop_prob=drop_prob,
+        dup_prob=dup_prob,
+        seed=seed,
+        row_ids=np.arange(start, start + len(sentences)),
+    )
+
+
+@instrument("augment_dataset", tokens=frame_tokens)
 def augment_dataset(
     df: pd.DataFrame,
     src_col: str = "src_tokens",
     tgt_col: str = "tgt_tokens",
     n_copies: int = AUGMENT_N_COPIES,
+    seed: int = RANDOM_SEED,
+    n_jobs: int = 1,
+    chunk_size: int = AUGMENT_CHUNK_SIZE,
+    swap_prob: float = SWAP_PROB,
+    drop_prob: float = DROP_PROB,
+    dup_prob: float = DUP_PROB,
 ) -> pd.DataFrame:
     """
     Apply noise injection to the source sentences of a dataset.
@@ -54,9 +230,16 @@ def augment_dataset(
         src_col: Name of the source column.
         tgt_col: Name of the target column.
         n_copies: Number of noisy variants to generate per sentence.
+        seed: Seed for the noise; row `i` always receives the same noise.
+        n_jobs: Worker processes; chunks are augmented in parallel.
+        chunk_size: Rows per batch handed to `inject_noise_batch`.
+        swap_prob: Probability of swapping each token with its right neighbor.
+        drop_prob: Probability of dropping each token.
+        dup_prob: Probability of duplicating each token.
 
     Returns:
-        A new DataFrame containing both original and augmented sentence pairs.
+        A new DataFrame containing both original and augmented sentence pairs,
+        with each original row directly followed by its noisy copies.
     """
     if n_copies <= 0:
         print(
@@ -65,17 +248,25 @@ def augment_dataset(
         return df
 
     print(f"[INFO] Augmenting dataset: {len(df):,} rows with {n_copies} copies each...")
-    rows: list[tuple[str, str]] = []
+    src = df[src_col].tolist()
+    probs = (swap_prob, drop_prob, dup_prob)
+    tasks = (
+        (src[start : start + chunk_size], start, n_copies, seed, *probs)
+        for start in range(0, len(src), chunk_size)
+    )
 
-    for _, row in df.iterrows():
-        src = row[src_col]
-        tgt = row[tgt_col]
-        rows.append((src, tgt))
-        for _ in range(n_copies):
-            noisy = " ".join(inject_noise(src.split()))
-            rows.append((noisy, tgt))
+    stride = n_copies + 1
+    out_src = np.empty(len(src) * stride, dtype=object)
+    out_src[::stride] = src
+    start = 0
+    for copies in parallel_imap(_augment_chunk, tasks, n_jobs=n_jobs):
+        n_chunk = len(copies[0])
+        for copy, noisy in enumerate(copies, start=1):
+            out_src[start * stride + copy : (start + n_chunk) * stride : stride] = noisy
+        start += n_chunk
+    out_tgt = np.repeat(df[tgt_col].to_numpy(dtype=object), stride)
 
-    out_df = pd.DataFrame(rows, columns=[src_col, tgt_col])
+    out_df = pd.DataFrame({src_col: out_src, tgt_col: out_tgt})
     print(
         f"[INFO] Augmentation complete — total rows: "
         f"{len(out_df):,} ({(len(out_df) / len(df)):.1f}x increase)"
@@ -83,6 +274,112 @@ def augment_dataset(
     return out_df
 
 
+# ============================================================
+# Lazy (on-the-fly) augmentation
+# ============================================================
+
+
+class LazyAugmentedCorpus:
+    """
+    Clean parallel corpus that injects noise as items are read.
+
+    Stands in for the output of `augment_dataset` without materializing it:
+    item `i` is the clean pair `i // stride` when `i % stride == 0`, otherwise
+    noisy copy `i % stride` of that pair, where `stride = n_copies + 1`. Noise
+    is a pure function of (seed, epoch, row, copy), so every epoch sees fresh
+    noise while any epoch can be reproduced exactly. Only the clean corpus
+    (e.g., `PROCESSED_DIR / "base"`) has to be stored.
+
+    Works as a plain iterable (`for src, tgt in corpus`) and as a map-style
+    dataset for `torch.utils.data.DataLoader`; `__getitems__` lets the loader
+    fetch a whole batch with one vectorized noise pass.
+    """
+
+    def __init__(
+        self,
+        src_sentences: Sequence[str],
+        tgt_sentences: Sequence[str],
+        n_copies: int = AUGMENT_N_COPIES,
+        seed: int = RANDOM_SEED,
+        swap_prob: float = SWAP_PROB,
+        drop_prob: float = DROP_PROB,
+        dup_prob: float = DUP_PROB,
+        chunk_size: int = AUGMENT_CHUNK_SIZE,
+    ):
+        if len(src_sentences) != len(tgt_sentences):
+            raise ValueError("Source and target must have the same number of lines.")
+        self.src = src_sentences
+        self.tgt = tgt_sentences
+        self.n_copies = n_copies
+        self.stride = n_copies + 1
+        self.seed = seed
+        self.probs = (swap_prob, drop_prob, dup_prob)
+        self.chunk_size = chunk_size
+        self.epoch = 0
+
+    @classmethod
+    def from_split(
+        cls, data_dir: Path = PROCESSED_DIR / "base", split: str = "train", **kwargs
+    ) -> "LazyAugmentedCorpus":
+        """Load a clean `<split>.src` / `<split>.tgt` pair exported by the pipeline."""
+        return cls(
+            load_file(data_dir / f"{split}.src"),
+            load_file(data_dir / f"{split}.tgt"),
+            **kwargs,
+        )
+
+    def set_epoch(self, epoch: int) -> None:
+        """Select the noise realization; call once at the start of each epoch."""
+        self.epoch = epoch
+
+    def _epoch_seed(self) -> int:
+        entropy = [self.seed, self.epoch]
+        return int(np.random.SeedSequence(entropy).generate_state(1)[0])
+
+    def __len__(self) -> int:
+        return len(self.src) * self.stride
+
+    def __getitem__(self, index: int) -> tuple[str, str]:
+        return self.__getitems__([index])[0]
+
+    def __getitems__(self, indices: Sequence[int]) -> list[tuple[str, str]]:
+        indices = np.asarray(indices, dtype=np.int64)
+        if len(indices) and (indices.min() < 0 or indices.max() >= len(self)):
+            raise IndexError("LazyAugmentedCorpus index out of range.")
+        rows, copies = np.divmod(indices, self.stride)
+
+        out_src = [self.src[row] for row in rows.tolist()]
+        for copy in np.unique(copies[copies > 0]).tolist():
+            (positions,) = np.nonzero(copies == copy)
+            batch = _TokenBatch(
+                [out_src[i] for i in positions.tolist()],
+                row_ids=rows[positions],
+                seed=self._epoch_seed(),
+            )
+            noisy = batch.noisy_copy(copy - 1, *self.probs)
+            for i, sentence in zip(positions.tolist(), noisy, strict=True):
+                out_src[i] = sentence
+        return [
+            (src, self.tgt[row])
+            for src, row in zip(out_src, rows.tolist(), strict=True)
+        ]
+
+    def __iter__(self) -> Iterator[tuple[str, str]]:
+        """Yield every item in index order, one noisy chunk at a time."""
+        seed = self._epoch_seed()
+        for start in range(0, len(self.src), self.chunk_size):
+            src = self.src[start : start + self.chunk_size]
+            tgt = self.tgt[start : start + self.chunk_size]
+            row_ids = np.arange(start, start + len(src))
+            batch = _TokenBatch(src, row_ids, seed)
+            copies = [batch.noisy_copy(c, *self.probs) for c in range(self.n_copies)]
+            for i, pair_tgt in enumerate(tgt):
+                yield src[i], pair_tgt
+                for noisy in copies:
+                    yield noisy[i], pair_tgt
+
+
+@instrument("mix_datasets", tokens=frame_tokens)
 def mix_datasets(
     base_df: pd.DataFrame,
     mix_df: pd.DataFrame,
@@ -103,6 +400,9 @@ def mix_datasets(
 
     Returns:
         A new DataFrame containing base data + sampled mix data.
+
+    See `interleave_corpora` for a streaming alternative that mixes any number
+    of corpora without holding them in memory.
     """
     n_mix = int(len(base_df) * mix_ratio)
     sampled_mix = mix_df.sample(n=min(n_mix, len(mix_df)), random_state=42)
@@ -114,3 +414,151 @@ def mix_datasets(
         f"total={len(combined):,} ({mix_ratio * 100:.0f}% mix ratio)"
     )
     return combined[[src_col, tgt_col]]
+
+
+# ============================================================
+# Streaming multi-corpus sampling
+# ============================================================
+
+MIX_BUFFER_SIZE = 100_000
+
+PairSource = Iterable[tuple[str, str]] | Callable[[], Iterable[tuple[str, str]]]
+
+
+def temperature_weights(
+    sizes: Mapping[str, int], temperature: float = 1.0
+) -> dict[str, float]:
+    """
+    Sampling probabilities proportional to `size ** (1 / temperature)`.
+
+    `temperature=1` samples in proportion to corpus size, larger values move
+    towards uniform sampling and so upsample the smaller corpora.
+    """
+    if temperature <= 0:
+        raise ValueError("temperature must be positive.")
+    scaled = {name: size ** (1.0 / temperature) for name, size in sizes.items()}
+    total = sum(scaled.values())
+    return {name: value / total for name, value in scaled.items()}
+
+
+def shuffle_buffer(
+    items: Iterable[tuple[str, str]], buffer_size: int, rng: random.Random
+) -> Iterator[tuple[str, str]]:
+    """Approximate shuffle of a stream holding at most `buffer_size` items."""
+    buffer: list[tuple[str, str]] = []
+    for item in items:
+        if len(buffer) < buffer_size:
+            buffer.append(item)
+            continue
+        j = rng.randrange(buffer_size)
+        yield buffer[j]
+        buffer[j] = item
+    rng.shuffle(buffer)
+    yield from buffer
+
+
+def interleave_corpora(
+    corpora: Mapping[str, PairSource],
+    weights: Mapping[str, float] | None = None,
+    sizes: Mapping[str, int] | None = None,
+    temperature: float = 1.0,
+    buffer_size: int = MIX_BUFFER_SIZE,
+    seed: int = RANDOM_SEED,
+    primary: str | None = None,
+    max_samples: int | None = None,
+    cycle: bool = False,
+) -> Iterator[tuple[str, str, str]]:
+    """
+    Interleave any number of parallel corpora into one shuffled stream.
+
+    Each step picks a corpus at random (by `weights`, or by temperature
+    sampling over `sizes`) and emits the next pair from that corpus's shuffle
+    buffer. Nothing is concatenated: memory is bounded by `buffer_size`,
+    which is shared across all corpora, so adding corpora does not add memory.
+
+    Args:
+        corpora: Corpus name -> pairs. Pass a zero-argument callable
+            (e.g., `functools.partial(iter_line_pairs, src, tgt)`) to allow
+            the corpus to be restarted when `cycle=True`.
+        weights: Explicit sampling weights; normalized to sum to one.
+        sizes: Corpus sizes for temperature sampling when `weights` is None.
+        temperature: Sampling temperature (see `temperature_weights`).
+        buffer_size: Total pairs held across all shuffle buffers.
+        seed: Seed for corpus choice and shuffling.
+        primary: Stop as soon as this corpus is exhausted (e.g., the base
+            corpus when reproducing `mix_datasets`).
+        max_samples: Stop after this many pairs.
+        cycle: Restart exhausted corpora (other than `primary`) instead of
+            dropping them. Requires `max_samples` or `primary` so that the
+            stream ends.
+
+    Yields:
+        (corpus name, source, target) triples.
+    """
+    if weights is None:
+        if sizes is None:
+            raise ValueError("Either weights or sizes must be given.")
+        weights = temperature_weights(sizes, temperature)
+    if cycle and max_samples is None and primary is None:
+        raise ValueError("cycle=True needs max_samples or primary to terminate.")
+    if cycle and not all(callable(corpora[name]) for name in weights):
+        raise ValueError("cycle=True requires callables that restart each corpus.")
+
+    rng = random.Random(seed)
+    per_corpus = max(1, buffer_size // len(corpora))
+
+    def open_stream(name: str, restart: int) -> Iterator[tuple[str, str]]:
+        source = corpora[name]
+        pairs = source() if callable(source) else source
+        stream_rng = random.Random(f"{seed}-{name}-{restart}")
+        return shuffle_buffer(pairs, per_corpus, stream_rng)
+
+    restarts = dict.fromkeys(weights, 0)
+    streams = {name: open_stream(name, 0) for name in weights if weights[name] > 0}
+
+    n_samples = 0
+    while streams and (max_samples is None or n_samples < max_samples):
+        names = list(streams)
+        choices = rng.choices(names, weights=[weights[n] for n in names], k=4096)
+        for name in choices:
+            pair = next(streams[name], None)
+            if pair is None and name == primary:
+                # The primary corpus is never restarted: it ends the stream
+                streams.clear()
+                return
+            if pair is None and cycle:
+                restarts[name] += 1
+                streams[name] = open_stream(name, restarts[name])
+                pair = next(streams[name], None)
+            if pair is None:
+                # Exhausted: drop it and redraw with renormalized weights
+                del streams[name]
+                break
+            yield name, *pair
+            n_samples += 1
+            if n_samples == max_samples:
+                break
+
+
+def language_pair_sources(
+    pairs: Sequence[tuple[str, str]] = LANGUAGE_PAIRS,
+    data_dir: Path = PROCESSED_DIR,
+    split: str = "train",
+) -> tuple[dict[str, PairSource], dict[str, int]]:
+    """
+    Restartable sources and sizes for the exported splits of several pairs.
+
+    Expects each pair under `data_dir / pair_name(src, tgt)`, as written by
+    `split_and_export`. Pairs without exported files are skipped.
+    """
+    sources: dict[str, PairSource] = {}
+    sizes: dict[str, int] = {}
+    for src_lang, tgt_lang in pairs:
+        pair_dir = data_dir / pair_name(src_lang, tgt_lang)
+        src_path, tgt_path = pair_dir / f"{split}.src", pair_dir / f"{split}.tgt"
+        if not src_path.exists():
+            continue
+        name = pair_name(src_lang, tgt_lang)
+        sources[name] = partial(iter_line_pairs, src_path, tgt_path)
+        sizes[name] = count_lines(src_path)
+    return sources, sizes
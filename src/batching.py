@@ -0,0 +1,237 @@
+"""
+Length-bucketed batching for Seq2Seq training.
+Groups sentence pairs of similar length into batches under a padded-token
+budget, mirroring OpenNMT-py's `batch_type: tokens`.
+"""
+
+from collections.abc import Iterator, Sequence
+
+import numpy as np
+
+from src.config import MAX_BATCH_TOKENS, RANDOM_SEED
+from src.vocab import PAD_ID, tokenize
+
+# ============================================================
+# Batch construction
+# ============================================================
+
+
+def pack_sorted(lengths: np.ndarray, max_tokens: int) -> np.ndarray:
+    """
+    Greedily cut ascending `lengths` into runs whose padded size fits the budget.
+
+    A run `[i, j)` costs `(j - i) * lengths[j - 1]` tokens. Each step jumps
+    straight to the largest run that fits, so the loop runs once per batch,
+    not once per sentence. Sentences longer than the budget get a batch of
+    their own.
+
+    Returns:
+        Boundaries of each run as `[start, end)` pairs in a (n_batches, 2) array.
+    """
+    bounds = []
+    start, n = 0, len(lengths)
+    while start < n:
+        end = min(n, start + max(1, max_tokens // max(1, lengths[start])))
+        while end - start > 1 and (end - start) * lengths[end - 1] > max_tokens:
+            end = start + max(1, max_tokens // lengths[end - 1])
+        bounds.append((start, end))
+        start = end
+    return np.array(bounds, dtype=np.int64).reshape(-1, 2)
+
+
+def padding_efficiency(
+    batches: Sequence[np.ndarray], src_lengths: np.ndarray, tgt_lengths: np.ndarray
+) -> dict[str, float]:
+    """
+    Share of real (non-pad) tokens in the padded source and target tensors.
+
+    Also reports the batch count and the mean and largest padded batch size,
+    which bounds activation memory per step.
+    """
+    src_real = src_padded = tgt_real = tgt_padded = 0
+    cost = np.zeros(len(batches), dtype=np.int64)
+    for i, idx in enumerate(batches):
+        src, tgt = src_lengths[idx], tgt_lengths[idx]
+        src_real += src.sum()
+        tgt_real += tgt.sum()
+        src_padded += len(idx) * src.max()
+        tgt_padded += len(idx) * tgt.max()
+        cost[i] = len(idx) * max(src.max(), tgt.max())
+    return {
+        "batches": len(batches),
+        "mean_batch_size": sum(map(len, batches)) / max(1, len(batches)),
+        "src_efficiency": src_real / max(1, src_padded),
+        "tgt_efficiency": tgt_real / max(1, tgt_padded),
+        "mean_padded_tokens": float(cost.mean()) if len(cost) else 0.0,
+        "max_padded_tokens": int(cost.max(initial=0)),
+    }
+
+
+def fixed_size_batches(
+    n: int, batch_size: int, rng: np.random.Generator
+) -> list[np.ndarray]:
+    """Shuffled fixed-size batches, as `DataLoader(shuffle=True)` builds them."""
+    return np.array_split(rng.permutation(n), range(batch_size, n, batch_size))
+
+
+# ============================================================
+# Sampler
+# ============================================================
+
+
+class TokenBucketBatchSampler:
+    """
+    Batch sampler yielding index lists of similar-length pairs.
+
+    Pairs are sorted by their longer side (then source length), with ties
+    broken randomly, and packed so that `batch size * longest sentence` stays
+    within `max_tokens` for both sides. The order of batches is shuffled each
+    epoch. Pass it to `DataLoader(batch_sampler=...)`; call `set_epoch` before
+    every epoch to reshuffle. `state_dict`/`load_state_dict` save and restore
+    the position within an epoch, so resumed training continues with the
+    next unseen batch.
+
+    Args:
+        src_lengths: Encoded source length of every pair (incl. `<sos>`/`<eos>`).
+        tgt_lengths: Encoded target length of every pair.
+        max_tokens: Padded-token budget per batch.
+        shuffle: Randomize tie order and batch order; otherwise deterministic.
+        seed: Base seed, combined with the epoch number.
+    """
+
+    def __init__(
+        self,
+        src_lengths: Sequence[int],
+        tgt_lengths: Sequence[int],
+        max_tokens: int = MAX_BATCH_TOKENS,
+        shuffle: bool = True,
+        seed: int = RANDOM_SEED,
+    ):
+        self.src_lengths = np.asarray(src_lengths, dtype=np.int64)
+        self.tgt_lengths = np.asarray(tgt_lengths, dtype=np.int64)
+        if len(self.src_lengths) != len(self.tgt_lengths):
+            raise ValueError("Source and target lengths must have the same size.")
+        self.max_tokens = max_tokens
+        self.shuffle = shuffle
+        self.seed = seed
+        self.epoch = 0
+        self._start = 0  # batches of the current epoch to skip on the next pass
+        self._batches: list[np.ndarray] | None = None
+
+    @classmethod
+    def from_dataset(cls, dataset, **kwargs) -> "TokenBucketBatchSampler":
+        """Build from a `TokenShardDataset` without touching the token arrays."""
+        return cls(dataset.lengths("src"), dataset.lengths("tgt"), **kwargs)
+
+    @classmethod
+    def from_pairs(
+        cls, pairs: Sequence[tuple[str, str]], **kwargs
+    ) -> "TokenBucketBatchSampler":
+        """Build from raw (source, target) sentence pairs."""
+        src_lengths = [len(tokenize(s)) + 2 for s, _ in pairs]
+        tgt_lengths = [len(tokenize(t)) + 2 for _, t in pairs]
+        return cls(src_lengths, tgt_lengths, **kwargs)
+
+    def set_epoch(self, epoch: int) -> None:
+        if epoch != self.epoch:
+            self.epoch = epoch
+            self._start = 0
+            self._batches = None
+
+    def state_dict(self, consumed: int = 0) -> dict[str, int | bool]:
+        """
+        Sampler settings and position.
+
+        Args:
+            consumed: Batches of the current epoch already trained on. The
+                sampler cannot know this itself, as `DataLoader` prefetches.
+        """
+        return {
+            "seed": self.seed,
+            "max_tokens": self.max_tokens,
+            "shuffle": self.shuffle,
+            "epoch": self.epoch,
+            "consumed": consumed,
+        }
+
+    def load_state_dict(self, state: dict[str, int | bool]) -> None:
+        """Restore a `state_dict`; the next pass starts after its consumed batches."""
+        self.seed = state["seed"]
+        self.max_tokens = state["max_tokens"]
+        self.shuffle = state["shuffle"]
+        self.epoch = state["epoch"]
+        self._batches = None
+        self._start = state["consumed"]
+
+    def batches(self) -> list[np.ndarray]:
+        """Index arrays of the current epoch's batches, in yield order."""
+        if self._batches is None:
+            self._batches = self._build()
+        return self._batches
+
+    def _build(self) -> list[np.ndarray]:
+        rng = np.random.default_rng([self.seed, self.epoch])
+        longest = np.maximum(self.src_lengths, self.tgt_lengths)
+        ties = rng.random(len(longest)) if self.shuffle else np.zeros(len(longest))
+        order = np.lexsort((ties, self.src_lengths, longest))
+        bounds = pack_sorted(longest[order], self.max_tokens)
+        if self.shuffle:
+            bounds = bounds[rng.permutation(len(bounds))]
+        return [order[start:end] for start, end in bounds]
+
+    def __iter__(self) -> Iterator[list[int]]:
+        start, self._start = self._start, 0
+        for idx in self.batches()[start:]:
+            yield idx.tolist()
+
+    def __len__(self) -> int:
+        return len(self.batches()) - self._start
+
+    def report(self, baseline_batch_size: int | None = 64) -> dict[str, float]:
+        """
+        Print and return padding statistics for the current epoch.
+
+        With `baseline_batch_size`, the same statistics for shuffled
+        fixed-size batches are printed alongside for comparison.
+        """
+        stats = padding_efficiency(self.batches(), self.src_lengths, self.tgt_lengths)
+        print(
+            f"[Batching] {stats['batches']:,} batches, "
+            f"{stats['mean_batch_size']:.1f} pairs on average; padding efficiency "
+            f"src={stats['src_efficiency']:.1%}, tgt={stats['tgt_efficiency']:.1%}; "
+            f"max {stats['max_padded_tokens']:,} padded tokens per batch."
+        )
+        if baseline_batch_size:
+            rng = np.random.default_rng([self.seed, self.epoch])
+            fixed = fixed_size_batches(len(self.src_lengths), baseline_batch_size, rng)
+            base = padding_efficiency(fixed, self.src_lengths, self.tgt_lengths)
+            print(
+                f"[Batching] Fixed batches of {baseline_batch_size}: padding "
+                f"efficiency src={base['src_efficiency']:.1%}, "
+                f"tgt={base['tgt_efficiency']:.1%}; "
+                f"max {base['max_padded_tokens']:,} padded tokens per batch."
+            )
+        return stats
+
+
+# ============================================================
+# Collation
+# ============================================================
+
+
+def pad_sequences(seqs: Sequence[np.ndarray]) -> np.ndarray:
+    """Stack variable-length id arrays into a `<pad>`-padded int64 matrix."""
+    lengths = np.fromiter(map(len, seqs), np.int64, len(seqs))
+    out = np.full((len(seqs), lengths.max(initial=0)), PAD_ID, dtype=np.int64)
+    mask = np.arange(out.shape[1]) < lengths[:, None]
+    if len(seqs):
+        out[mask] = np.concatenate(seqs)
+    return out
+
+
+def collate_pairs(
+    batch: Sequence[tuple[np.ndarray, np.ndarray]],
+) -> tuple[np.ndarray, np.ndarray]:
+    """Pad a list of (source ids, target ids) pairs into two matrices."""
+    srcs, tgts = zip(*batch, strict=True)
+    return pad_sequences(srcs), pad_sequences(tgts)
@@ -0,0 +1,137 @@
+"""
+Content-addressed cache for pipeline stage outputs.
+Stores DataFrames as Parquet files named by a hash of everything that
+determines them: input file contents, configuration values, and stage code.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import sys
+from collections.abc import Callable, Iterable, Mapping
+from pathlib import Path
+
+import pandas as pd
+
+from src.config import CACHE_DIR, CACHE_MAX_BYTES
+
+# ============================================================
+# Hashing helpers
+# ============================================================
+
+_file_hashes: dict[tuple[str, int, int], str] = {}
+
+
+def hash_file(path: Path) -> str:
+    """BLAKE2 digest of a file's contents, memoized per (path, size, mtime)."""
+    stat = Path(path).stat()
+    memo_key = (str(Path(path).resolve()), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _file_hashes:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            while block := f.read(1 << 20):
+                digest.update(block)
+        _file_hashes[memo_key] = digest.hexdigest()
+    return _file_hashes[memo_key]
+
+
+def code_version(func: Callable) -> str:
+    """
+    Digest of the source of the module defining `func`.
+
+    Hashing the whole module (rather than the function alone) also catches
+    edits to the helpers it calls, e.g. `normalize_text` for `preprocess_corpus`.
+    """
+    module = sys.modules[func.__module__]
+    return hashlib.blake2b(
+        inspect.getsource(module).encode(), digest_size=16
+    ).hexdigest()
+
+
+def stage_key(
+    stage: str,
+    code: str,
+    params: Mapping[str, object] | None = None,
+    inputs: Iterable[str] = (),
+) -> str:
+    """Combine a stage's name, code version, parameters, and input digests."""
+    payload = json.dumps(
+        {
+            "stage": stage,
+            "code": code,
+            "params": dict(params or {}),
+            "inputs": list(inputs),
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+# ============================================================
+# Stage cache
+# ============================================================
+
+
+class StageCache:
+    """
+    Directory of Parquet stage outputs with size-based LRU eviction.
+
+    Entries are never modified in place: a key fully determines its content,
+    so a hit is always valid and a stale entry is simply never looked up
+    again. Reads refresh an entry's mtime, and once the directory grows past
+    `max_bytes` the least recently used entries are deleted.
+    """
+
+    def __init__(self, root: Path = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+
+    def path(self, stage: str, key: str) -> Path:
+        return self.root / f"{stage}-{key}.parquet"
+
+    def load(self, stage: str, key: str) -> pd.DataFrame | None:
+        """Return the cached output for `key`, or None on a miss."""
+        path = self.path(stage, key)
+        if not path.exists():
+            return None
+        os.utime(path)  # mark as recently used
+        return pd.read_parquet(path)
+
+    def save(self, stage: str, key: str, df: pd.DataFrame) -> Path:
+        """Store a stage output, then evict old entries if over budget."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.path(stage, key)
+        tmp_path = path.with_suffix(".tmp")
+        df.to_parquet(tmp_path, index=False)
+        tmp_path.replace(path)  # atomic, so readers never see partial files
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: Path | None = None) -> list[Path]:
+        """Delete least recently used entries until the cache fits in budget."""
+        entries = []
+        for p in self.root.glob("*.parquet"):
+            try:
+                stat = p.stat()
+            except FileNotFoundError:  # evicted by a concurrent run
+                continue
+            entries.append((stat.st_mtime, stat.st_size, p))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = []
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+            removed.append(path)
+        if removed:
+            print(f"[Cache] Evicted {len(removed)} entries to stay under budget.")
+        return removed
+
+    def size(self) -> int:
+        return sum(p.stat().st_size for p in self.root.glob("*.parquet"))
@@ -1,13 +1,13 @@
 """
 Global configuration file for the Philippine Machine Translation project.
 Defines shared paths, constants, and helper functions for all notebooks and modules.
+Importing it has no side effects; call `setup()` once at the start of a run.
 """
 
+import os
 import random
 from pathlib import Path
 
-import numpy as np
-
 # ============================================================
 # Project directories
 # ============================================================
@@ -23,6 +23,7 @@ AUGMENTED_DIR = DATA_DIR / "augmented"
 MODELS_DIR = DATA_DIR / "models"
 TRANSLATIONS_DIR = DATA_DIR / "translations"
 RESULTS_DIR = DATA_DIR / "results"
+CACHE_DIR = DATA_DIR / "cache"
 
 # ============================================================
 # Language configuration
@@ -39,6 +40,21 @@ LANGUAGE_PAIRS = [
     ("tagalog", "spanish"),
 ]
 
+# ISO 639-3 codes, used to name mixed splits (e.g. 'aug-cbk')
+LANGUAGE_CODES = {
+    "bikolano": "bcl",
+    "cebuano": "ceb",
+    "chavacano": "cbk",
+    "ilokano": "ilo",
+    "ivatan": "ivv",
+    "kapampangan": "pam",
+    "pangasinense": "pag",
+    "spanish": "spa",
+    "tagalog": "tgl",
+    "tausug": "tsg",
+    "yami": "tao",
+}
+
 # Default pair to train
 SOURCE_LANG = LANGUAGE_PAIRS[0][0]
 TARGET_LANG = LANGUAGE_PAIRS[0][1]
@@ -46,6 +62,17 @@ TARGET_LANG = LANGUAGE_PAIRS[0][1]
 SOURCE_COL = "language1"
 TARGET_COL = "language2"
 
+
+def pair_name(src_lang: str, tgt_lang: str) -> str:
+    """Directory-friendly name of a language pair, e.g. 'cebuano-spanish'."""
+    return f"{src_lang}-{tgt_lang}"
+
+
+def mix_split_name(aux_lang: str) -> str:
+    """Split of a corpus mixed with `aux_lang` data, e.g. 'aug-cbk' for chavacano."""
+    return f"aug-{LANGUAGE_CODES.get(aux_lang, aux_lang)}"
+
+
 # ============================================================
 # Reproducibility
 # ============================================================
@@ -55,6 +82,8 @@ RANDOM_SEED = 26
 
 def set_seed(seed: int = RANDOM_SEED) -> None:
     """Ensure reproducibility across modules."""
+    import numpy as np  # keeps `import src.config` free of third-party imports
+
     random.seed(seed)
     np.random.seed(seed)
 
@@ -72,6 +101,60 @@ STRIP_EXTRA_SPACES = True
 
 TRAIN_SPLIT = 0.9
 
+# Near-duplicate removal (see src/near_duplicates.py) is off by default for
+# every entry point; set an estimated Jaccard similarity of character shingles
+# (e.g. 0.8) to drop near-duplicate pairs in the pipeline and the notebooks alike
+NEAR_DUP_THRESHOLD = None
+SHINGLE_SIZE = 5
+MINHASH_PERMUTATIONS = 128
+
+# ============================================================
+# Vocabulary
+# ============================================================
+
+VOCAB_MAX_SIZE = 15000  # same cap as src_vocab_size/tgt_vocab_size in configs/
+VOCAB_MIN_COUNT = 1
+
+# ============================================================
+# Model (GRU Seq2Seq with attention)
+# ============================================================
+
+EMB_DIM = 300
+HID_DIM = 512
+N_LAYERS = 2
+DROPOUT = 0.2
+
+# ============================================================
+# Training
+# ============================================================
+
+EPOCHS = 20
+BATCH_SIZE = 64
+PATIENCE = 3
+MAX_BATCH_TOKENS = 4096  # padded tokens per batch, like `batch_type: tokens`
+LEARNING_RATE = 0.001
+MAX_GRAD_NORM = 5.0
+SAVE_CHECKPOINT_STEPS = 500  # same as `save_checkpoint_steps` in configs/
+KEEP_CHECKPOINT = 3  # step checkpoints kept on disk; -1 keeps all
+
+# ============================================================
+# Inference
+# ============================================================
+
+MAX_DECODE_LEN = 50
+BEAM_SIZE = 1  # 1 = greedy decoding
+DECODE_BATCH_SIZE = 128
+
+# ============================================================
+# Translation server
+# ============================================================
+
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+SERVER_MAX_BATCH_SIZE = 32  # sentences decoded together
+SERVER_MAX_WAIT_MS = 10  # how long the first request waits for others to join
+SERVER_CACHE_SIZE = 10_000  # translations kept in the LRU cache
+
 # ============================================================
 # Data augmentation
 # ============================================================
@@ -83,6 +166,25 @@ DUP_PROB = 0.01
 
 MIX_RATIO = 0.2
 
+# Auxiliary pair mixed into a pair's training data by the multi-pair runner
+MIX_PAIRS = {("cebuano", "spanish"): ("chavacano", "spanish")}
+
+# ============================================================
+# Stage cache
+# ============================================================
+
+CACHE_MAX_BYTES = 5 * 1024**3  # least recently used stage outputs are evicted
+
+# ============================================================
+# Instrumentation (see src/instrumentation.py)
+# ============================================================
+
+# JSON-lines file receiving per-stage timings, throughput, and peak memory,
+# and directory for per-stage profiles; both are off when unset
+METRICS_PATH = os.environ.get("PMT_METRICS_PATH")
+PROFILE_DIR = os.environ.get("PMT_PROFILE_DIR")
+PROFILER = os.environ.get("PMT_PROFILER", "cprofile")  # or "sample"
+
 # ============================================================
 # Utility
 # ============================================================
@@ -94,7 +196,13 @@ def ensure_dirs():
         path.mkdir(parents=True, exist_ok=True)
 
 
-ensure_dirs()
-set_seed()
+def setup(seed: int = RANDOM_SEED) -> None:
+    """
+    Create the data directories and seed the global RNGs.
 
-print("[CONFIG] Directories ensured and random seed set.")
+    Notebooks and command-line entry points call this once; library code and
+    worker processes never do, so importing `src` stays cheap and harmless.
+    """
+    ensure_dirs()
+    set_seed(seed)
+    print("[CONFIG] Directories ensured and random seed set.")
@@ -0,0 +1,351 @@
+"""
+Corpus-level evaluation of many translation systems with BLEU, chrF, and TER.
+Extracts per-sentence sufficient statistics in parallel against cached
+references, then scores paired bootstrap resamples as NumPy array operations.
+
+Run as a script:
+    python -m src.evaluation data/translations/test.tgt \\
+        GRU-Base=data/translations/base.txt GRU-Aug=data/translations/aug.txt \\
+        --baseline GRU-Base
+"""
+
+import argparse
+import os
+from collections.abc import Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sacrebleu import BLEU, CHRF, TER
+from sacrebleu.metrics.base import Metric
+
+from src.config import RESULTS_DIR
+from src.utils import load_file
+
+METRICS = ("BLEU", "CHRF", "TER")
+BOOTSTRAP_SAMPLES = 1000
+BOOTSTRAP_SEED = 12345  # sacrebleu's default `SACREBLEU_SEED`
+
+# ============================================================
+# Sufficient statistics
+# ============================================================
+
+
+def build_metrics(references: Sequence[str] | None = None) -> dict[str, Metric]:
+    """
+    sacrebleu metrics (default settings) with the references pre-processed.
+
+    The reference n-grams and lengths are extracted once here and reused for
+    every system scored with these metric objects.
+    """
+    refs = [list(references)] if references is not None else None
+    return {
+        "BLEU": BLEU(references=refs),
+        "CHRF": CHRF(references=refs),
+        "TER": TER(references=refs),
+    }
+
+
+_worker_metrics: dict[str, Metric] = {}
+
+
+def _init_worker(references: Sequence[str]) -> None:
+    _worker_metrics.update(build_metrics(references))
+
+
+def _sentence_stats(metric_name: str, hypotheses: Sequence[str]) -> np.ndarray:
+    """(n_sentences, n_stats) array of one system's statistics for one metric."""
+    metric = _worker_metrics[metric_name]
+    stats = metric._extract_corpus_statistics(hypotheses, None)
+    return np.asarray(stats, dtype=np.float64)
+
+
+def sentence_statistics(
+    systems: Mapping[str, Sequence[str]],
+    references: Sequence[str],
+    n_workers: int | None = None,
+) -> dict[str, dict[str, np.ndarray]]:
+    """
+    Per-sentence sufficient statistics of every system for every metric.
+
+    Each (system, metric) pair is a separate task, so the slow TER edit
+    distances of different systems run in parallel. Every worker caches the
+    reference statistics once in its initializer.
+
+    Args:
+        systems: Hypotheses per system name, aligned with `references`.
+        references: One reference per sentence.
+        n_workers: Worker processes; defaults to the CPU count, and 1 (or a
+            single task) runs in the current process.
+
+    Returns:
+        `{system: {metric: stats}}` with float64 arrays of shape
+        (n_sentences, n_stats).
+    """
+    for name, hyps in systems.items():
+        if len(hyps) != len(references):
+            raise ValueError(
+                f"{name}: {len(hyps)} hypotheses for {len(references)} references."
+            )
+
+    tasks = [(metric, name) for name in systems for metric in METRICS]
+    n_workers = min(n_workers or os.cpu_count() or 1, len(tasks))
+    if n_workers <= 1:
+        _init_worker(references)
+        arrays = [_sentence_stats(metric, systems[name]) for metric, name in tasks]
+    else:
+        with ProcessPoolExecutor(
+            n_workers, initializer=_init_worker, initargs=(list(references),)
+        ) as pool:
+            futures = [
+                pool.submit(_sentence_stats, metric, list(systems[name]))
+                for metric, name in tasks
+            ]
+            arrays = [f.result() for f in futures]
+
+    stats: dict[str, dict[str, np.ndarray]] = {name: {} for name in systems}
+    for (metric, name), array in zip(tasks, arrays, strict=True):
+        stats[name][metric] = array
+    return stats
+
+
+# ============================================================
+# Vectorized scores
+# ============================================================
+
+
+def bleu_from_stats(stats: np.ndarray, max_order: int = 4) -> np.ndarray:
+    """
+    BLEU of aggregated statistics, row-wise.
+
+    Matches `BLEU()._compute_score_from_stats` with its defaults: `exp`
+    smoothing and no effective order. Columns are
+    `[hyp_len, ref_len, correct_1..n, total_1..n]`.
+    """
+    sys_len, ref_len = stats[..., 0], stats[..., 1]
+    correct = stats[..., 2 : 2 + max_order]
+    total = stats[..., 2 + max_order : 2 + 2 * max_order]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bp = np.where(sys_len < ref_len, np.exp(1 - ref_len / sys_len), 1.0)
+        bp = np.where((sys_len < ref_len) & (sys_len <= 0), 0.0, bp)
+        # NIST smoothing: each zero-match order halves the pseudo-count again
+        smooth = 2.0 ** np.cumsum(correct == 0, axis=-1)
+        precisions = np.where(
+            correct == 0, 100.0 / (smooth * total), 100.0 * correct / total
+        )
+        # Orders after the first one without any n-grams stay at zero precision
+        reached = np.cumprod(total > 0, axis=-1).astype(bool)
+        precisions = np.where(reached, precisions, 0.0)
+        log_precisions = np.where(precisions > 0, np.log(precisions), -9999999999)
+    score = bp * np.exp(log_precisions.mean(axis=-1))
+    return np.where(correct.any(axis=-1), score, 0.0)
+
+
+def chrf_from_stats(stats: np.ndarray, beta: int = 2) -> np.ndarray:
+    """
+    chrF of aggregated statistics, row-wise.
+
+    Matches `CHRF()._compute_score_from_stats` with its defaults (no eps
+    smoothing). Columns are `[hyp, ref, match]` triples per n-gram order.
+    """
+    eps = 1e-16
+    n_hyp, n_ref, n_match = stats[..., 0::3], stats[..., 1::3], stats[..., 2::3]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prec = np.where(n_hyp > 0, n_match / n_hyp, eps)
+        rec = np.where(n_ref > 0, n_match / n_ref, eps)
+        effective = (n_hyp > 0) & (n_ref > 0)
+        order = effective.sum(axis=-1)
+        avg_prec = np.where(order > 0, (prec * effective).sum(axis=-1) / order, 0.0)
+        avg_rec = np.where(order > 0, (rec * effective).sum(axis=-1) / order, 0.0)
+        factor = beta**2
+        score = (1 + factor) * avg_prec * avg_rec / (factor * avg_prec + avg_rec)
+    return np.where(avg_prec + avg_rec > 0, 100 * score, 0.0)
+
+
+def ter_from_stats(stats: np.ndarray) -> np.ndarray:
+    """TER of aggregated `[edits, ref_len]` statistics, row-wise."""
+    edits, ref_len = stats[..., 0], stats[..., 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        score = np.where(ref_len > 0, edits / ref_len, (edits > 0).astype(float))
+    return 100 * score
+
+
+SCORE_FNS = {"BLEU": bleu_from_stats, "CHRF": chrf_from_stats, "TER": ter_from_stats}
+
+
+# ============================================================
+# Paired bootstrap resampling
+# ============================================================
+
+
+def resample_counts(
+    n_sentences: int, n_samples: int = BOOTSTRAP_SAMPLES, seed: int = BOOTSTRAP_SEED
+) -> np.ndarray:
+    """
+    How often each sentence is drawn in each bootstrap resample.
+
+    Uses the same draws as sacrebleu's `--paired-bs` for a given seed. As a
+    (n_samples, n_sentences) count matrix, the summed statistics of all
+    resamples are one matrix product instead of a gather of
+    (n_samples, n_sentences, n_stats) values.
+    """
+    rng = np.random.default_rng(seed)
+    idxs = rng.choice(n_sentences, size=(n_samples, n_sentences), replace=True)
+    flat = idxs + np.arange(n_samples)[:, None] * n_sentences
+    counts = np.bincount(flat.ravel(), minlength=n_samples * n_sentences)
+    return counts.reshape(n_samples, n_sentences).astype(np.float64)
+
+
+def confidence_interval(scores: np.ndarray) -> tuple[float, float]:
+    """Mean and half-width of the 95% interval, as in sacrebleu's `estimate_ci`."""
+    scores = np.sort(scores)
+    lower_idx = len(scores) // 40
+    upper_idx = len(scores) - lower_idx - 1
+    return float(scores.mean()), float(0.5 * (scores[upper_idx] - scores[lower_idx]))
+
+
+def paired_bootstrap(
+    stats: Mapping[str, Mapping[str, np.ndarray]],
+    baseline: str | None = None,
+    n_samples: int = BOOTSTRAP_SAMPLES,
+    seed: int = BOOTSTRAP_SEED,
+) -> pd.DataFrame:
+    """
+    Bootstrap confidence intervals and paired significance against a baseline.
+
+    All systems are scored on the same resamples. The p-value follows
+    sacrebleu's paired bootstrap test: the share of resamples whose centered
+    absolute score difference exceeds the observed one.
+
+    Args:
+        stats: Output of `sentence_statistics`.
+        baseline: System the others are compared to; no p-values if `None`.
+        n_samples: Number of bootstrap resamples.
+        seed: Seed of the resampling RNG.
+
+    Returns:
+        One row per (system, metric) with `Score`, bootstrap `Mean`, `CI`
+        (95% half-width), and `p-value` (NaN for the baseline).
+    """
+    n_sentences = len(next(iter(next(iter(stats.values())).values())))
+    counts = resample_counts(n_sentences, n_samples, seed)
+
+    rows = []
+    for metric in METRICS:
+        score_fn = SCORE_FNS[metric]
+        samples = {name: score_fn(counts @ s[metric]) for name, s in stats.items()}
+        scores = {name: float(score_fn(s[metric].sum(0))) for name, s in stats.items()}
+        for name in stats:
+            mean, ci = confidence_interval(samples[name])
+            p_value = np.nan
+            if baseline is not None and name != baseline:
+                real_diff = abs(scores[name] - scores[baseline])
+                diffs = np.abs(samples[name] - samples[baseline])
+                diffs -= diffs.mean()
+                p_value = (np.sum(diffs > real_diff) + 1) / (n_samples + 1)
+            rows.append(
+                {
+                    "Model": name,
+                    "Metric": metric,
+                    "Score": scores[name],
+                    "Mean": mean,
+                    "CI": ci,
+                    "p-value": p_value,
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+# ============================================================
+# Evaluation
+# ============================================================
+
+
+def evaluate(
+    systems: Mapping[str, Sequence[str]],
+    references: Sequence[str],
+    baseline: str | None = None,
+    n_samples: int = BOOTSTRAP_SAMPLES,
+    n_workers: int | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Score every system and test it against `baseline`.
+
+    Returns:
+        (summary, significance): `summary` is indexed by `Model` with
+        `BLEU`, `CHRF`, and `TER` columns (the layout of
+        `metrics_summary.csv`); `significance` is `paired_bootstrap` output.
+    """
+    stats = sentence_statistics(systems, references, n_workers)
+    metrics = build_metrics()
+    summary = pd.DataFrame(
+        [
+            {
+                "Model": name,
+                **{
+                    metric: metrics[metric]._aggregate_and_compute(s.tolist()).score
+                    for metric, s in system_stats.items()
+                },
+            }
+            for name, system_stats in stats.items()
+        ]
+    ).set_index("Model")
+    significance = (
+        paired_bootstrap(stats, baseline, n_samples) if n_samples > 0 else None
+    )
+    return summary, significance
+
+
+def print_results(summary: pd.DataFrame, significance: pd.DataFrame | None) -> None:
+    """Print each system's scores with bootstrap mean ± CI and p-value."""
+    for name, row in summary.iterrows():
+        print(f"\n[{name}]")
+        for metric in METRICS:
+            line = f"{metric}: {row[metric]:.2f}"
+            if significance is not None:
+                sig = significance[
+                    (significance["Model"] == name) & (significance["Metric"] == metric)
+                ].iloc[0]
+                line += f" ({sig['Mean']:.2f} ± {sig['CI']:.2f})"
+                if not np.isnan(sig["p-value"]):
+                    line += f", p = {sig['p-value']:.4f}"
+            print(line)
+
+
+# ============================================================
+# Command-line entry point
+# ============================================================
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("references")
+    parser.add_argument("systems", nargs="+", metavar="NAME=PATH")
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--samples", type=int, default=BOOTSTRAP_SAMPLES)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output-dir", default=RESULTS_DIR)
+    args = parser.parse_args(argv)
+
+    references = load_file(Path(args.references))
+    systems = {}
+    for spec in args.systems:
+        name, _, path = spec.partition("=")
+        systems[name] = load_file(Path(path or name))
+
+    summary, significance = evaluate(
+        systems, references, args.baseline, args.samples, args.workers
+    )
+    print_results(summary, significance)
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    summary.to_csv(output_dir / "metrics_summary.csv")
+    if significance is not None:
+        significance.to_csv(output_dir / "metrics_significance.csv", index=False)
+    print(f"\n[Evaluation] Results saved to {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Self-contained inference artifacts for CPU deployment.
+Turns a training checkpoint into a TorchScript file with its hyperparameters
+and vocabularies embedded, optionally with int8 dynamic quantization.
+
+Run as a script:
+    python -m src.export outputs/gru_base_model.pt --compare \\
+        data/translations/test.src data/translations/test.tgt
+"""
+
+import argparse
+import json
+import time
+import warnings
+from collections.abc import Sequence
+from pathlib import Path
+
+import pandas as pd
+import sacrebleu
+import torch
+import torch.nn as nn
+
+from src.config import MAX_DECODE_LEN
+from src.inference import translate_batch
+from src.model import Decoder, Encoder, load_checkpoint, model_hparams
+from src.utils import load_file
+from src.vocab import EOS_ID, PAD_ID, SOS_ID, Vocab
+
+ARTIFACT_FORMAT = 1
+META_FILE = "meta.json"
+
+# ============================================================
+# Inference module
+# ============================================================
+
+
+class InferenceModel(nn.Module):
+    """
+    Encoder, decoder, and greedy search in one scriptable module.
+
+    `forward` maps a padded batch of source ids to generated target ids, so
+    a loaded artifact can translate with nothing but `torch.jit.load`. The
+    `encoder` and `decoder` submodules stay accessible, which lets
+    `translate_batch` (including beam search) use the artifact directly.
+    """
+
+    def __init__(self, encoder: Encoder, decoder: Decoder):
+        super().__init__()
+        self.encoder = encoder
+        self.decoder = decoder
+        # TorchScript cannot read module-level globals, so keep them as attributes
+        self.pad_id, self.sos_id, self.eos_id = PAD_ID, SOS_ID, EOS_ID
+
+    @torch.jit.export
+    def encode(self, src: torch.Tensor):
+        """Same as `Seq2Seq.encode`."""
+        mask = src != self.pad_id
+        encoder_outputs, hidden = self.encoder(src, mask.sum(1))
+        keys = self.decoder.attention.project_keys(encoder_outputs)
+        return encoder_outputs, hidden, keys, mask
+
+    def forward(self, src: torch.Tensor, max_len: int = MAX_DECODE_LEN):
+        encoder_outputs, hidden, keys, mask = self.encode(src)
+        batch_size = src.size(0)
+        out = torch.full(
+            (batch_size, max_len), self.pad_id, dtype=torch.long, device=src.device
+        )
+        finished = torch.zeros(batch_size, dtype=torch.bool, device=src.device)
+        input_tok = torch.full(
+            (batch_size,), self.sos_id, dtype=torch.long, device=src.device
+        )
+        for t in range(max_len):
+            output, hidden = self.decoder(
+                input_tok, hidden, encoder_outputs, keys, mask
+            )
+            input_tok = output.argmax(1).masked_fill(finished, self.pad_id)
+            out[:, t] = input_tok
+            finished = finished | (input_tok == self.eos_id)
+            if bool(finished.all()):
+                break
+        return out
+
+
+def quantize(model: nn.Module) -> nn.Module:
+    """
+    Int8 dynamic quantization of the GRU and Linear layers.
+
+    Weights are stored as int8 and activations are quantized on the fly, so
+    no calibration data is needed. Embeddings stay in fp32, and so does
+    `Attention.attn`, whose weight is split into its decoder and encoder halves.
+    """
+    layers = {
+        name
+        for name, module in model.named_modules()
+        if isinstance(module, (nn.GRU, nn.Linear)) and not name.endswith("attn")
+    }
+    with warnings.catch_warnings():
+        # Still the only dynamic int8 path for nn.GRU, despite the deprecation
+        warnings.simplefilter("ignore", DeprecationWarning)
+        warnings.simplefilter("ignore", UserWarning)
+        return torch.ao.quantization.quantize_dynamic(model, layers, dtype=torch.qint8)
+
+
+# ============================================================
+# Export and loading
+# ============================================================
+
+
+def export_artifact(
+    checkpoint_path: Path,
+    output_path: Path | None = None,
+    int8: bool = True,
+) -> Path:
+    """
+    Convert a training checkpoint into a standalone inference artifact.
+
+    Args:
+        checkpoint_path: Checkpoint written by training (`*.pt`).
+        output_path: Defaults to `<checkpoint>.int8.ts` or `<checkpoint>.fp32.ts`.
+        int8: Apply int8 dynamic quantization before scripting.
+
+    Returns:
+        Path of the written artifact.
+    """
+    checkpoint_path = Path(checkpoint_path)
+    suffix = "int8" if int8 else "fp32"
+    output_path = Path(output_path or checkpoint_path.with_suffix(f".{suffix}.ts"))
+
+    model, src_vocab, tgt_vocab = load_checkpoint(checkpoint_path, torch.device("cpu"))
+    meta = {
+        "format": ARTIFACT_FORMAT,
+        "source_checkpoint": checkpoint_path.name,
+        "quantization": "dynamic-int8" if int8 else None,
+        "hparams": model_hparams(model.state_dict()),
+        "max_len": MAX_DECODE_LEN,
+        "src_vocab": src_vocab.state_dict(),
+        "tgt_vocab": tgt_vocab.state_dict(),
+    }
+
+    module = InferenceModel(model.encoder, model.decoder).eval()
+    if int8:
+        module = quantize(module)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        scripted = torch.jit.script(module)
+        torch.jit.save(
+            scripted, str(output_path), _extra_files={META_FILE: json.dumps(meta)}
+        )
+
+    size_mb = output_path.stat().st_size / 1024**2
+    print(f"[Export] {checkpoint_path.name} -> {output_path} ({size_mb:.1f} MB)")
+    return output_path
+
+
+def load_artifact(path: Path) -> tuple[torch.jit.ScriptModule, Vocab, Vocab, dict]:
+    """
+    Load an artifact on the CPU without any model code.
+
+    Returns:
+        (module, src_vocab, tgt_vocab, meta)
+    """
+    extra_files = {META_FILE: ""}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        module = torch.jit.load(str(path), map_location="cpu", _extra_files=extra_files)
+    meta = json.loads(extra_files[META_FILE])
+    if meta.get("format") != ARTIFACT_FORMAT:
+        raise ValueError(f"Unsupported artifact format in {path}: {meta.get('format')}")
+    module.eval()
+    return (
+        module,
+        Vocab.from_state(meta["src_vocab"]),
+        Vocab.from_state(meta["tgt_vocab"]),
+        meta,
+    )
+
+
+# ============================================================
+# fp32 vs int8 comparison
+# ============================================================
+
+
+def compare_variants(
+    checkpoint_path: Path,
+    test_src: Sequence[str],
+    test_tgt: Sequence[str],
+    output_dir: Path | None = None,
+    beam_size: int = 1,
+) -> pd.DataFrame:
+    """
+    Time and score the fp32 checkpoint against its fp32 and int8 artifacts.
+
+    All variants decode the same sentences through `translate_batch`, so the
+    comparison isolates the model representation. `Agreement` is the share
+    of sentences translated exactly as the fp32 checkpoint does.
+    """
+    checkpoint_path = Path(checkpoint_path)
+    output_dir = Path(output_dir or checkpoint_path.parent)
+    variants = {"fp32 checkpoint": checkpoint_path}
+    for int8 in (False, True):
+        name = "int8 scripted" if int8 else "fp32 scripted"
+        suffix = "int8" if int8 else "fp32"
+        variants[name] = export_artifact(
+            checkpoint_path, output_dir / f"{checkpoint_path.stem}.{suffix}.ts", int8
+        )
+
+    rows, reference = [], None
+    for name, path in variants.items():
+        if path == checkpoint_path:
+            model, src_vocab, tgt_vocab = load_checkpoint(path, torch.device("cpu"))
+        else:
+            model, src_vocab, tgt_vocab, _ = load_artifact(path)
+
+        start = time.perf_counter()
+        hyps = translate_batch(model, test_src, src_vocab, tgt_vocab, beam_size)
+        elapsed = time.perf_counter() - start
+        reference = reference or hyps
+        rows.append(
+            {
+                "Variant": name,
+                "Size (MB)": round(path.stat().st_size / 1024**2, 1),
+                "Seconds": round(elapsed, 2),
+                "Sentences/s": round(len(test_src) / elapsed, 1),
+                "BLEU": round(sacrebleu.corpus_bleu(hyps, [list(test_tgt)]).score, 2),
+                "Agreement": round(
+                    sum(h == r for h, r in zip(hyps, reference, strict=True))
+                    / max(1, len(hyps)),
+                    3,
+                ),
+            }
+        )
+
+    results = pd.DataFrame(rows)
+    print(results.to_string(index=False))
+    return results
+
+
+# ============================================================
+# Command-line entry point
+# ============================================================
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("checkpoint")
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--fp32", action="store_true", help="Skip quantization")
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("TEST_SRC", "TEST_TGT"),
+        help="Compare latency and BLEU of fp32 and int8 on a test set",
+    )
+    parser.add_argument("--beam-size", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=None, help="Torch CPU threads")
+    args = parser.parse_args(argv)
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    if args.compare:
+        compare_variants(
+            Path(args.checkpoint),
+            load_file(Path(args.compare[0])),
+            load_file(Path(args.compare[1])),
+            Path(args.output) if args.output else None,
+            args.beam_size,
+        )
+    else:
+        export_artifact(
+            Path(args.checkpoint),
+            Path(args.output) if args.output else None,
+            int8=not args.fp32,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,111 +1,282 @@
-import re
+"""
+Filtering of noisy parallel corpora (e.g., translatewiki UI strings).
+Streams aligned line pairs, rejects placeholders, markup, and fragments, and
+reports which rule rejected each pair.
 
-import pandas as pd
+Run as a script:
+    python -m src.filter_parallel_corpus <src-file> <tgt-file> --n-jobs 4
+    python -m src.filter_parallel_corpus --archive data/translations/translatewiki.zip
+"""
 
-# Define file names
-ceb_file_name = "translatewiki.ceb-es.ceb"
-es_file_name = "translatewiki.ceb-es.es"
+import argparse
+import csv
+import errno
+import re
+from collections import Counter, deque
+from collections.abc import Iterable, Iterator
+from contextlib import ExitStack
+from pathlib import Path
 
-# Define output file names
-out_ceb_file = "meaningful.ceb"
-out_es_file = "meaningful.es"
-out_csv_file = "meaningful_pairs.csv"
+from src.utils import (
+    archive_members,
+    chunked,
+    iter_archive_pairs,
+    iter_line_pairs,
+    parallel_imap,
+)
 
 # Define filtering rules
 min_words = 4
 
+FILTER_CHUNK_SIZE = 50_000
+
 # Regexes to filter out UI text, placeholders, and markup
-bad_patterns = [
-    re.compile(r"\$\d"),  # Matches $1, $2, etc.
-    re.compile(r"''+"),  # Matches '' (italics) or ''' (bold)
-    re.compile(r"<[a-zA-Z/].*?>"),  # Matches HTML tags (<strong>, <i>, <nowiki>)
-    re.compile(r"\[\[|\]\]"),  # Matches wiki link markup [[ or ]]
-    re.compile(r"\[\w+://"),  # Matches external links [http://...]
-    re.compile(r"\[\$\d"),  # Matches placeholders in links [$1
-    re.compile(r"%\(.*\)."),  # Matches %(...)s placeholders
-    re.compile(r"https?://"),  # Matches raw http/https URLs
-    re.compile(r"^\(.*\)$"),  # Matches lines that are just parentheticals
-    re.compile(r"Problema sa (ekspresyon|Lua)"),  # Matches specific error messages
-    re.compile(r"scan failed"),  # Matches specific error messages
-    re.compile(r"\{\{.*\}\}"),  # Matches {{PLURAL...}}
-    re.compile(r"user_n"),  # Matches 'user_n'
-    re.compile(r"^[A-Z][a-z]+$"),  # Matches single capitalized words (days/months)
-    re.compile(r"^[a-z]+$"),  # Matches single lowercase words
-    re.compile(r"^[A-Z]{2,3}$"),  # Matches 2-3 letter acronyms (DOM, LUN)
-]
-
-# Lists to store good pairs
-good_ceb_sentences = []
-good_es_sentences = []
-
-try:
-    # Read both files
-    with open(ceb_file_name, encoding="utf-8") as f_ceb:
-        ceb_lines = f_ceb.readlines()
-
-    with open(es_file_name, encoding="utf-8") as f_es:
-        es_lines = f_es.readlines()
-
-    # Check if files are aligned
-    if len(ceb_lines) != len(es_lines):
-        print(
-            f"Error: File line counts do not match. "
-            f"Cebuano: {len(ceb_lines)}, Spanish: {len(es_lines)}"
-        )
-    else:
-        print(f"Processing {len(ceb_lines)} line pairs with strict filters...")
+filter_rules: dict[str, re.Pattern] = {
+    "placeholder": re.compile(r"\$\d"),  # Matches $1, $2, etc.
+    "wiki_emphasis": re.compile(r"''+"),  # Matches '' (italics) or ''' (bold)
+    "html_tag": re.compile(r"<[a-zA-Z/].*?>"),  # Matches <strong>, <i>, <nowiki>
+    "wiki_link": re.compile(r"\[\[|\]\]"),  # Matches wiki link markup [[ or ]]
+    "external_link": re.compile(r"\[\w+://"),  # Matches external links [http://...]
+    "link_placeholder": re.compile(r"\[\$\d"),  # Matches placeholders in links [$1
+    "format_placeholder": re.compile(r"%\(.*\)."),  # Matches %(...)s placeholders
+    "url": re.compile(r"https?://"),  # Matches raw http/https URLs
+    "parenthetical": re.compile(r"^\(.*\)$"),  # Matches lines that are just (...)
+    "error_message": re.compile(r"Problema sa (ekspresyon|Lua)"),  # Error messages
+    "scan_failed": re.compile(r"scan failed"),  # Matches specific error messages
+    "template": re.compile(r"\{\{.*\}\}"),  # Matches {{PLURAL...}}
+    "user_n": re.compile(r"user_n"),  # Matches 'user_n'
+    "capitalized_word": re.compile(r"^[A-Z][a-z]+$"),  # Single words (days/months)
+    "lowercase_word": re.compile(r"^[a-z]+$"),  # Matches single lowercase words
+    "acronym": re.compile(r"^[A-Z]{2,3}$"),  # Matches 2-3 letter acronyms (DOM, LUN)
+}
 
-        # Iterate through pairs
-        for i in range(len(ceb_lines)):
-            ceb_line = ceb_lines[i].strip()
-            es_line = es_lines[i].strip()
+bad_patterns = list(filter_rules.values())
 
-            # Check word count
-            ceb_word_count = len(ceb_line.split())
-            es_word_count = len(es_line.split())
+TOO_SHORT = "too_short"
 
-            is_good = True
+# ============================================================
+# Combined matcher
+# ============================================================
 
-            # Apply filters
-            if ceb_word_count < min_words or es_word_count < min_words:
-                is_good = False
-            else:
-                # Check for bad patterns in both lines
-                for pattern in bad_patterns:
-                    if pattern.search(ceb_line) or pattern.search(es_line):
-                        is_good = False
-                        break  # No need to check other patterns for this line
-
-            # If all checks passed, add to our lists
-            if is_good:
-                good_ceb_sentences.append(ceb_line)
-                good_es_sentences.append(es_line)
-
-        print(
-            f"Found {len(good_ceb_sentences)} meaningful sentence pairs "
-            f"after strict filtering."
+
+def _combine(patterns: Iterable[re.Pattern]) -> re.Pattern | None:
+    patterns = list(patterns)
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{p.pattern})" for p in patterns))
+
+
+# Rules anchored at the start of the line only need to be tried at position 0,
+# so they are matched separately instead of being scanned along every line.
+_anchored = _combine(p for p in bad_patterns if p.pattern.startswith("^"))
+_unanchored = _combine(p for p in bad_patterns if not p.pattern.startswith("^"))
+
+
+def _is_bad(line: str) -> bool:
+    """Whether any rule in `bad_patterns` matches the line."""
+    return bool(
+        (_anchored and _anchored.match(line))
+        or (_unanchored and _unanchored.search(line))
+    )
+
+
+def check_pair(src: str, tgt: str, min_words: int = min_words) -> str | None:
+    """
+    Return the name of the rule that rejects a pair, or None if it passes.
+
+    Rules are checked in order: the word-count minimum first, then
+    `filter_rules` in definition order, against both sides of the pair.
+    """
+    if len(src.split()) < min_words or len(tgt.split()) < min_words:
+        return TOO_SHORT
+
+    # One combined pass decides acceptance; the per-rule scan only runs on
+    # the pairs that are rejected, to name the rule responsible.
+    if not (_is_bad(src) or _is_bad(tgt)):
+        return None
+    for name, pattern in filter_rules.items():
+        if pattern.search(src) or pattern.search(tgt):
+            return name
+    return None
+
+
+def _check_chunk(args: tuple[list[tuple[str, str]], int]) -> list[str | None]:
+    pairs, min_words = args
+    return [check_pair(src, tgt, min_words) for src, tgt in pairs]
+
+
+# ============================================================
+# Streaming filter engine
+# ============================================================
+
+
+def filter_pairs(
+    pairs: Iterable[tuple[str, str]],
+    min_words: int = min_words,
+    n_jobs: int = 1,
+    chunk_size: int = FILTER_CHUNK_SIZE,
+) -> Iterator[tuple[str, str, str | None]]:
+    """
+    Check a stream of sentence pairs against all filtering rules.
+
+    Args:
+        pairs: Aligned (source, target) pairs, consumed lazily.
+        min_words: Minimum number of words required on both sides.
+        n_jobs: Worker processes; chunks are checked in parallel but yielded
+            in their original order.
+        chunk_size: Pairs per chunk sent to a worker.
+
+    Yields:
+        (source, target, rule) triples, where `rule` is None for kept pairs.
+    """
+    in_flight: deque[list[tuple[str, str]]] = deque()
+
+    def tasks() -> Iterator[tuple[list[tuple[str, str]], int]]:
+        for chunk in chunked(pairs, chunk_size):
+            in_flight.append(chunk)
+            yield chunk, min_words
+
+    for verdicts in parallel_imap(_check_chunk, tasks(), n_jobs=n_jobs):
+        chunk = in_flight.popleft()
+        for (src, tgt), rule in zip(chunk, verdicts, strict=True):
+            yield src, tgt, rule
+
+
+def filter_files(
+    src_path: Path,
+    tgt_path: Path,
+    out_src: Path,
+    out_tgt: Path,
+    out_csv: Path | None = None,
+    rejects_path: Path | None = None,
+    columns: tuple[str, str] = ("cebuano", "spanish"),
+    min_words: int = min_words,
+    n_jobs: int = 1,
+    chunk_size: int = FILTER_CHUNK_SIZE,
+    archive: Path | None = None,
+) -> Counter:
+    """
+    Filter a pair of aligned text files and write the meaningful pairs.
+
+    Args:
+        src_path: Source-language file, one sentence per line.
+        tgt_path: Target-language file, aligned line by line with `src_path`.
+        out_src: Output file for kept source sentences.
+        out_tgt: Output file for kept target sentences.
+        out_csv: Optional CSV of kept pairs with `columns` as the header.
+        rejects_path: Optional TSV of (line number, rule) for rejected pairs.
+        columns: Column names used in `out_csv`.
+        min_words: Minimum number of words required on both sides.
+        n_jobs: Worker processes used for rule checking.
+        chunk_size: Pairs per chunk sent to a worker.
+        archive: Read `src_path` and `tgt_path` as members of this `.zip` or
+            `.tar` archive, decompressing them on the fly.
+
+    Returns:
+        Counter with the number of kept pairs under "kept" and the number of
+        rejections per rule name.
+    """
+    # Fail before any output file is created or truncated
+    for path in [archive] if archive else (src_path, tgt_path):
+        if not Path(path).is_file():
+            raise FileNotFoundError(errno.ENOENT, "No such file", str(path))
+    if archive:
+        members = set(archive_members(archive))
+        for member in (str(src_path), str(tgt_path)):
+            if member not in members:
+                raise FileNotFoundError(
+                    errno.ENOENT, "No such archive member", f"{archive}:{member}"
+                )
+
+    print(f"Filtering '{src_path}' / '{tgt_path}' with strict filters...")
+    stats: Counter = Counter()
+
+    with ExitStack() as stack:
+        f_src = stack.enter_context(open(out_src, "w", encoding="utf-8"))
+        f_tgt = stack.enter_context(open(out_tgt, "w", encoding="utf-8"))
+        csv_writer = None
+        if out_csv:
+            f_csv = stack.enter_context(
+                open(out_csv, "w", encoding="utf-8", newline="")
+            )
+            csv_writer = csv.writer(f_csv, lineterminator="\n")
+            csv_writer.writerow(columns)
+        f_rejects = (
+            stack.enter_context(open(rejects_path, "w", encoding="utf-8"))
+            if rejects_path
+            else None
         )
 
-        # Write to new .ceb and .es files
-        with open(out_ceb_file, "w", encoding="utf-8") as f_out_ceb:
-            for line in good_ceb_sentences:
-                f_out_ceb.write(line + "\n")
+        if archive:
+            pairs = iter_archive_pairs(archive, str(src_path), str(tgt_path))
+        else:
+            pairs = iter_line_pairs(src_path, tgt_path)
+        for line_no, (src, tgt, rule) in enumerate(
+            filter_pairs(pairs, min_words, n_jobs, chunk_size), start=1
+        ):
+            if rule is None:
+                stats["kept"] += 1
+                f_src.write(src + "\n")
+                f_tgt.write(tgt + "\n")
+                if csv_writer:
+                    csv_writer.writerow((src, tgt))
+            else:
+                stats[rule] += 1
+                if f_rejects:
+                    f_rejects.write(f"{line_no}\t{rule}\n")
+
+    print(
+        f"Found {stats['kept']} meaningful sentence pairs out of "
+        f"{stats.total()} after strict filtering."
+    )
+    for rule, count in stats.most_common():
+        if rule != "kept":
+            print(f"  {rule}: {count}")
+    return stats
+
+
+# ============================================================
+# Command-line entry point
+# ============================================================
 
-        with open(out_es_file, "w", encoding="utf-8") as f_out_es:
-            for line in good_es_sentences:
-                f_out_es.write(line + "\n")
 
-        print(f"Successfully wrote to {out_ceb_file} and {out_es_file}.")
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("src", nargs="?", default="translatewiki.ceb-es.ceb")
+    parser.add_argument("tgt", nargs="?", default="translatewiki.ceb-es.es")
+    parser.add_argument("--out-src", default="meaningful.ceb")
+    parser.add_argument("--out-tgt", default="meaningful.es")
+    parser.add_argument("--out-csv", default="meaningful_pairs.csv")
+    parser.add_argument("--rejects", default=None, help="TSV of rejected lines")
+    parser.add_argument("--columns", nargs=2, default=["cebuano", "spanish"])
+    parser.add_argument("--min-words", type=int, default=min_words)
+    parser.add_argument("--n-jobs", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=FILTER_CHUNK_SIZE)
+    parser.add_argument(
+        "--archive", default=None, help="Read src/tgt as members of this archive"
+    )
+    args = parser.parse_args(argv)
 
-        # Create and save DataFrame to CSV
-        df_pairs = pd.DataFrame(
-            {"cebuano": good_ceb_sentences, "spanish": good_es_sentences}
+    try:
+        filter_files(
+            Path(args.src),
+            Path(args.tgt),
+            Path(args.out_src),
+            Path(args.out_tgt),
+            out_csv=Path(args.out_csv) if args.out_csv else None,
+            rejects_path=Path(args.rejects) if args.rejects else None,
+            columns=tuple(args.columns),
+            min_words=args.min_words,
+            n_jobs=args.n_jobs,
+            chunk_size=args.chunk_size,
+            archive=Path(args.archive) if args.archive else None,
         )
+        print(f"Successfully wrote to {args.out_src} and {args.out_tgt}.")
+    except FileNotFoundError as e:
+        print(f"Error: Could not find file - {e.filename}")
+    except ValueError as e:
+        print(f"Error: {e}")
 
-        df_pairs.to_csv(out_csv_file, index=False, encoding="utf-8")
-        print(f"Successfully wrote to {out_csv_file}.")
 
-except FileNotFoundError as e:
-    print(f"Error: Could not find file - {e.filename}")
-except Exception as e:
-    print(f"An error occurred: {e}")
+if __name__ == "__main__":
+    main()
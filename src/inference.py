@@ -0,0 +1,259 @@
+"""
+Batched inference for the PyTorch Seq2Seq models.
+Sorts inputs by length, decodes whole batches with greedy or beam search,
+and restores the original sentence order.
+
+Run as a script to retranslate a test set with every checkpoint:
+    python -m src.inference data/translations/test.src --beam-size 4
+"""
+
+import argparse
+from collections.abc import Sequence
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from src.batching import pad_sequences
+from src.config import (
+    BEAM_SIZE,
+    DECODE_BATCH_SIZE,
+    MAX_DECODE_LEN,
+    MODELS_DIR,
+    TRANSLATIONS_DIR,
+)
+from src.instrumentation import instrument, text_tokens
+from src.model import Seq2Seq, load_checkpoint
+from src.utils import load_file
+from src.vocab import EOS_ID, PAD_ID, SOS_ID, Vocab
+
+# ============================================================
+# Decoding
+# ============================================================
+
+
+def greedy_decode(
+    model: Seq2Seq, src: torch.Tensor, max_len: int = MAX_DECODE_LEN
+) -> torch.Tensor:
+    """
+    Greedy decoding of a batch of encoded sources.
+
+    Tokens are written into a preallocated (batch, max_len) tensor. Rows that
+    have produced `<eos>` are padded from then on, and the loop stops as soon
+    as every row is finished, with one host sync per step for the whole batch.
+    """
+    encoder_outputs, hidden, keys, mask = model.encode(src)
+    batch_size = src.size(0)
+    out = src.new_full((batch_size, max_len), PAD_ID)
+    finished = torch.zeros(batch_size, dtype=torch.bool, device=src.device)
+    input_tok = src.new_full((batch_size,), SOS_ID)
+
+    for t in range(max_len):
+        output, hidden = model.decoder(input_tok, hidden, encoder_outputs, keys, mask)
+        input_tok = output.argmax(1).masked_fill_(finished, PAD_ID)
+        out[:, t] = input_tok
+        finished |= input_tok == EOS_ID
+        if finished.all():
+            break
+    return out
+
+
+def beam_search(
+    model: Seq2Seq,
+    src: torch.Tensor,
+    beam_size: int = 4,
+    max_len: int = MAX_DECODE_LEN,
+    length_penalty: float = 1.0,
+) -> torch.Tensor:
+    """
+    Batched beam search over `batch * beam_size` decoder rows.
+
+    Finished hypotheses are carried along with a fixed score (they can only
+    be extended by `<pad>`), so every sentence keeps exactly `beam_size`
+    live beams. The best hypothesis is chosen by its log-probability divided
+    by `length ** length_penalty`.
+    """
+    encoder_outputs, hidden, keys, mask = model.encode(src)
+    batch_size, k = src.size(0), beam_size
+    encoder_outputs = encoder_outputs.repeat_interleave(k, dim=0)
+    keys = keys.repeat_interleave(k, dim=0)
+    mask = mask.repeat_interleave(k, dim=0)
+    hidden = hidden.repeat_interleave(k, dim=1)
+
+    scores = src.new_zeros((batch_size, k), dtype=torch.float)
+    scores[:, 1:] = float("-inf")  # all beams start identical; keep one
+    tokens = src.new_full((batch_size, k, max_len), PAD_ID)
+    lengths = src.new_zeros((batch_size, k))
+    finished = torch.zeros(batch_size, k, dtype=torch.bool, device=src.device)
+    input_tok = src.new_full((batch_size * k,), SOS_ID)
+    row_offset = torch.arange(batch_size, device=src.device).unsqueeze(1) * k
+
+    for t in range(max_len):
+        output, hidden = model.decoder(input_tok, hidden, encoder_outputs, keys, mask)
+        log_probs = torch.log_softmax(output, dim=-1).view(batch_size, k, -1)
+        vocab_size = log_probs.size(-1)
+        pad_only = torch.full_like(log_probs[0, 0], float("-inf"))
+        pad_only[PAD_ID] = 0.0
+        log_probs = torch.where(finished.unsqueeze(-1), pad_only, log_probs)
+
+        scores, flat = (scores.unsqueeze(-1) + log_probs).view(batch_size, -1).topk(k)
+        beam, token = flat // vocab_size, flat % vocab_size
+
+        tokens = tokens.gather(1, beam.unsqueeze(-1).expand(-1, -1, max_len))
+        tokens[:, :, t] = token
+        was_finished = finished.gather(1, beam)
+        lengths = lengths.gather(1, beam) + (~was_finished).long()
+        finished = was_finished | (token == EOS_ID)
+
+        hidden = hidden[:, (beam + row_offset).view(-1)]
+        input_tok = token.view(-1)
+        if finished.all():
+            break
+
+    normalized = scores / lengths.clamp(min=1).float() ** length_penalty
+    best = normalized.argmax(1)
+    return tokens[torch.arange(batch_size, device=src.device), best]
+
+
+def length_batches(lengths: np.ndarray, batch_size: int) -> list[np.ndarray]:
+    """
+    Index batches of sentences sorted by length.
+
+    The encoder packs its input and attention masks padded positions, so a
+    padded sentence decodes as it would on its own; sorting only keeps the
+    padding, and thus the wasted work, small. No sentences give no batches.
+    """
+    order = np.argsort(lengths, kind="stable")
+    if not len(order):
+        return []
+    return np.array_split(order, range(batch_size, len(order), batch_size))
+
+
+@instrument("translate", tokens=text_tokens)
+@torch.inference_mode()
+def translate_batch(
+    model: Seq2Seq,
+    sentences: Sequence[str],
+    src_vocab: Vocab,
+    tgt_vocab: Vocab,
+    beam_size: int = BEAM_SIZE,
+    max_len: int = MAX_DECODE_LEN,
+    batch_size: int = DECODE_BATCH_SIZE,
+) -> list[str]:
+    """
+    Translate many sentences, returned in their input order.
+
+    Args:
+        model: Trained Seq2Seq model.
+        sentences: Source sentences (tokenized on whitespace, lowercased).
+        src_vocab: Source vocabulary of the model.
+        tgt_vocab: Target vocabulary of the model.
+        beam_size: Beam width; 1 uses greedy decoding.
+        max_len: Maximum number of generated tokens per sentence.
+        batch_size: Sentences decoded together.
+
+    Returns:
+        One translation per input sentence.
+    """
+    model.eval()
+    device = next(model.parameters()).device
+    ids, offsets = src_vocab.encode_flat(sentences)
+    lengths = np.diff(offsets)
+    translations = [""] * len(sentences)
+
+    for idx in length_batches(lengths, batch_size):
+        src = pad_sequences([ids[offsets[i] : offsets[i + 1]] for i in idx])
+        src = torch.from_numpy(src).to(device)
+        if beam_size > 1:
+            out = beam_search(model, src, beam_size, max_len)
+        else:
+            out = greedy_decode(model, src, max_len)
+        decoded = tgt_vocab.decode_batch(out.cpu().numpy(), strip_specials=False)
+        for i, text in zip(idx, decoded, strict=True):
+            translations[i] = text
+    return translations
+
+
+def translate(
+    model: Seq2Seq,
+    sentence: str,
+    src_vocab: Vocab,
+    tgt_vocab: Vocab,
+    max_len: int = MAX_DECODE_LEN,
+    beam_size: int = BEAM_SIZE,
+) -> str:
+    """Translate a single sentence."""
+    (translation,) = translate_batch(
+        model, [sentence], src_vocab, tgt_vocab, beam_size, max_len
+    )
+    return translation
+
+
+# ============================================================
+# Test corpus translation
+# ============================================================
+
+
+def translate_test_corpus(
+    test_file: Path = TRANSLATIONS_DIR / "test.src",
+    models_dir: Path = MODELS_DIR,
+    output_dir: Path | None = None,
+    beam_size: int = BEAM_SIZE,
+    max_len: int = MAX_DECODE_LEN,
+    batch_size: int = DECODE_BATCH_SIZE,
+) -> dict[str, Path]:
+    """
+    Translate a test file with every `.pt` checkpoint in `models_dir`.
+
+    Saves translations to `<output_dir>/<checkpoint name>_translations.txt`
+    (`output_dir` defaults to `models_dir`).
+
+    Returns:
+        Output file per checkpoint file name.
+    """
+    test_sentences = load_file(test_file)
+    output_dir = Path(output_dir or models_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    outputs = {}
+    for model_path in sorted(Path(models_dir).glob("*.pt")):
+        model, src_vocab, tgt_vocab = load_checkpoint(model_path)
+        translations = translate_batch(
+            model, test_sentences, src_vocab, tgt_vocab, beam_size, max_len, batch_size
+        )
+        output_file = output_dir / f"{model_path.stem}_translations.txt"
+        output_file.write_text(
+            "".join(f"{t}\n" for t in translations), encoding="utf-8"
+        )
+        outputs[model_path.name] = output_file
+        print(f"[{model_path.name}] Translations saved to {output_file}")
+    return outputs
+
+
+# ============================================================
+# Command-line entry point
+# ============================================================
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("test_file", nargs="?", default=TRANSLATIONS_DIR / "test.src")
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--output-dir", default=None)
+    parser.add_argument("--beam-size", type=int, default=BEAM_SIZE)
+    parser.add_argument("--max-len", type=int, default=MAX_DECODE_LEN)
+    parser.add_argument("--batch-size", type=int, default=DECODE_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    translate_test_corpus(
+        Path(args.test_file),
+        Path(args.models_dir),
+        Path(args.output_dir) if args.output_dir else None,
+        beam_size=args.beam_size,
+        max_len=args.max_len,
+        batch_size=args.batch_size,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+"""
+Stage instrumentation for the Philippine MT pipelines.
+Records wall time, throughput, and the memory used by each stage as JSON lines,
+and optionally dumps a cProfile or sampled stack profile per stage.
+
+Enable for a run with environment variables (or `configure()`):
+    PMT_METRICS_PATH=stages.jsonl PMT_PROFILE_DIR=profiles python -m src.pipeline
+"""
+
+import cProfile
+import functools
+import inspect
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from src import config
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROFILERS = ("cprofile", "sample")
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+
+_state = threading.local()
+_runs = itertools.count()
+_lifetime_peak = 0.0  # highest VmHWM seen before a reset, in MiB
+
+# ============================================================
+# Configuration
+# ============================================================
+
+
+def configure(
+    metrics_path: Path | None = None,
+    profile_dir: Path | None = None,
+    profiler: str = "cprofile",
+) -> None:
+    """
+    Turn metrics and profiling on (or off, with None) for this process.
+
+    Overrides `METRICS_PATH`, `PROFILE_DIR`, and `PROFILER` from `src.config`.
+    Worker processes started with `spawn` read the environment instead.
+    """
+    if profiler not in PROFILERS:
+        raise ValueError(f"Unknown profiler '{profiler}', expected {PROFILERS}.")
+    config.METRICS_PATH = metrics_path
+    config.PROFILE_DIR = profile_dir
+    config.PROFILER = profiler
+
+
+def enabled() -> bool:
+    return bool(config.METRICS_PATH or config.PROFILE_DIR)
+
+
+# ============================================================
+# Measurements
+# ============================================================
+
+
+def peak_rss_mb(children: bool = False) -> float | None:
+    """
+    Lifetime high-water mark of the resident set size, in MiB (None on Windows).
+
+    With `children`, the largest peak of any finished child process.
+    Stays correct after `reset_peak_rss`, which also resets `ru_maxrss`.
+    """
+    if resource is None:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    peak = peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+    return peak if children else max(peak, _lifetime_peak)
+
+
+def rss_mb(field: str = "VmRSS") -> float | None:
+    """
+    Current (`VmRSS`) or peak (`VmHWM`) resident set size in MiB.
+
+    Read from `/proc/self/status`, so None outside Linux.
+    """
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss() -> bool:
+    """Reset the kernel's RSS high-water mark (`VmHWM`); False if unsupported."""
+    global _lifetime_peak
+    _lifetime_peak = max(_lifetime_peak, rss_mb("VmHWM") or 0.0)
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def _memory_start() -> float | None:
+    # Nested stages share one kernel high-water mark. Before resetting it,
+    # fold the peak so far into every open stage of this thread, so an inner
+    # stage does not erase its parents' peaks.
+    peaks = _state.__dict__.setdefault("peaks", [])
+    peak = rss_mb("VmHWM")
+    if peak is None or not reset_peak_rss():
+        peaks.append(None)
+        return None
+    peaks[:] = [None if p is None else max(p, peak) for p in peaks]
+    start = rss_mb()
+    peaks.append(start)
+    return start
+
+
+def _memory_end() -> float | None:
+    peaks = _state.peaks
+    peak = peaks.pop()
+    if peak is None:
+        return None
+    peak = max(peak, rss_mb("VmHWM") or 0.0)
+    if peaks and peaks[-1] is not None:
+        peaks[-1] = max(peaks[-1], peak)
+    return peak
+
+
+def text_tokens(texts: Sequence[str]) -> int:
+    """Whitespace tokens in a list of sentences."""
+    return sum(len(t.split()) for t in texts)
+
+
+def frame_tokens(df) -> int | None:
+    """Tokens in the `src_tokens`/`tgt_tokens` columns (strings or lists)."""
+    columns = [c for c in ("src_tokens", "tgt_tokens") if c in df]
+    if not columns:
+        return None
+    return sum(
+        len(v) if isinstance(v, list) else len(str(v).split())
+        for c in columns
+        for v in df[c]
+    )
+
+
+class StageMetrics:
+    """Counters a stage can fill in while it runs; see `stage`."""
+
+    def __init__(self, name: str, rows: int | None = None, **fields: Any):
+        self.name = name
+        self.rows = rows
+        self.tokens: int | None = None
+        self.fields = fields
+
+    def record(
+        self,
+        wall: float,
+        cpu: float,
+        status: str,
+        depth: int,
+        rss_start: float | None = None,
+        peak: float | None = None,
+    ) -> dict:
+        record = {
+            "stage": self.name,
+            "status": status,
+            "time": round(time.time(), 3),
+            "pid": os.getpid(),
+            "depth": depth,
+            "wall_s": round(wall, 6),
+            "cpu_s": round(cpu, 6),
+            "rows": self.rows,
+            "rows_per_s": _rate(self.rows, wall),
+            "tokens": self.tokens,
+            "tokens_per_s": _rate(self.tokens, wall),
+            "rss_start_mb": _round(rss_start),
+            "peak_rss_mb": _round(peak),
+            "peak_delta_mb": _round(
+                None if peak is None or rss_start is None else peak - rss_start
+            ),
+            "process_peak_rss_mb": _round(peak_rss_mb()),
+            "process_peak_rss_children_mb": _round(peak_rss_mb(children=True)),
+        }
+        record.update(self.fields)
+        return record
+
+
+def _rate(count: int | None, seconds: float) -> float | None:
+    return round(count / seconds, 1) if count is not None and seconds > 0 else None
+
+
+def _round(value: float | None) -> float | None:
+    return None if value is None else round(value, 1)
+
+
+def _emit(record: dict) -> None:
+    path = Path(config.METRICS_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    line = json.dumps(record, default=str) + "\n"
+    with open(path, "a", encoding="utf-8") as f:  # one write per line
+        f.write(line)
+
+
+# ============================================================
+# Profiling
+# ============================================================
+
+
+class StackSampler:
+    """
+    Sampling profiler for one thread, writing folded stacks.
+
+    A daemon thread records the target thread's stack every `interval`
+    seconds. The output (`frame;frame;... count` per line) can be rendered
+    with flamegraph.pl or speedscope. Much lower overhead than cProfile on
+    tight Python loops, at the cost of being statistical.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path: Path) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def _profiled(name: str) -> Iterator[None]:
+    # Only the outermost stage of a thread is profiled: nested stages are
+    # already in its profile, and cProfile cannot be stacked.
+    if not config.PROFILE_DIR or getattr(_state, "profiling", False):
+        yield
+        return
+
+    profile_dir = Path(config.PROFILE_DIR)
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    stem = f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_runs)}"
+    profiler = StackSampler() if config.PROFILER == "sample" else cProfile.Profile()
+    _state.profiling = True
+    if isinstance(profiler, StackSampler):
+        profiler.start()
+    else:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if isinstance(profiler, StackSampler):
+            profiler.stop()
+            profiler.dump(profile_dir / f"{stem}.folded")
+        else:
+            profiler.disable()
+            profiler.dump_stats(profile_dir / f"{stem}.prof")
+        _state.profiling = False
+
+
+# ============================================================
+# Public API
+# ============================================================
+
+
+@contextmanager
+def stage(name: str, rows: int | None = None, **fields: Any) -> Iterator[StageMetrics]:
+    """
+    Measure a block of code as one pipeline stage.
+
+    Yields a `StageMetrics` whose `rows` and `tokens` may be set inside the
+    block. On exit, one JSON line is appended to `METRICS_PATH`, also when
+    the block raises (with `"status": "error"`). Extra keyword arguments are
+    copied into the record.
+
+    Memory is attributed to the stage on Linux: `rss_start_mb` is the RSS on
+    entry, `peak_rss_mb` the highest RSS while the stage ran (the kernel's
+    high-water mark is reset on entry), and `peak_delta_mb` their difference.
+    Elsewhere these are None and only the `process_peak_rss_mb` lifetime
+    peak is available. Stages running in several threads at once share the
+    process-wide mark, so their peaks overlap.
+
+    Example:
+        with stage("load", path=str(csv_path)) as m:
+            df = pd.read_csv(csv_path)
+            m.rows = len(df)
+    """
+    metrics = StageMetrics(name, rows, **fields)
+    if not enabled():
+        yield metrics
+        return
+
+    depth = getattr(_state, "depth", 0)
+    _state.depth = depth + 1
+    status = "error"
+    rss_start = _memory_start()
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        with _profiled(name):
+            yield metrics
+        status = "ok"
+    finally:
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        peak = _memory_end()
+        _state.depth = depth
+        if config.METRICS_PATH:
+            _emit(metrics.record(wall, cpu, status, depth, rss_start, peak))
+
+
+def instrument(
+    name: str | None = None,
+    rows: Callable[[Any], int | None] | None = len,
+    tokens: Callable[[Any], int | None] | None = None,
+    measure: str | None = None,
+) -> Callable[[Callable], Callable]:
+    """
+    Decorator running a function as a `stage`.
+
+    Args:
+        name: Stage name (defaults to the function's qualified name).
+        rows: Counts the rows of the measured object.
+        tokens: Counts the tokens of the measured object.
+        measure: Name of the argument that `rows`/`tokens` are applied to;
+            by default they are applied to the return value.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        stage_name = name or func.__qualname__
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled():
+                return func(*args, **kwargs)
+            with stage(stage_name) as metrics:
+                result = func(*args, **kwargs)
+                target = result
+                if measure is not None:
+                    bound = signature.bind(*args, **kwargs)
+                    target = bound.arguments[measure]
+                metrics.rows = rows(target) if rows else None
+                metrics.tokens = tokens(target) if tokens else None
+            return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,232 @@
+"""
+GRU encoder-decoder with attention for Neural Machine Translation (PyTorch).
+Moved from `02c_modeling_pytorch.ipynb`; parameter names are unchanged, so
+checkpoints trained in the notebook load as they are.
+"""
+
+from pathlib import Path
+
+import torch
+import torch.nn as nn
+from torch.nn import functional as F  # noqa: N812
+from torch.nn.utils.rnn import pack_padded_sequence, pad_packed_sequence
+
+from src.config import DROPOUT, EMB_DIM, HID_DIM, N_LAYERS
+from src.vocab import PAD_ID, Vocab
+
+
+def default_device() -> torch.device:
+    return torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+
+# ============================================================
+# Modules
+# ============================================================
+
+
+class Encoder(nn.Module):
+    def __init__(self, input_dim, emb_dim, hid_dim, n_layers=2, dropout=0.2):
+        super().__init__()
+        self.embedding = nn.Embedding(input_dim, emb_dim, padding_idx=0)
+        self.rnn = nn.GRU(
+            emb_dim, hid_dim, num_layers=n_layers, batch_first=True, dropout=dropout
+        )
+        self.dropout = nn.Dropout(dropout)
+
+    def forward(self, src, src_lengths: torch.Tensor | None = None):
+        embedded = self.dropout(self.embedding(src))
+        if src_lengths is None:
+            outputs, hidden = self.rnn(embedded)
+            return outputs, hidden
+
+        # Packing skips padded steps, so `hidden` is each sentence's last real
+        # step and padding cannot leak into the encoding.
+        packed = pack_padded_sequence(
+            embedded, src_lengths.cpu(), batch_first=True, enforce_sorted=False
+        )
+        outputs, hidden = self.rnn(packed)
+        outputs, _ = pad_packed_sequence(
+            outputs, batch_first=True, total_length=src.size(1)
+        )
+        return outputs, hidden
+
+
+class Attention(nn.Module):
+    def __init__(self, hid_dim):
+        super().__init__()
+        self.attn = nn.Linear(hid_dim * 2, hid_dim)
+        self.v = nn.Linear(hid_dim, 1, bias=False)
+
+    def project_keys(self, encoder_outputs):
+        """
+        Encoder half of `attn`, computed once per batch instead of every step.
+
+        `attn` acts on `[hidden; encoder_output]`, so its weight splits into a
+        decoder block and an encoder block; only the former changes per step.
+        """
+        hid_dim = self.attn.out_features
+        return F.linear(encoder_outputs, self.attn.weight[:, hid_dim:], self.attn.bias)
+
+    def forward(
+        self,
+        hidden,
+        encoder_outputs,
+        keys: torch.Tensor | None = None,
+        mask: torch.Tensor | None = None,
+    ):
+        if keys is None:
+            keys = self.project_keys(encoder_outputs)
+        hid_dim = self.attn.out_features
+        query = F.linear(hidden[-1], self.attn.weight[:, :hid_dim])
+        energy = torch.tanh(keys + query.unsqueeze(1))
+        attention = self.v(energy).squeeze(2)
+        if mask is not None:
+            attention = attention.masked_fill(~mask, float("-inf"))
+        return torch.softmax(attention, dim=1)
+
+
+class Decoder(nn.Module):
+    def __init__(self, output_dim, emb_dim, hid_dim, n_layers=2, dropout=0.2):
+        super().__init__()
+        self.embedding = nn.Embedding(output_dim, emb_dim, padding_idx=0)
+        self.rnn = nn.GRU(
+            hid_dim + emb_dim,
+            hid_dim,
+            num_layers=n_layers,
+            batch_first=True,
+            dropout=dropout,
+        )
+        self.fc_out = nn.Linear(hid_dim * 2 + emb_dim, output_dim)
+        self.attention = Attention(hid_dim)
+        self.dropout = nn.Dropout(dropout)
+
+    def forward(
+        self,
+        input_tok,
+        hidden,
+        encoder_outputs,
+        keys: torch.Tensor | None = None,
+        mask: torch.Tensor | None = None,
+    ):
+        embedded = self.dropout(self.embedding(input_tok.unsqueeze(1)))
+        attn = self.attention(hidden, encoder_outputs, keys, mask).unsqueeze(1)
+        context = attn.bmm(encoder_outputs)
+        rnn_input = torch.cat((embedded, context), dim=2)
+        output, hidden = self.rnn(rnn_input, hidden)
+        prediction = self.fc_out(
+            torch.cat((output, context, embedded), dim=2).squeeze(1)
+        )
+        return prediction, hidden
+
+
+class Seq2Seq(nn.Module):
+    def __init__(self, encoder, decoder, device):
+        super().__init__()
+        self.encoder = encoder
+        self.decoder = decoder
+        self.device = device
+
+    def encode(self, src):
+        """
+        Encode a padded batch for decoding.
+
+        Returns:
+            (encoder_outputs, hidden, keys, mask): `keys` are the projected
+            encoder states for attention and `mask` marks real source tokens.
+        """
+        mask = src != PAD_ID
+        encoder_outputs, hidden = self.encoder(src, mask.sum(1))
+        keys = self.decoder.attention.project_keys(encoder_outputs)
+        return encoder_outputs, hidden, keys, mask
+
+    def forward(self, src, tgt):
+        encoder_outputs, hidden, keys, mask = self.encode(src)
+        steps = tgt.size(1) - 1
+        outputs = encoder_outputs.new_empty(
+            (tgt.size(0), steps, self.decoder.fc_out.out_features)
+        )
+        for t in range(steps):
+            output, hidden = self.decoder(
+                tgt[:, t], hidden, encoder_outputs, keys, mask
+            )
+            outputs[:, t] = output
+        return outputs
+
+
+# ============================================================
+# Construction and checkpoints
+# ============================================================
+
+
+def build_model(
+    src_vocab_size: int,
+    tgt_vocab_size: int,
+    device: torch.device | None = None,
+    emb_dim: int = EMB_DIM,
+    hid_dim: int = HID_DIM,
+    n_layers: int = N_LAYERS,
+    dropout: float = DROPOUT,
+) -> Seq2Seq:
+    """Create a Seq2Seq model with the project's default hyperparameters."""
+    device = device or default_device()
+    enc = Encoder(src_vocab_size, emb_dim, hid_dim, n_layers, dropout)
+    dec = Decoder(tgt_vocab_size, emb_dim, hid_dim, n_layers, dropout)
+    return Seq2Seq(enc, dec, device).to(device)
+
+
+def model_hparams(state_dict: dict[str, torch.Tensor]) -> dict[str, int]:
+    """Read the architecture hyperparameters off a Seq2Seq state dict."""
+    src_vocab_size, emb_dim = state_dict["encoder.embedding.weight"].shape
+    tgt_vocab_size = state_dict["decoder.embedding.weight"].shape[0]
+    hid_dim = state_dict["encoder.rnn.weight_hh_l0"].shape[1]
+    n_layers = sum(k.startswith("encoder.rnn.weight_ih_l") for k in state_dict)
+    return {
+        "src_vocab_size": src_vocab_size,
+        "tgt_vocab_size": tgt_vocab_size,
+        "emb_dim": emb_dim,
+        "hid_dim": hid_dim,
+        "n_layers": n_layers,
+    }
+
+
+def checkpoint_state(model: Seq2Seq, src_vocab: Vocab, tgt_vocab: Vocab) -> dict:
+    """Weights, hyperparameters, and vocabularies as plain containers."""
+    state_dict = model.state_dict()
+    return {
+        "model_state": state_dict,
+        "hparams": model_hparams(state_dict),
+        "src_vocab": src_vocab.state_dict(),
+        "tgt_vocab": tgt_vocab.state_dict(),
+    }
+
+
+def save_checkpoint(
+    model: Seq2Seq, src_vocab: Vocab, tgt_vocab: Vocab, path: Path
+) -> None:
+    """Save a `checkpoint_state` for `load_checkpoint`."""
+    torch.save(checkpoint_state(model, src_vocab, tgt_vocab), path)
+
+
+def load_checkpoint(
+    path: Path, device: torch.device | None = None
+) -> tuple[Seq2Seq, Vocab, Vocab]:
+    """
+    Load a model checkpoint in evaluation mode.
+
+    Accepts both `save_checkpoint` output and the notebook's older format,
+    whose vocabularies are `{token: id}` dicts. The architecture is read off
+    the stored weights, so checkpoints trained with other dimensions than
+    those in `src.config` load as well.
+
+    Returns:
+        (model, src_vocab, tgt_vocab)
+    """
+    device = device or default_device()
+    checkpoint = torch.load(path, map_location=device, weights_only=True)
+    src_vocab = Vocab.from_state(checkpoint["src_vocab"])
+    tgt_vocab = Vocab.from_state(checkpoint["tgt_vocab"])
+
+    model = build_model(device=device, **model_hparams(checkpoint["model_state"]))
+    model.load_state_dict(checkpoint["model_state"])
+    model.eval()
+    return model, src_vocab, tgt_vocab
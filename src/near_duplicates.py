@@ -0,0 +1,309 @@
+"""
+Near-duplicate detection for parallel corpora with MinHash and LSH.
+Pairs whose character shingles overlap by at least a Jaccard threshold are
+clustered, and only the first pair of every cluster is kept.
+"""
+
+import csv
+from collections.abc import Sequence
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.config import (
+    MINHASH_PERMUTATIONS,
+    RANDOM_SEED,
+    SHINGLE_SIZE,
+)
+from src.utils import chunked, parallel_imap
+
+SIGNATURE_CHUNK_SIZE = 10_000  # texts per signature task
+PAIR_SEPARATOR = "\t"
+DEFAULT_THRESHOLD = 0.8  # for direct calls; the stage needs `NEAR_DUP_THRESHOLD`
+
+_HASH_BASE = np.uint64(1_000_003)  # polynomial rolling hash of code points
+_BAND_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+# ============================================================
+# MinHash signatures
+# ============================================================
+
+
+def _permutations(num_perm: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    """Multiply-add-shift hash functions standing in for random permutations."""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 2**64, num_perm, dtype=np.uint64, endpoint=False) | 1
+    b = rng.integers(0, 2**64, num_perm, dtype=np.uint64, endpoint=False)
+    return a, b
+
+
+def shingle_hashes(
+    texts: Sequence[str], shingle_size: int = SHINGLE_SIZE
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    32-bit hashes of the character shingles of every text.
+
+    All texts are hashed in one vectorized pass over their concatenated code
+    points. Texts shorter than `shingle_size` are padded to one shingle.
+
+    Returns:
+        The hashes of all texts back to back, and the offset of each text's
+        first hash (the layout `np.minimum.reduceat` expects).
+    """
+    texts = [t.ljust(shingle_size, "\0") for t in texts]
+    codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype="<u4")
+    codes = codes.astype(np.uint64)
+    lengths = np.fromiter(map(len, texts), np.int64, len(texts))
+
+    n_windows = len(codes) - shingle_size + 1
+    hashes = np.zeros(max(n_windows, 0), dtype=np.uint64)
+    for j in range(shingle_size):
+        hashes = hashes * _HASH_BASE + codes[j : j + n_windows]
+
+    # Drop the windows that straddle two texts
+    counts = lengths - shingle_size + 1
+    offsets = np.cumsum(counts) - counts
+    text_starts = np.cumsum(lengths) - lengths
+    windows = np.repeat(text_starts - offsets, counts) + np.arange(counts.sum())
+    hashes = hashes[windows]
+    return (hashes ^ (hashes >> np.uint64(32))) & np.uint64(0xFFFFFFFF), offsets
+
+
+def minhash_signatures(
+    texts: Sequence[str],
+    num_perm: int = MINHASH_PERMUTATIONS,
+    shingle_size: int = SHINGLE_SIZE,
+    seed: int = RANDOM_SEED,
+) -> np.ndarray:
+    """MinHash signature of every text as a `(len(texts), num_perm)` uint32 array."""
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint32)
+    if not texts:
+        return signatures
+    hashes, offsets = shingle_hashes(texts, shingle_size)
+    shift = np.uint64(32)
+    for p, (a, b) in enumerate(zip(*_permutations(num_perm, seed), strict=True)):
+        signatures[:, p] = np.minimum.reduceat((hashes * a + b) >> shift, offsets)
+    return signatures
+
+
+def _signature_chunk(args: tuple[list[str], int, int, int]) -> np.ndarray:
+    return minhash_signatures(*args)
+
+
+def compute_signatures(
+    texts: Sequence[str],
+    num_perm: int = MINHASH_PERMUTATIONS,
+    shingle_size: int = SHINGLE_SIZE,
+    seed: int = RANDOM_SEED,
+    n_jobs: int = 1,
+    chunk_size: int = SIGNATURE_CHUNK_SIZE,
+) -> np.ndarray:
+    """`minhash_signatures` in chunks, spread over `n_jobs` worker processes."""
+    tasks = (
+        (chunk, num_perm, shingle_size, seed) for chunk in chunked(texts, chunk_size)
+    )
+    parts = list(parallel_imap(_signature_chunk, tasks, n_jobs=n_jobs))
+    return np.concatenate(parts) if parts else np.empty((0, num_perm), np.uint32)
+
+
+# ============================================================
+# Locality-sensitive hashing
+# ============================================================
+
+
+def lsh_bands(threshold: float, num_perm: int) -> tuple[int, int]:
+    """
+    Number of bands and rows per band for a similarity threshold.
+
+    Minimizes the sum of the false-positive and false-negative areas under the
+    banding S-curve `1 - (1 - s^rows)^bands`, as in `datasketch`.
+    """
+    s = np.linspace(0.0, 1.0, 1001)
+    below, above = s <= threshold, s >= threshold
+    best, best_error = (1, num_perm), np.inf
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            p = 1 - (1 - s**rows) ** bands
+            error = p[below].mean() * threshold + (1 - p[above]).mean() * (
+                1 - threshold
+            )
+            if error < best_error:
+                best, best_error = (bands, rows), error
+    return best
+
+
+def _band_keys(band: np.ndarray) -> np.ndarray:
+    keys = np.zeros(len(band), dtype=np.uint64)
+    for column in band.T:
+        keys = (keys ^ column.astype(np.uint64)) * _BAND_MIX
+    return keys
+
+
+def candidate_pairs(signatures: np.ndarray, bands: int, rows: int) -> np.ndarray:
+    """
+    Candidate `(first, other)` row pairs that share at least one band.
+
+    Each band is indexed by sorting its keys; every row in a bucket is paired
+    with the bucket's first (lowest) row, so the work is O(n log n) per band
+    rather than quadratic in the bucket size.
+    """
+    edges = []
+    for start in range(0, bands * rows, rows):
+        keys = _band_keys(signatures[:, start : start + rows])
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        new_bucket = np.ones(len(keys), dtype=bool)
+        new_bucket[1:] = sorted_keys[1:] != sorted_keys[:-1]
+        first = order[
+            np.maximum.accumulate(np.where(new_bucket, np.arange(len(keys)), 0))
+        ]
+        edges.append(np.stack([first[~new_bucket], order[~new_bucket]], axis=1))
+    if not edges:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.unique(np.concatenate(edges), axis=0)
+
+
+def estimated_similarity(
+    signatures: np.ndarray, pairs: np.ndarray, chunk_size: int = 100_000
+) -> np.ndarray:
+    """Jaccard estimate (share of equal MinHash values) of each row pair."""
+    return np.concatenate(
+        [
+            (signatures[chunk[:, 0]] == signatures[chunk[:, 1]]).mean(axis=1)
+            for chunk in np.array_split(pairs, max(1, -(-len(pairs) // chunk_size)))
+        ]
+    )
+
+
+def connected_components(n: int, edges: np.ndarray) -> np.ndarray:
+    """
+    Label every node with the lowest node of its connected component.
+
+    Vectorized min-label propagation with pointer jumping, so it needs no
+    per-edge Python loop.
+    """
+    labels = np.arange(n)
+    if not len(edges):
+        return labels
+    i, j = edges[:, 0], edges[:, 1]
+    while True:
+        updated = labels.copy()
+        np.minimum.at(updated, j, labels[i])
+        np.minimum.at(updated, i, labels[j])
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+def find_near_duplicates(
+    texts: Sequence[str],
+    threshold: float = DEFAULT_THRESHOLD,
+    num_perm: int = MINHASH_PERMUTATIONS,
+    shingle_size: int = SHINGLE_SIZE,
+    n_jobs: int = 1,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Cluster texts whose estimated shingle Jaccard similarity is >= `threshold`.
+
+    Returns:
+        `labels`, the first (lowest) row of each row's cluster, and the
+        estimated similarity of each row to that first row.
+    """
+    signatures = compute_signatures(
+        texts, num_perm, shingle_size, RANDOM_SEED, n_jobs=n_jobs
+    )
+    pairs = candidate_pairs(signatures, *lsh_bands(threshold, num_perm))
+    if len(pairs):
+        pairs = pairs[estimated_similarity(signatures, pairs) >= threshold]
+    labels = connected_components(len(texts), pairs)
+
+    similarity = np.ones(len(texts))
+    duplicates = np.flatnonzero(labels != np.arange(len(texts)))
+    if len(duplicates):
+        similarity[duplicates] = estimated_similarity(
+            signatures, np.stack([labels[duplicates], duplicates], axis=1)
+        )
+    return labels, similarity
+
+
+# ============================================================
+# DataFrame stage and report
+# ============================================================
+
+
+def write_cluster_report(
+    path: Path,
+    src: Sequence[str],
+    tgt: Sequence[str],
+    labels: np.ndarray,
+    similarity: np.ndarray,
+) -> None:
+    """
+    CSV of every cluster with removed rows: the kept row first, then the
+    removed ones with their estimated similarity to it.
+    """
+    rows = np.flatnonzero(labels != np.arange(len(labels)))
+    rows = rows[np.lexsort((rows, labels[rows]))]
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(("cluster", "row", "status", "similarity", "source", "target"))
+        previous = -1
+        for row, cluster in zip(rows.tolist(), labels[rows].tolist(), strict=True):
+            if cluster != previous:
+                writer.writerow(
+                    (cluster, cluster, "kept", 1.0, src[cluster], tgt[cluster])
+                )
+                previous = cluster
+            writer.writerow(
+                (cluster, row, "removed", round(similarity[row], 4), src[row], tgt[row])
+            )
+
+
+def drop_near_duplicates(
+    df: pd.DataFrame,
+    src_col: str = "src_tokens",
+    tgt_col: str = "tgt_tokens",
+    threshold: float = DEFAULT_THRESHOLD,
+    n_jobs: int = 1,
+    report_path: Path | None = None,
+    shingle_size: int = SHINGLE_SIZE,
+    num_perm: int = MINHASH_PERMUTATIONS,
+) -> pd.DataFrame:
+    """
+    Keep only the first sentence pair of every near-duplicate cluster.
+
+    Source and target are compared together, so pairs only collapse when both
+    sides are close. Token-list columns are joined with spaces first.
+
+    Args:
+        df: Preprocessed corpus, e.g. the output of `preprocess_corpus`.
+        src_col: Source column (strings or token lists).
+        tgt_col: Target column (strings or token lists).
+        threshold: Minimum estimated Jaccard similarity of the character
+            shingles of two pairs for them to count as duplicates.
+        n_jobs: Worker processes for computing signatures.
+        report_path: Optional CSV listing the removed clusters.
+        shingle_size: Characters per shingle.
+        num_perm: MinHash permutations per signature.
+    """
+    src = [t if isinstance(t, str) else " ".join(t) for t in df[src_col]]
+    tgt = [t if isinstance(t, str) else " ".join(t) for t in df[tgt_col]]
+    texts = [s + PAIR_SEPARATOR + t for s, t in zip(src, tgt, strict=True)]
+
+    labels, similarity = find_near_duplicates(
+        texts, threshold, num_perm, shingle_size, n_jobs=n_jobs
+    )
+    keep = labels == np.arange(len(labels))
+    n_clusters = len(np.unique(labels[~keep]))
+    print(
+        f"[Dedup] Removed {(~keep).sum():,} near-duplicate pairs in "
+        f"{n_clusters:,} clusters (threshold {threshold})."
+    )
+    if report_path:
+        write_cluster_report(report_path, src, tgt, labels, similarity)
+        print(f"[Dedup] Cluster report written to {report_path}")
+    return df[keep].reset_index(drop=True)
@@ -0,0 +1,561 @@
+"""
+Cached data pipeline for Neural Machine Translation.
+Runs load -> preprocess -> augment/mix -> split/export and skips every stage whose
+input files, configuration values, and code are unchanged since the last run.
+
+Process every language pair in parallel, resuming an interrupted run:
+    python -m src.pipeline --n-jobs 4
+"""
+
+import argparse
+import time
+from collections import Counter
+from collections.abc import Callable, Mapping, Sequence
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from functools import cached_property
+from pathlib import Path
+
+import pandas as pd
+
+from src import config
+from src.augmentation import augment_dataset, mix_datasets
+from src.cache import StageCache, code_version, hash_file, stage_key
+from src.config import PROCESSED_DIR, RAW_DIR, mix_split_name, pair_name
+from src.near_duplicates import drop_near_duplicates
+from src.preprocessing_nmt import preprocess_corpus, split_and_export
+from src.utils import resolve_n_jobs
+
+STAGE_KEY_FILE = ".stage-key"
+
+# Configuration values that each stage's output depends on
+PREPROCESS_PARAMS = (
+    "MIN_SENT_LEN",
+    "MAX_SENT_LEN",
+    "SOURCE_COL",
+    "TARGET_COL",
+    "NEAR_DUP_THRESHOLD",
+    "SHINGLE_SIZE",
+    "MINHASH_PERMUTATIONS",
+)
+AUGMENT_PARAMS = (
+    "AUGMENT_N_COPIES",
+    "SWAP_PROB",
+    "DROP_PROB",
+    "DUP_PROB",
+    "RANDOM_SEED",
+)
+MIX_PARAMS = ("MIX_RATIO",)
+EXPORT_PARAMS = ("TRAIN_SPLIT",)
+
+
+def config_params(names: Sequence[str]) -> dict[str, object]:
+    """Current values of the named `src.config` constants, keyed in lowercase."""
+    return {name.lower(): getattr(config, name) for name in names}
+
+
+# ============================================================
+# Stages
+# ============================================================
+
+
+class Stage:
+    """
+    A lazily evaluated pipeline step with a content-addressed output.
+
+    The key is derived from upstream keys rather than upstream data, so a
+    fully cached pipeline can be checked without loading any DataFrame.
+    `options` are passed to `func` but excluded from the key; use them for
+    settings that do not change the output, such as `n_jobs`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[..., pd.DataFrame],
+        code: Sequence[Callable],
+        deps: Sequence["Stage"] = (),
+        inputs: Sequence[Path] = (),
+        params: Mapping[str, object] | None = None,
+        options: Mapping[str, object] | None = None,
+        cache: StageCache | None = None,
+    ):
+        self.name = name
+        self.func = func
+        self.code = code
+        self.deps = deps
+        self.inputs = inputs
+        self.params = dict(params or {})
+        self.options = dict(options or {})
+        self.cache = cache or StageCache()
+
+    @cached_property
+    def key(self) -> str:
+        return stage_key(
+            self.name,
+            "".join(code_version(f) for f in self.code),
+            self.params,
+            [hash_file(path) for path in self.inputs] + [d.key for d in self.deps],
+        )
+
+    @cached_property
+    def result(self) -> pd.DataFrame:
+        df = self.cache.load(self.name, self.key)
+        if df is not None:
+            print(f"[Cache] Hit: {self.name} ({self.key[:12]})")
+            return df
+
+        print(f"[Cache] Miss: running {self.name} ({self.key[:12]})")
+        df = self.func(
+            *self.inputs, *(d.result for d in self.deps), **self.params, **self.options
+        )
+        self.cache.save(self.name, self.key, df)
+        return df
+
+
+def export_stage(stage: Stage, output_dir: Path) -> bool:
+    """
+    Split and export a stage's output unless the files are already current.
+
+    A key file next to the exported splits records what they were built
+    from. Returns True if the export ran.
+    """
+    if is_exported(stage, output_dir):
+        print(f"[Cache] Up to date: {output_dir}")
+        return False
+
+    params = config_params(EXPORT_PARAMS)
+    split_and_export(stage.result, params["train_split"], output_dir)
+    (output_dir / STAGE_KEY_FILE).write_text(export_key(stage))
+    return True
+
+
+def export_key(stage: Stage) -> str:
+    """Key of the split/export of `stage`'s output."""
+    params = config_params(EXPORT_PARAMS)
+    return stage_key("export", code_version(split_and_export), params, [stage.key])
+
+
+def is_exported(stage: Stage, output_dir: Path) -> bool:
+    """Whether `output_dir` holds current splits of `stage`'s output."""
+    key_path = output_dir / STAGE_KEY_FILE
+    outputs = [
+        output_dir / f"{s}.{side}"
+        for s in ("train", "valid")
+        for side in ("src", "tgt")
+    ]
+    return (
+        key_path.exists()
+        and key_path.read_text() == export_key(stage)
+        and all(p.exists() for p in outputs)
+    )
+
+
+# ============================================================
+# Stage functions
+# ============================================================
+
+
+def _load_and_preprocess(
+    csv_path: Path,
+    min_sent_len: int,
+    max_sent_len: int,
+    source_col: str,
+    target_col: str,
+    near_dup_threshold: float | None,
+    shingle_size: int,
+    minhash_permutations: int,
+    n_jobs: int = 1,
+) -> pd.DataFrame:
+    df = preprocess_corpus(
+        pd.read_csv(csv_path),
+        source_col,
+        target_col,
+        n_jobs=n_jobs,
+        min_sent_len=min_sent_len,
+        max_sent_len=max_sent_len,
+    )
+    if near_dup_threshold is None:
+        return df
+    return drop_near_duplicates(
+        df,
+        threshold=near_dup_threshold,
+        n_jobs=n_jobs,
+        shingle_size=shingle_size,
+        num_perm=minhash_permutations,
+    )
+
+
+def _augment(
+    df: pd.DataFrame,
+    augment_n_copies: int,
+    swap_prob: float,
+    drop_prob: float,
+    dup_prob: float,
+    random_seed: int,
+    n_jobs: int = 1,
+) -> pd.DataFrame:
+    return augment_dataset(
+        df,
+        n_copies=augment_n_copies,
+        seed=random_seed,
+        n_jobs=n_jobs,
+        swap_prob=swap_prob,
+        drop_prob=drop_prob,
+        dup_prob=dup_prob,
+    )
+
+
+def _mix(base_df: pd.DataFrame, mix_df: pd.DataFrame, mix_ratio: float) -> pd.DataFrame:
+    return mix_datasets(base_df, mix_df, mix_ratio=mix_ratio)
+
+
+def preprocess_stage(
+    csv_path: Path, cache: StageCache | None = None, n_jobs: int = 1
+) -> Stage:
+    return Stage(
+        "preprocess",
+        _load_and_preprocess,
+        code=[preprocess_corpus, drop_near_duplicates],
+        inputs=[Path(csv_path)],
+        params=config_params(PREPROCESS_PARAMS),
+        options={"n_jobs": n_jobs},
+        cache=cache,
+    )
+
+
+def augment_stage(
+    base: Stage, cache: StageCache | None = None, n_jobs: int = 1
+) -> Stage:
+    return Stage(
+        "augment",
+        _augment,
+        code=[augment_dataset],
+        deps=[base],
+        params=config_params(AUGMENT_PARAMS),
+        options={"n_jobs": n_jobs},
+        cache=cache,
+    )
+
+
+def mix_stage(base: Stage, aux: Stage, cache: StageCache | None = None) -> Stage:
+    return Stage(
+        "mix",
+        _mix,
+        code=[mix_datasets],
+        deps=[base, aux],
+        params=config_params(MIX_PARAMS),
+        cache=cache,
+    )
+
+
+# ============================================================
+# Pipeline
+# ============================================================
+
+
+def pair_stages(
+    base_csv: Path,
+    aux_csv: Path | None = None,
+    augment: bool = False,
+    cache: StageCache | None = None,
+    n_jobs: int = 1,
+    mix_name: str = mix_split_name("chavacano"),
+) -> dict[str, Stage]:
+    """
+    The stages whose outputs are exported for one language pair, by split.
+
+    The mixed split is named by `mix_name`; see `mix_split_name`.
+    """
+    cache = cache or StageCache()
+    base = preprocess_stage(base_csv, cache, n_jobs)
+
+    stages = {"base": base}
+    if augment:
+        stages["aug-noise"] = augment_stage(base, cache, n_jobs)
+    if aux_csv is not None:
+        stages[mix_name] = mix_stage(
+            base, preprocess_stage(aux_csv, cache, n_jobs), cache
+        )
+    return stages
+
+
+def run_pipeline(
+    base_csv: Path,
+    aux_csv: Path | None = None,
+    output_root: Path = PROCESSED_DIR,
+    augment: bool = False,
+    cache: StageCache | None = None,
+    n_jobs: int = 1,
+    aux_lang: str = "chavacano",
+) -> dict[str, Path]:
+    """
+    Build the `base`, `aug-noise`, and `aug-cbk` splits with stage caching.
+
+    Args:
+        base_csv: Raw CSV of the main language pair (e.g., Cebuano–Spanish).
+        aux_csv: Raw CSV of the auxiliary pair to mix in (e.g., Chavacano–Spanish).
+        output_root: Directory under which each split folder is written.
+        augment: Also export materialized noise copies as `aug-noise`. Usually
+            unnecessary: `train_model(..., augment_copies=...)` on `base`
+            injects the noise during training.
+        cache: Stage cache to use (defaults to `CACHE_DIR`).
+        n_jobs: Worker processes for preprocessing and augmentation.
+        aux_lang: Source language of `aux_csv`; names the mixed split
+            (`mix_split_name`), as `build_tasks` does.
+
+    Returns:
+        The exported split directories by name.
+    """
+    stages = pair_stages(
+        base_csv, aux_csv, augment, cache, n_jobs, mix_name=mix_split_name(aux_lang)
+    )
+    outputs = {}
+    for name, stage in stages.items():
+        outputs[name] = output_root / name
+        export_stage(stage, outputs[name])
+    return outputs
+
+
+# ============================================================
+# Multi-pair runner
+# ============================================================
+
+MARKER_DIR = ".tasks"
+
+
+def find_pair_csv(src_lang: str, tgt_lang: str, raw_dir: Path = RAW_DIR) -> Path:
+    """
+    The raw CSV of a language pair, found by the language names in its file name.
+
+    Matching is case-insensitive; a file naming the languages in pair order
+    (e.g. `Cebuano-Spanish.csv`) wins over one naming them the other way round.
+    """
+    matches = []
+    for path in sorted(Path(raw_dir).glob("**/*.csv")):
+        stem = path.stem.lower()
+        src_at, tgt_at = stem.find(src_lang.lower()), stem.find(tgt_lang.lower())
+        if src_at >= 0 and tgt_at >= 0:
+            matches.append((src_at > tgt_at, path))
+    if not matches:
+        raise FileNotFoundError(f"No CSV for {src_lang}-{tgt_lang} in {raw_dir}.")
+    in_order = [path for reversed_, path in matches if not reversed_]
+    candidates = in_order or [path for _, path in matches]
+    if len(candidates) > 1:
+        names = ", ".join(p.name for p in candidates)
+        raise ValueError(f"Several CSVs match {src_lang}-{tgt_lang}: {names}")
+    return candidates[0]
+
+
+class Task:
+    """
+    One node of the multi-pair task graph.
+
+    A task either materializes a stage into the stage cache (so dependent
+    tasks in other processes load it from there) or exports a stage's output
+    to `output_dir`. On success a marker holding the task's key is written;
+    a task whose marker matches and whose output still exists is complete.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        stage: Stage,
+        deps: Sequence[str] = (),
+        output_dir: Path | None = None,
+        weight: int = 0,
+    ):
+        self.name = name
+        self.stage = stage
+        self.deps = list(deps)
+        self.output_dir = output_dir
+        self.weight = weight  # upstream input bytes; heavier tasks go first
+
+    @property
+    def key(self) -> str:
+        return self.stage.key if self.output_dir is None else export_key(self.stage)
+
+    def marker(self, marker_dir: Path) -> Path:
+        return marker_dir / f"{self.name.replace('/', '.')}.done"
+
+    def is_complete(self, marker_dir: Path) -> bool:
+        marker = self.marker(marker_dir)
+        if not marker.exists() or marker.read_text() != self.key:
+            return False
+        if self.output_dir is None:
+            return self.stage.cache.path(self.stage.name, self.stage.key).exists()
+        return is_exported(self.stage, self.output_dir)
+
+    def run(self) -> None:
+        if self.output_dir is None:
+            self.stage.result  # noqa: B018  (computes and caches the stage)
+        else:
+            export_stage(self.stage, self.output_dir)
+
+
+def _run_task(task: Task) -> float:
+    start = time.perf_counter()
+    task.run()
+    return time.perf_counter() - start
+
+
+def build_tasks(
+    pairs: Sequence[tuple[str, str]],
+    raw_dir: Path = RAW_DIR,
+    output_root: Path = PROCESSED_DIR,
+    augment: bool = False,
+    mix: bool = True,
+    cache: StageCache | None = None,
+) -> dict[str, Task]:
+    """
+    Task graph for several language pairs, written to `output_root/<pair>/`.
+
+    Stages are identified by their cache key, so a pair's preprocessing is
+    one task even when another pair also mixes it in (see `MIX_PAIRS`).
+    """
+    cache = cache or StageCache()
+    tasks: dict[str, Task] = {}
+
+    def add(stage: Stage) -> str:
+        name = f"{stage.name}-{stage.key[:12]}"
+        if name not in tasks:
+            deps = [add(dep) for dep in stage.deps]
+            weight = sum(Path(p).stat().st_size for p in stage.inputs)
+            weight += sum(tasks[dep].weight for dep in deps)
+            tasks[name] = Task(name, stage, deps, weight=weight)
+        return name
+
+    for src_lang, tgt_lang in pairs:
+        base_csv = find_pair_csv(src_lang, tgt_lang, raw_dir)
+        aux = config.MIX_PAIRS.get((src_lang, tgt_lang)) if mix else None
+        aux_csv = find_pair_csv(*aux, raw_dir) if aux else None
+
+        stages = pair_stages(
+            base_csv,
+            aux_csv,
+            augment,
+            cache,
+            mix_name=mix_split_name(aux[0]) if aux else "aug-mix",
+        )
+        for split, stage in stages.items():
+            name = f"{pair_name(src_lang, tgt_lang)}/{split}"
+            output_dir = output_root / pair_name(src_lang, tgt_lang) / split
+            dep = add(stage)
+            tasks[name] = Task(name, stage, [dep], output_dir, tasks[dep].weight)
+    return tasks
+
+
+def run_tasks(
+    tasks: Mapping[str, Task], marker_dir: Path, n_jobs: int = 1
+) -> dict[str, str]:
+    """
+    Run a task graph on a process pool, resuming from completion markers.
+
+    Only incomplete exports and the incomplete tasks they depend on run.
+    Independent tasks run at the same time, heaviest first; a failed task
+    only blocks the tasks that depend on it.
+
+    Returns:
+        The status of every task: "done", "skipped" (already complete),
+        "failed", or "blocked".
+    """
+    status = {
+        name: "skipped" for name, task in tasks.items() if task.is_complete(marker_dir)
+    }
+    todo: set[str] = set()
+
+    def need(name: str) -> None:
+        if name in status or name in todo:
+            return
+        todo.add(name)
+        for dep in tasks[name].deps:
+            need(dep)
+
+    for name, task in tasks.items():
+        if task.output_dir is not None:
+            need(name)
+    print(
+        f"[Runner] {len(todo)} of {len(tasks)} tasks to run "
+        f"({len(status)} already complete)."
+    )
+
+    marker_dir.mkdir(parents=True, exist_ok=True)
+    n_workers = resolve_n_jobs(n_jobs)
+    executor_cls = ProcessPoolExecutor if n_workers > 1 else ThreadPoolExecutor
+    with executor_cls(max_workers=n_workers) as executor:
+        running: dict[Future, str] = {}
+        while todo or running:
+            ready = [
+                name
+                for name in todo
+                if all(status.get(d) in ("done", "skipped") for d in tasks[name].deps)
+            ]
+            for name in sorted(ready, key=lambda n: -tasks[n].weight):
+                todo.discard(name)
+                running[executor.submit(_run_task, tasks[name])] = name
+            if not running:
+                break  # everything left waits on a failed task
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    elapsed = future.result()
+                except Exception as e:
+                    status[name] = "failed"
+                    print(f"[Runner] Failed: {name} ({type(e).__name__}: {e})")
+                    continue
+                status[name] = "done"
+                tasks[name].marker(marker_dir).write_text(tasks[name].key)
+                print(f"[Runner] Done: {name} in {elapsed:.1f}s")
+
+    for name in todo:
+        status[name] = "blocked"
+    return status
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Preprocess and export several language pairs in parallel."
+    )
+    parser.add_argument(
+        "--pairs",
+        nargs="+",
+        default=None,
+        help="Pairs such as cebuano-spanish (default: all LANGUAGE_PAIRS)",
+    )
+    parser.add_argument("--raw-dir", default=RAW_DIR)
+    parser.add_argument("--output-root", default=PROCESSED_DIR)
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Worker processes")
+    parser.add_argument("--augment", action="store_true")
+    parser.add_argument("--no-mix", action="store_true")
+    args = parser.parse_args(argv)
+
+    pairs = (
+        [tuple(p.split("-", 1)) for p in args.pairs]
+        if args.pairs
+        else config.LANGUAGE_PAIRS
+    )
+    output_root = Path(args.output_root)
+    tasks = build_tasks(
+        pairs, Path(args.raw_dir), output_root, args.augment, not args.no_mix
+    )
+
+    start = time.perf_counter()
+    status = run_tasks(tasks, output_root / MARKER_DIR, args.n_jobs)
+    counts = Counter(status.values())
+    print(
+        f"[Runner] Finished in {time.perf_counter() - start:.1f}s: "
+        + ", ".join(f"{n} {s}" for s, n in sorted(counts.items()))
+    )
+    if counts["failed"] or counts["blocked"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
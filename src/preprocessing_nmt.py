@@ -4,46 +4,176 @@ Handles text cleaning, normalization, filtering, and export to .src / .tgt files
 """
 
 import re
+from itertools import repeat
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
 
 from src.config import (
     MAX_SENT_LEN,
     MIN_SENT_LEN,
+    NEAR_DUP_THRESHOLD,
     PROCESSED_DIR,
     SOURCE_COL,
     TARGET_COL,
     TRAIN_SPLIT,
 )
+from src.instrumentation import frame_tokens, instrument
+from src.near_duplicates import drop_near_duplicates
+from src.shards import export_token_shards
+from src.utils import parallel_imap
 
 # ============================================================
 # Text normalization
 # ============================================================
 
+_NON_LETTER_RE = re.compile(r"[^a-záéíóúüñ\s]")  # keep Spanish/Philippine diacritics
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Joining a whole column into one string lets each regex run once per chunk
+# instead of once per sentence. NUL is not whitespace, so `\s+` never crosses
+# a row boundary, and it is whitelisted so the first pattern keeps it.
+_ROW_SEP = "\x00"
+_NON_LETTER_JOINED_RE = re.compile(r"[^a-záéíóúüñ\s\x00]")
+_ROW_EDGE_SPACE_RE = re.compile(r" ?\x00 ?")
+
+PREPROCESS_CHUNK_SIZE = 200_000
+
 
 def normalize_text(text: str) -> str:
     """Lowercase, remove unwanted characters, and normalize spacing."""
     if not isinstance(text, str):
         return ""
     text = text.lower()
-    text = re.sub(r"[^a-záéíóúüñ\s]", "", text)  # keep Spanish/Philippine diacritics
-    text = re.sub(r"\s+", " ", text).strip()
+    text = _NON_LETTER_RE.sub("", text)
+    text = _WHITESPACE_RE.sub(" ", text).strip()
     return text
 
 
+def normalize_series(texts: pd.Series) -> list[str]:
+    """
+    Apply `normalize_text` to a whole Series at once.
+
+    Produces exactly the same strings as the per-row function, but runs each
+    regex over the concatenated column rather than once per sentence.
+    """
+    values = [t if isinstance(t, str) else "" for t in texts]
+    joined = _ROW_SEP.join(values)
+
+    # Rows that already contain the separator cannot be split back reliably.
+    if joined.count(_ROW_SEP) != max(len(values) - 1, 0):
+        return [normalize_text(t) for t in values]
+
+    joined = _NON_LETTER_JOINED_RE.sub("", joined.lower())
+    joined = _WHITESPACE_RE.sub(" ", joined)
+    joined = _ROW_EDGE_SPACE_RE.sub(_ROW_SEP, joined).strip(" ")
+    return joined.split(_ROW_SEP) if values else []
+
+
+def count_tokens(texts: list[str]) -> np.ndarray:
+    """Whitespace token counts of already-normalized sentences."""
+    n_spaces = np.fromiter(map(str.count, texts, repeat(" ")), np.int64, len(texts))
+    non_empty = np.fromiter(map(bool, texts), bool, len(texts))
+    return np.where(non_empty, n_spaces + 1, 0)
+
+
+def normalize_pairs(
+    src: pd.Series,
+    tgt: pd.Series,
+    min_sent_len: int = MIN_SENT_LEN,
+    max_sent_len: int = MAX_SENT_LEN,
+) -> tuple[list[str], list[str], np.ndarray]:
+    """Normalize aligned source/target sentences and compute the length mask."""
+    src_tokens = normalize_series(src)
+    tgt_tokens = normalize_series(tgt)
+    keep = _valid_length(
+        count_tokens(src_tokens), count_tokens(tgt_tokens), min_sent_len, max_sent_len
+    )
+    return src_tokens, tgt_tokens, keep
+
+
+def _normalize_chunk(
+    chunk: tuple[pd.Series, pd.Series, int, int],
+) -> tuple[list[str], list[str], np.ndarray]:
+    return normalize_pairs(*chunk)
+
+
 # ============================================================
 # Main preprocessing pipeline
 # ============================================================
 
 
+@instrument("preprocess_nmt", tokens=frame_tokens)
 def preprocess_corpus(
-    df: pd.DataFrame, src_col: str = SOURCE_COL, tgt_col: str = TARGET_COL
+    df: pd.DataFrame,
+    src_col: str = SOURCE_COL,
+    tgt_col: str = TARGET_COL,
+    n_jobs: int = 1,
+    chunk_size: int = PREPROCESS_CHUNK_SIZE,
+    near_dup_threshold: float | None = NEAR_DUP_THRESHOLD,
+    near_dup_report: Path | None = None,
+    min_sent_len: int = MIN_SENT_LEN,
+    max_sent_len: int = MAX_SENT_LEN,
 ) -> pd.DataFrame:
-    """Clean, normalize, and filter parallel text pairs."""
+    """
+    Clean, normalize, and filter parallel text pairs.
+
+    Normalization runs in chunks of `chunk_size` rows. With `n_jobs != 1` the
+    chunks are spread over a process pool; the output is identical either way.
+
+    With a `near_dup_threshold` (off unless `NEAR_DUP_THRESHOLD` is set), pairs
+    that are near duplicates of an earlier pair are dropped too, so they cannot
+    end up on both sides of the train/valid split; `near_dup_report` lists them.
+    Pairs with a side outside `[min_sent_len, max_sent_len]` tokens are dropped.
+    """
     print(f"\n[Preprocessing] Cleaning and filtering {len(df):,} sentence pairs...")
 
+    df = drop_invalid_rows(df, src_col, tgt_col)
+
+    chunks = (
+        (
+            df[src_col].iloc[start : start + chunk_size],
+            df[tgt_col].iloc[start : start + chunk_size],
+            min_sent_len,
+            max_sent_len,
+        )
+        for start in range(0, len(df), chunk_size)
+    )
+    src_tokens: list[str] = []
+    tgt_tokens: list[str] = []
+    keep: list[np.ndarray] = []
+    for src_chunk, tgt_chunk, keep_chunk in parallel_imap(
+        _normalize_chunk, chunks, n_jobs=n_jobs
+    ):
+        src_tokens.extend(src_chunk)
+        tgt_tokens.extend(tgt_chunk)
+        keep.append(keep_chunk)
+
+    # Attach normalized text
+    df["src_tokens"] = pd.Series(src_tokens, index=df.index, dtype=object)
+    df["tgt_tokens"] = pd.Series(tgt_tokens, index=df.index, dtype=object)
+
+    # Filter by sentence length
+    if keep:
+        df = df[np.concatenate(keep)]
+
+    df = df.drop_duplicates(subset=["src_tokens", "tgt_tokens"])
+    df = df.reset_index(drop=True)
+    if near_dup_threshold is not None:
+        df = drop_near_duplicates(
+            df,
+            threshold=near_dup_threshold,
+            n_jobs=n_jobs,
+            report_path=near_dup_report,
+        )
+
+    print(f"[Preprocessing] {len(df):,} valid sentence pairs remain after cleaning.")
+    return df
+
+
+def drop_invalid_rows(df: pd.DataFrame, src_col: str, tgt_col: str) -> pd.DataFrame:
+    """Drop missing/placeholder translations and verse metadata columns."""
     df = df.copy()
 
     # Drop invalid rows
@@ -57,27 +187,21 @@ def preprocess_corpus(
         if col in df.columns:
             df = df.drop(col, axis=1)
 
-    # Normalize text
-    df["src_tokens"] = df[src_col].apply(normalize_text)
-    df["tgt_tokens"] = df[tgt_col].apply(normalize_text)
-
-    # Filter by sentence length
-    df = df[df.apply(_valid_length, axis=1)]
-
-    df = df.drop_duplicates(subset=["src_tokens", "tgt_tokens"])
-    df = df.reset_index(drop=True)
-
-    print(f"[Preprocessing] {len(df):,} valid sentence pairs remain after cleaning.")
     return df
 
 
-def _valid_length(row) -> bool:
+def _valid_length(
+    src_len: np.ndarray,
+    tgt_len: np.ndarray,
+    min_sent_len: int = MIN_SENT_LEN,
+    max_sent_len: int = MAX_SENT_LEN,
+) -> np.ndarray:
     """Check if source and target sentence lengths are within thresholds."""
-    src_len = len(row["src_tokens"].split())
-    tgt_len = len(row["tgt_tokens"].split())
     return (
-        MIN_SENT_LEN <= src_len <= MAX_SENT_LEN
-        and MIN_SENT_LEN <= tgt_len <= MAX_SENT_LEN
+        (src_len >= min_sent_len)
+        & (src_len <= max_sent_len)
+        & (tgt_len >= min_sent_len)
+        & (tgt_len <= max_sent_len)
     )
 
 
@@ -107,10 +231,21 @@ def export_opennmt_files(
 # ============================================================
 
 
+@instrument("split_and_export", tokens=frame_tokens, measure="df")
 def split_and_export(
-    df: pd.DataFrame, train_split: float = TRAIN_SPLIT, output_dir: Path = PROCESSED_DIR
+    df: pd.DataFrame,
+    train_split: float = TRAIN_SPLIT,
+    output_dir: Path = PROCESSED_DIR,
+    export_ids: bool = False,
 ) -> None:
-    """Split dataset into train/valid and export both splits."""
+    """
+    Split dataset into train/valid and export both splits.
+
+    With `export_ids`, also writes vocabularies and memory-mappable token-id
+    shards (see `src.shards`) next to the text files.
+    """
+    from sklearn.model_selection import train_test_split  # slow to import
+
     print(f"[Splitting] Train ratio = {train_split}")
     train_df, valid_df = train_test_split(
         df, train_size=train_split, random_state=26, shuffle=True
@@ -118,5 +253,13 @@ def split_and_export(
 
     export_opennmt_files(train_df, "train", output_dir)
     export_opennmt_files(valid_df, "valid", output_dir)
+    if export_ids:
+        export_token_shards(
+            {
+                name: (split["src_tokens"].tolist(), split["tgt_tokens"].tolist())
+                for name, split in (("train", train_df), ("valid", valid_df))
+            },
+            output_dir,
+        )
 
     print("[Done] Train/valid splits exported successfully.")
@@ -6,15 +6,29 @@ Handles text cleaning, tokenization, and word class creation via FastText embedd
 import json
 import multiprocessing
 import re
+from collections.abc import Iterable, Iterator, Sequence
+from itertools import chain
 from pathlib import Path
-
-import nltk
-import numpy as np
-import pandas as pd
-from gensim.models import FastText
-from sklearn.cluster import KMeans
-
-from src.config import PROCESSED_DIR, RANDOM_SEED, SOURCE_COL, TARGET_COL
+from typing import TYPE_CHECKING
+
+from src.config import (
+    NEAR_DUP_THRESHOLD,
+    PROCESSED_DIR,
+    RANDOM_SEED,
+    SOURCE_COL,
+    TARGET_COL,
+)
+from src.instrumentation import frame_tokens, instrument
+
+# Third-party packages are imported in the functions that need them (nltk,
+# gensim, and scikit-learn alone take seconds), so that workers which only
+# call `normalize_text` start in milliseconds.
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+    from gensim.models import FastText
+
+KMEANS_BATCH_SIZE = 4096  # word vectors per mini-batch k-means step
 
 # ============================================================
 # Normalization and tokenization
@@ -34,12 +48,86 @@ def normalize_text(text: str) -> str:
 
 def tokenize_sentence(text: str) -> list[str]:
     """Simple work tokenizer."""
+    import nltk
+
     return nltk.word_tokenize(text)
 
 
+# On normalized text (lowercase letters and single spaces) nltk's Punkt
+# sentence splitter and all Treebank punctuation rules are no-ops. The only
+# rules left are MacIntyre's contractions, which split these words after
+# their third letter ("cannot" -> "can", "not").
+_SPLIT_CONTRACTIONS = frozenset({"cannot", "gimme", "gonna", "gotta", "lemme", "wanna"})
+
+
+def split_normalized(text: str) -> list[str]:
+    """
+    Tokenize the output of `normalize_text` without nltk.
+
+    Gives exactly the tokens of `tokenize_sentence` (`nltk.word_tokenize`) on
+    normalized text; see `tokenizer_mismatches`. Not valid for raw text.
+    """
+    tokens = text.split()
+    if _SPLIT_CONTRACTIONS.isdisjoint(tokens):
+        return tokens
+    return [
+        part
+        for token in tokens
+        for part in (
+            (token[:3], token[3:]) if token in _SPLIT_CONTRACTIONS else (token,)
+        )
+    ]
+
+
 def preprocess_sentence(text: str) -> list[str]:
     """Full text normalization and tokenization pipeline."""
-    return tokenize_sentence(normalize_text(text))
+    return split_normalized(normalize_text(text))
+
+
+def _preprocess_chunk(texts: list[str]) -> list[list[str]]:
+    from src.preprocessing_nmt import normalize_series
+
+    return [split_normalized(text) for text in normalize_series(texts)]
+
+
+def preprocess_batch(
+    texts: Iterable[str], n_jobs: int = 1, chunk_size: int = 50_000
+) -> list[list[str]]:
+    """
+    `preprocess_sentence` over many sentences, e.g. a DataFrame column.
+
+    Normalizes each chunk of `chunk_size` sentences with one set of regex
+    passes, then splits it into tokens. With `n_jobs != 1` the chunks are
+    spread over a process pool; the output is identical either way.
+    """
+    from src.utils import chunked, parallel_imap
+
+    return list(
+        chain.from_iterable(
+            parallel_imap(_preprocess_chunk, chunked(texts, chunk_size), n_jobs)
+        )
+    )
+
+
+def tokenizer_mismatches(texts: Iterable[str]) -> list[tuple[str, list, list]]:
+    """
+    Check the batch tokenizer against `nltk.word_tokenize`.
+
+    Returns `(normalized text, nltk tokens, batch tokens)` for every sentence
+    where the two disagree; an empty list means they are equivalent.
+    """
+    texts = list(texts)
+    normalized = [normalize_text(t) for t in texts]
+    return [
+        (text, expected, actual)
+        for text, expected, actual in zip(
+            normalized,
+            map(tokenize_sentence, normalized),
+            preprocess_batch(texts),
+            strict=True,
+        )
+        if expected != actual
+    ]
 
 
 # ============================================================
@@ -47,19 +135,44 @@ def preprocess_sentence(text: str) -> list[str]:
 # ============================================================
 
 
+class TokenCorpus:
+    """
+    Restartable iterable over several lists of tokenized sentences.
+
+    FastText iterates over its corpus once per epoch; chaining the source and
+    target columns this way avoids concatenating them into a new list.
+    """
+
+    def __init__(self, *parts: Sequence[list[str]]):
+        self.parts = parts
+
+    def __iter__(self) -> Iterator[list[str]]:
+        return chain.from_iterable(self.parts)
+
+    def __len__(self) -> int:
+        return sum(map(len, self.parts))
+
+
+@instrument(
+    "train_fasttext",
+    rows=lambda model: model.corpus_count,
+    tokens=lambda model: model.corpus_total_words,
+)
 def train_fasttext(
-    sentences: list[list[str]],
+    sentences: Iterable[list[str]],
     min_count: int = 3,
     vector_size: int = 100,
     epochs: int = 10,
     min_n: int = 3,
     max_n: int = 6,
     model_path: Path | None = None,
-) -> FastText:
+) -> "FastText":
     """
     Train a FastText model on the tokenized corpus.
     Saves model if a path is provided.
     """
+    from gensim.models import FastText
+
     print(f"\n[FastText] Training on {len(sentences):,} sentences...")
 
     model = FastText(
@@ -79,53 +192,225 @@ def train_fasttext(
     return model
 
 
+def update_fasttext(
+    model_path: Path, sentences: Iterable[list[str]], epochs: int | None = None
+) -> "FastText":
+    """
+    Continue training a saved FastText model on an updated corpus.
+
+    New words that pass the model's `min_count` are added to the vocabulary;
+    existing vectors are fine-tuned instead of learned from scratch. The
+    updated model is saved back to `model_path`.
+    """
+    from gensim.models import FastText
+
+    model = FastText.load(str(model_path))
+    n_words = len(model.wv)
+    print(f"\n[FastText] Updating {model_path} on {len(sentences):,} sentences...")
+
+    model.build_vocab(sentences, update=True)
+    model.train(sentences, total_examples=len(sentences), epochs=epochs or model.epochs)
+    model.save(str(model_path))
+    print(f"[FastText] {len(model.wv) - n_words:,} new words; saved to {model_path}")
+    return model
+
+
+def word_vectors(model: "FastText") -> tuple[list[str], "np.ndarray"]:
+    """
+    Vocabulary and embedding matrix of a FastText model, without copying.
+
+    Row `i` of `model.wv.vectors` is the vector of `index_to_key[i]`, the same
+    value `model.wv[word]` returns for in-vocabulary words.
+    """
+    return model.wv.index_to_key, model.wv.vectors
+
+
+def fit_centroids(
+    vectors: "np.ndarray",
+    n_clusters: int = 100,
+    random_state: int = RANDOM_SEED,
+    batch_size: int = KMEANS_BATCH_SIZE,
+    n_epochs: int = 5,
+    init: "np.ndarray | None" = None,
+) -> "np.ndarray":
+    """
+    Mini-batch k-means over row slices of `vectors`.
+
+    Each `partial_fit` sees one contiguous slice (a view, not a copy), so
+    memory stays bounded by `batch_size` rows regardless of vocabulary size.
+    The slice order is reshuffled every epoch. `init` warm-starts from
+    previously fitted centroids.
+
+    Returns:
+        (n_clusters, dim) centroid matrix.
+    """
+    import numpy as np
+    from sklearn.cluster import MiniBatchKMeans
+
+    if len(vectors) < n_clusters:
+        raise ValueError(f"{len(vectors)} vectors cannot form {n_clusters} clusters.")
+    batch_size = max(batch_size, n_clusters)
+    kmeans = MiniBatchKMeans(
+        n_clusters=n_clusters,
+        init="k-means++" if init is None else init,
+        n_init=1,
+        batch_size=batch_size,
+        random_state=random_state,
+    )
+    rng = np.random.default_rng(random_state)
+    starts = np.arange(0, len(vectors), batch_size)
+    for _ in range(n_epochs):
+        for start in rng.permutation(starts):
+            batch = vectors[start : start + batch_size]
+            # The first batch initializes the centroids and needs n_clusters rows
+            if len(batch) >= n_clusters or hasattr(kmeans, "cluster_centers_"):
+                kmeans.partial_fit(batch)
+    return kmeans.cluster_centers_
+
+
+def assign_clusters(
+    vectors: "np.ndarray", centroids: "np.ndarray", batch_size: int = KMEANS_BATCH_SIZE
+) -> "np.ndarray":
+    """Index of the nearest centroid for every row, computed slice by slice."""
+    import numpy as np
+
+    sq_norms = (centroids**2).sum(axis=1)
+    labels = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), batch_size):
+        batch = vectors[start : start + batch_size]
+        # argmin ||x - c||^2 = argmin (||c||^2 - 2 x.c); ||x||^2 is constant per row
+        labels[start : start + len(batch)] = (
+            sq_norms - 2 * batch @ centroids.T
+        ).argmin(1)
+    return labels
+
+
 def cluster_words(
-    model: FastText, n_clusters: int = 100, random_state: int = RANDOM_SEED
+    model: "FastText",
+    n_clusters: int = 100,
+    random_state: int = RANDOM_SEED,
+    scalable: bool = False,
+    batch_size: int = KMEANS_BATCH_SIZE,
 ) -> dict[str, int]:
     """
     Cluster word embeddings into word classes using KMeans.
     Returns a mapping from word -> class ID.
+
+    With `scalable`, uses bounded-memory mini-batch k-means (`fit_centroids`)
+    instead of full-batch KMeans with 10 restarts.
     """
-    vocab = [*map(str, model.wv.key_to_index)]
+    word2class, _ = _cluster_words(
+        model, n_clusters, random_state, scalable, batch_size
+    )
+    return word2class
+
 
-    vectors = np.array([model.wv[w] for w in vocab])
+@instrument("cluster_words", rows=lambda result: len(result[0]))
+def _cluster_words(
+    model: "FastText",
+    n_clusters: int,
+    random_state: int,
+    scalable: bool,
+    batch_size: int,
+) -> tuple[dict[str, int], "np.ndarray"]:
+    vocab, vectors = word_vectors(model)
 
     print(
-        f"[Clustering] Running KMeans on {len(vocab):,} "
-        f"word vectors ({vectors.shape[1]} dims) ..."
+        f"[Clustering] Running {'mini-batch ' if scalable else ''}KMeans on "
+        f"{len(vocab):,} word vectors ({vectors.shape[1]} dims) ..."
     )
 
-    kmeans = KMeans(n_clusters=n_clusters, random_state=random_state, n_init=10)
-    labels = [int(label) for label in kmeans.fit_predict(vectors)]
+    if scalable:
+        centroids = fit_centroids(
+            vectors, n_clusters, random_state, batch_size=batch_size
+        )
+        labels = assign_clusters(vectors, centroids, batch_size)
+    else:
+        from sklearn.cluster import KMeans
 
-    word2class = dict(zip(vocab, labels, strict=True))
+        kmeans = KMeans(n_clusters=n_clusters, random_state=random_state, n_init=10)
+        labels = kmeans.fit_predict(vectors)
+        centroids = kmeans.cluster_centers_
+
+    word2class = dict(zip(vocab, labels.tolist(), strict=True))
     print(f"[Clustering] Done — created {n_clusters} clusters.")
 
-    return word2class
+    return word2class, centroids
+
+
+def assign_new_words(
+    model: "FastText",
+    word2class: dict[str, int],
+    centroids: "np.ndarray",
+    batch_size: int = KMEANS_BATCH_SIZE,
+) -> dict[str, int]:
+    """
+    Extend an existing word-to-class mapping after a corpus update.
+
+    Words that already have a class keep it; only words missing from
+    `word2class` are assigned to their nearest centroid.
+    """
+    import numpy as np
+
+    vocab, vectors = word_vectors(model)
+    new_idx = np.fromiter(
+        (i for i, word in enumerate(vocab) if word not in word2class), np.int64
+    )
+    labels = assign_clusters(vectors[new_idx], centroids, batch_size)
+    updated = dict(word2class)
+    updated.update(zip((vocab[i] for i in new_idx), labels.tolist(), strict=True))
+    print(f"[Clustering] Assigned {len(new_idx):,} new words to existing classes.")
+    return updated
 
 
 def save_word_classes(
     word2class: dict[str, int],
     output_path: Path = PROCESSED_DIR / "word_classes.json",
 ):
-    """Save word-to-class mapping as JSON."""
+    """
+    Save word-to-class mapping as JSON, plus the memory-mapped binary store
+    next to it (`word_classes.bin`, see `src.word_classes`).
+    """
+    from src.word_classes import write_word_classes
+
     output_path.parent.mkdir(parents=True, exist_ok=True)
     with open(output_path, "w", encoding="utf8") as f:
         json.dump(word2class, f, ensure_ascii=False, indent=2)
+    write_word_classes(word2class, output_path.with_suffix(".bin"))
     print(f"[Save] Word classes saved to {output_path}")
 
 
+def load_word_classes(
+    path: Path = PROCESSED_DIR / "word_classes.json",
+) -> dict[str, int]:
+    """Load a word-to-class mapping saved by `save_word_classes`."""
+    with open(path, encoding="utf8") as f:
+        return json.load(f)
+
+
+def centroids_path(word_classes_path: Path) -> Path:
+    """Where the centroids of a word-class mapping are stored."""
+    return word_classes_path.with_suffix(".centroids.npy")
+
+
 # ============================================================
 # Corpus-level preprocessing pipeline
 # ============================================================
 
 
+@instrument("preprocess_smt", tokens=frame_tokens)
 def preprocess_corpus(
-    df: pd.DataFrame, src_col: str = SOURCE_COL, tgt_col: str = TARGET_COL
-) -> pd.DataFrame:
+    df: "pd.DataFrame",
+    src_col: str = SOURCE_COL,
+    tgt_col: str = TARGET_COL,
+    n_jobs: int = 1,
+    near_dup_threshold: float | None = NEAR_DUP_THRESHOLD,
+    near_dup_report: Path | None = None,
+) -> "pd.DataFrame":
     """
     Preprocess both source and target texts in a DataFrame.
-    Drops rows with missing or invalid translations (e.g., "N/A").
+    Drops rows with missing or invalid translations (e.g., "N/A"), and with
+    `near_dup_threshold` also near-duplicate pairs (see `src.near_duplicates`).
     Returns a new DataFrame with tokenized columns.
     """
     print(f"\n[Preprocessing] Cleaning and tokenizing columns: {src_col}, {tgt_col}")
@@ -139,33 +424,83 @@ def preprocess_corpus(
 
     print(f"[Preprocessing] {len(df):,} valid sentence pairs remaining after cleaning.")
 
-    df["src_tokens"] = df[src_col].apply(preprocess_sentence)
-    df["tgt_tokens"] = df[tgt_col].apply(preprocess_sentence)
+    import pandas as pd
+
+    for col, tokens_col in ((src_col, "src_tokens"), (tgt_col, "tgt_tokens")):
+        tokens = preprocess_batch(df[col], n_jobs=n_jobs)
+        df[tokens_col] = pd.Series(tokens, index=df.index, dtype=object)
+
+    if near_dup_threshold is not None:
+        from src.near_duplicates import drop_near_duplicates
+
+        df = drop_near_duplicates(
+            df,
+            threshold=near_dup_threshold,
+            n_jobs=n_jobs,
+            report_path=near_dup_report,
+        )
 
     print("[Preprocessing] Done.")
     return df
 
 
 def build_word_classes(
-    df: pd.DataFrame,
+    df: "pd.DataFrame",
     output_path: Path = PROCESSED_DIR / "word_classes.json",
     vector_size: int = 100,
     n_clusters: int = 100,
+    scalable: bool = False,
+    model_path: Path | None = None,
+    warm_start: bool = False,
 ) -> dict[str, int]:
     """
     Builds word embeddings using FastText and clusters them into word classes.
-    Saves the mapping to disk.
+    Saves the mapping to disk, with the class centroids next to it
+    (`word_classes.centroids.npy`).
+
+    Args:
+        df: Output of `preprocess_corpus()`.
+        output_path: JSON file of the word-to-class mapping.
+        vector_size: FastText embedding size.
+        n_clusters: Number of word classes.
+        scalable: Use bounded-memory mini-batch k-means for large vocabularies.
+        model_path: Where the FastText model is saved (and loaded from).
+        warm_start: If `model_path` exists, continue training that model on
+            `df` instead of starting over. If a mapping and centroids also
+            exist at `output_path`, known words keep their class and only
+            new words are assigned to the nearest centroid. Without a model
+            to continue, a fresh model is trained and clustered from scratch,
+            since old centroids do not fit a new embedding space.
     """
+    import numpy as np
+
     if "src_tokens" not in df or "tgt_tokens" not in df:
         raise ValueError(
             "DataFrame must contain 'src_tokens' and 'tgt_tokens' columns. "
             "Run preprocess_corpus() first."
         )
 
-    all_sentences = df["src_tokens"].tolist() + df["tgt_tokens"].tolist()
+    corpus = TokenCorpus(df["src_tokens"].tolist(), df["tgt_tokens"].tolist())
+    centroids_file = centroids_path(output_path)
+
+    warm_model = warm_start and model_path is not None and Path(model_path).exists()
+    if warm_model:
+        model = update_fasttext(Path(model_path), corpus)
+    else:
+        if warm_start:
+            print("[FastText] No model to warm-start from; clustering from scratch.")
+        model = train_fasttext(corpus, vector_size=vector_size, model_path=model_path)
 
-    model = train_fasttext(all_sentences, vector_size=vector_size)
-    word2class = cluster_words(model, n_clusters=n_clusters)
+    if warm_model and output_path.exists() and centroids_file.exists():
+        word2class = assign_new_words(
+            model, load_word_classes(output_path), np.load(centroids_file)
+        )
+    else:
+        word2class, centroids = _cluster_words(
+            model, n_clusters, RANDOM_SEED, scalable, batch_size=KMEANS_BATCH_SIZE
+        )
+        centroids_file.parent.mkdir(parents=True, exist_ok=True)
+        np.save(centroids_file, centroids)
 
     save_word_classes(word2class, output_path)
     return word2class
@@ -0,0 +1,528 @@
+"""
+Local translation server for trained PyTorch checkpoints.
+Loads `gru_*_model.pt` files once, gathers concurrent requests into
+micro-batches, and caches recent translations. CPU-only, standard library HTTP.
+
+Start the server, then load-test it from another shell:
+    python -m src.server serve --models-dir outputs
+    python -m src.server load-test data/translations/test.src --concurrency 32
+
+Endpoints:
+    POST /translate  {"sentences": [...], "model": "base"} -> {"translations": [...]}
+    GET  /metrics    latency percentiles, batch fill, and cache statistics
+    GET  /health     loaded model names
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import OrderedDict, deque
+from collections.abc import Callable, Sequence
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from src.config import (
+    BEAM_SIZE,
+    MAX_DECODE_LEN,
+    MODELS_DIR,
+    SERVER_CACHE_SIZE,
+    SERVER_HOST,
+    SERVER_MAX_BATCH_SIZE,
+    SERVER_MAX_WAIT_MS,
+    SERVER_PORT,
+)
+from src.inference import translate_batch
+from src.model import load_checkpoint
+from src.preprocessing_nmt import normalize_text
+from src.utils import load_file
+
+METRICS_WINDOW = 10_000  # latest requests and batches kept for percentiles
+
+# ============================================================
+# Cache and metrics
+# ============================================================
+
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry."""
+
+    def __init__(self, maxsize: int = SERVER_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+        self._data: OrderedDict[str, str] = OrderedDict()
+
+    def get(self, key: str) -> str | None:
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: str) -> None:
+        if self.maxsize <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ServerMetrics:
+    """Rolling request latencies and batch sizes for one model."""
+
+    def __init__(self, window: int = METRICS_WINDOW):
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.batch_sizes: deque[int] = deque(maxlen=window)
+        self.requests = self.sentences = self.batches = 0
+
+    def snapshot(self, max_batch_size: int) -> dict[str, float]:
+        latencies = np.asarray(self.latencies) * 1000
+        sizes = np.asarray(self.batch_sizes)
+        p50, p99 = np.percentile(latencies, [50, 99]) if len(latencies) else (0, 0)
+        return {
+            "requests": self.requests,
+            "sentences": self.sentences,
+            "batches": self.batches,
+            "latency_p50_ms": round(float(p50), 2),
+            "latency_p99_ms": round(float(p99), 2),
+            "mean_batch_size": round(float(sizes.mean()), 2) if len(sizes) else 0.0,
+            "batch_fill": round(float(sizes.mean()) / max_batch_size, 3)
+            if len(sizes)
+            else 0.0,
+        }
+
+
+# ============================================================
+# Micro-batching
+# ============================================================
+
+
+class MicroBatcher:
+    """
+    Collects sentences from concurrent requests into decoding batches.
+
+    The first queued sentence waits at most `max_wait` seconds for others to
+    join; a batch is dispatched as soon as it holds `max_batch_size` distinct
+    sentences. Decoding runs in a worker thread so the event loop keeps
+    accepting requests meanwhile. Identical sentences share one decode, and
+    results are kept in an LRU cache keyed by the normalized sentence.
+    """
+
+    def __init__(
+        self,
+        translate_fn: Callable[[list[str]], list[str]],
+        max_batch_size: int = SERVER_MAX_BATCH_SIZE,
+        max_wait_ms: float = SERVER_MAX_WAIT_MS,
+        cache_size: int = SERVER_CACHE_SIZE,
+    ):
+        self.translate_fn = translate_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.cache = LRUCache(cache_size)
+        self.metrics = ServerMetrics()
+        self._queue: asyncio.Queue[tuple[str, asyncio.Future]] = asyncio.Queue()
+        self._worker: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker:
+            self._worker.cancel()
+
+    async def translate(self, sentences: Sequence[str]) -> list[str]:
+        """Translate one request's sentences, awaiting their batches."""
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        results: list[str | asyncio.Future] = []
+        for sentence in sentences:
+            key = normalize_text(sentence)
+            cached = self.cache.get(key)
+            if cached is None:
+                cached = loop.create_future()
+                self._queue.put_nowait((key, cached))
+            results.append(cached)
+
+        translations = [
+            await r if isinstance(r, asyncio.Future) else r for r in results
+        ]
+        self.metrics.requests += 1
+        self.metrics.sentences += len(sentences)
+        self.metrics.latencies.append(time.perf_counter() - start)
+        return translations
+
+    async def _next_batch(self) -> dict[str, list[asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        key, future = await self._queue.get()
+        batch = {key: [future]}
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                key, future = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    key, future = await asyncio.wait_for(self._queue.get(), timeout)
+                except TimeoutError:
+                    break
+            batch.setdefault(key, []).append(future)
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            keys = list(batch)
+            try:
+                outputs = await asyncio.to_thread(self.translate_fn, keys)
+            except Exception as e:  # report to the waiting requests, keep serving
+                for futures in batch.values():
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(e)
+                continue
+
+            self.metrics.batches += 1
+            self.metrics.batch_sizes.append(len(keys))
+            for key, output in zip(keys, outputs, strict=True):
+                self.cache.put(key, output)
+                for future in batch[key]:
+                    if not future.done():
+                        future.set_result(output)
+
+
+# ============================================================
+# HTTP server
+# ============================================================
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Server Error"}
+
+
+def model_name(path: Path) -> str:
+    """`gru_base_model.pt` -> `base`."""
+    return path.stem.removeprefix("gru_").removesuffix("_model")
+
+
+def load_models(
+    models_dir: Path = MODELS_DIR, pattern: str = "gru_*_model.pt"
+) -> dict[str, tuple]:
+    """Load every matching checkpoint on the CPU, keyed by model name."""
+    models = {}
+    for path in sorted(Path(models_dir).glob(pattern)):
+        models[model_name(path)] = load_checkpoint(path, torch.device("cpu"))
+        print(f"[Server] Loaded {path.name} as '{model_name(path)}'")
+    if not models:
+        raise FileNotFoundError(f"No checkpoints matching {pattern} in {models_dir}")
+    return models
+
+
+class TranslationServer:
+    """
+    Minimal HTTP/1.1 JSON server with one `MicroBatcher` per model.
+
+    Connections are kept alive between requests, so a client can reuse one
+    socket for many translations.
+    """
+
+    def __init__(
+        self,
+        models: dict[str, tuple],
+        max_batch_size: int = SERVER_MAX_BATCH_SIZE,
+        max_wait_ms: float = SERVER_MAX_WAIT_MS,
+        cache_size: int = SERVER_CACHE_SIZE,
+        beam_size: int = BEAM_SIZE,
+        max_len: int = MAX_DECODE_LEN,
+    ):
+        self.models = models
+        self.default_model = next(iter(models))
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.cache_size = cache_size
+        self.beam_size = beam_size
+        self.max_len = max_len
+        self.batchers: dict[str, MicroBatcher] = {}
+
+    def _translate_fn(self, name: str) -> Callable[[list[str]], list[str]]:
+        model, src_vocab, tgt_vocab = self.models[name]
+
+        def translate(sentences: list[str]) -> list[str]:
+            return translate_batch(
+                model,
+                sentences,
+                src_vocab,
+                tgt_vocab,
+                self.beam_size,
+                self.max_len,
+                self.max_batch_size,
+            )
+
+        return translate
+
+    async def start(
+        self,
+        host: str = SERVER_HOST,
+        port: int = SERVER_PORT,
+        unix_path: Path | None = None,
+    ) -> asyncio.Server:
+        for name in self.models:
+            self.batchers[name] = MicroBatcher(
+                self._translate_fn(name),
+                self.max_batch_size,
+                self.max_wait_ms,
+                self.cache_size,
+            )
+            self.batchers[name].start()
+
+        if unix_path:
+            server = await asyncio.start_unix_server(self._handle, path=unix_path)
+            print(f"[Server] Listening on unix:{unix_path}")
+        else:
+            server = await asyncio.start_server(self._handle, host, port)
+            print(f"[Server] Listening on http://{host}:{port}")
+        return server
+
+    def metrics(self) -> dict[str, dict]:
+        return {
+            name: {
+                **batcher.metrics.snapshot(self.max_batch_size),
+                "cache_entries": len(batcher.cache),
+                "cache_hits": batcher.cache.hits,
+                "cache_misses": batcher.cache.misses,
+            }
+            for name, batcher in self.batchers.items()
+        }
+
+    async def _route(self, method: str, path: str, body: bytes) -> tuple[int, dict]:
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok", "models": list(self.models)}
+        if method == "GET" and path == "/metrics":
+            return 200, self.metrics()
+        if method != "POST" or path != "/translate":
+            return 404, {"error": f"No route for {method} {path}"}
+
+        try:
+            request = json.loads(body or b"{}")
+            sentences = request.get("sentences")
+            if sentences is None:
+                sentences = [request["text"]]
+            name = request.get("model", self.default_model)
+        except (ValueError, KeyError, AttributeError):
+            return 400, {"error": 'Expected {"sentences": [...]} or {"text": "..."}'}
+        if name not in self.batchers:
+            return 404, {"error": f"Unknown model '{name}'"}
+        if not isinstance(sentences, list) or not all(
+            isinstance(s, str) for s in sentences
+        ):
+            return 400, {"error": "'sentences' must be a list of strings"}
+
+        translations = await self.batchers[name].translate(sentences)
+        return 200, {"model": name, "translations": translations}
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while request := await _read_http(reader):
+                start_line, headers, body = request
+                method, path, *_ = start_line.split()
+                try:
+                    status, payload = await self._route(method, path, body)
+                except Exception as e:
+                    status, payload = 500, {"error": str(e)}
+                keep_alive = headers.get("connection", "").lower() != "close"
+                _write_http(writer, f"HTTP/1.1 {status} {_REASONS[status]}", payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _read_http(
+    reader: asyncio.StreamReader,
+) -> tuple[str, dict[str, str], bytes] | None:
+    """Read one request or response; None when the peer closed the connection."""
+    start_line = await reader.readline()
+    if not start_line:
+        return None
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get("content-length", 0)))
+    return start_line.decode("latin-1").strip(), headers, body
+
+
+def _write_http(writer: asyncio.StreamWriter, start_line: str, payload: dict) -> None:
+    body = json.dumps(payload, ensure_ascii=False).encode()
+    writer.write(
+        f"{start_line}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode()
+        + body
+    )
+
+
+# ============================================================
+# Load-test client
+# ============================================================
+
+
+async def _open(
+    host: str, port: int, unix_path: Path | None
+) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    if unix_path:
+        return await asyncio.open_unix_connection(unix_path)
+    return await asyncio.open_connection(host, port)
+
+
+async def request(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    method: str,
+    path: str,
+    payload: dict | None = None,
+) -> dict:
+    """Send one request over an open keep-alive connection."""
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode()
+        + body
+    )
+    await writer.drain()
+    response = await _read_http(reader)
+    if response is None:
+        raise ConnectionError("Server closed the connection.")
+    return json.loads(response[2])
+
+
+async def load_test(
+    sentences: Sequence[str],
+    n_requests: int = 1000,
+    concurrency: int = 16,
+    model: str | None = None,
+    host: str = SERVER_HOST,
+    port: int = SERVER_PORT,
+    unix_path: Path | None = None,
+) -> dict[str, float]:
+    """
+    Send single-sentence requests from `concurrency` connections at once.
+
+    Sentences are taken round-robin from `sentences`, so a test longer than
+    the input also exercises the result cache.
+
+    Returns:
+        Client-side throughput and latency percentiles, plus the server's
+        own metrics for the model.
+    """
+    counter = iter(range(n_requests))
+    latencies: list[float] = []
+
+    async def worker() -> None:
+        reader, writer = await _open(host, port, unix_path)
+        try:
+            for i in counter:
+                payload = {"sentences": [sentences[i % len(sentences)]]}
+                if model:
+                    payload["model"] = model
+                start = time.perf_counter()
+                await request(reader, writer, "POST", "/translate", payload)
+                latencies.append(time.perf_counter() - start)
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await _open(host, port, unix_path)
+    server_metrics = await request(reader, writer, "GET", "/metrics")
+    writer.close()
+
+    p50, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 99])
+    stats = {
+        "requests": len(latencies),
+        "requests_per_s": len(latencies) / elapsed,
+        "latency_p50_ms": float(p50),
+        "latency_p99_ms": float(p99),
+        "server": server_metrics[model or next(iter(server_metrics))],
+    }
+    print(
+        f"[Load test] {stats['requests']:,} requests at concurrency {concurrency}: "
+        f"{stats['requests_per_s']:.1f} req/s, p50={p50:.1f} ms, p99={p99:.1f} ms"
+    )
+    print(f"[Load test] Server metrics: {stats['server']}")
+    return stats
+
+
+# ============================================================
+# Command-line entry point
+# ============================================================
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    server = TranslationServer(
+        load_models(Path(args.models_dir)),
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        cache_size=args.cache_size,
+        beam_size=args.beam_size,
+    )
+    listener = await server.start(args.host, args.port, args.unix)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--unix", default=None, help="Unix socket path instead")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="Run the translation server")
+    serve.add_argument("--models-dir", default=MODELS_DIR)
+    serve.add_argument("--max-batch-size", type=int, default=SERVER_MAX_BATCH_SIZE)
+    serve.add_argument("--max-wait-ms", type=float, default=SERVER_MAX_WAIT_MS)
+    serve.add_argument("--cache-size", type=int, default=SERVER_CACHE_SIZE)
+    serve.add_argument("--beam-size", type=int, default=BEAM_SIZE)
+    serve.add_argument("--threads", type=int, default=None, help="Torch CPU threads")
+
+    bench = commands.add_parser("load-test", help="Load-test a running server")
+    bench.add_argument("sentences_file")
+    bench.add_argument("--requests", type=int, default=1000)
+    bench.add_argument("--concurrency", type=int, default=16)
+    bench.add_argument("--model", default=None)
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        asyncio.run(_serve(args))
+    else:
+        asyncio.run(
+            load_test(
+                load_file(Path(args.sentences_file)),
+                args.requests,
+                args.concurrency,
+                args.model,
+                args.host,
+                args.port,
+                args.unix,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
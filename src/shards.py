@@ -0,0 +1,113 @@
+"""
+Binary token-id shards for fast training startup.
+Stores each split as flat int32 token ids plus int64 offsets, memory-mapped at
+load time so DataLoader workers share one page-cached copy.
+"""
+
+from collections.abc import Mapping, Sequence
+from itertools import chain
+from pathlib import Path
+
+import numpy as np
+
+from src.config import PROCESSED_DIR, VOCAB_MAX_SIZE, VOCAB_MIN_COUNT
+from src.utils import load_file
+from src.vocab import Vocab
+
+# ============================================================
+# Export
+# ============================================================
+
+
+def export_token_shards(
+    splits: Mapping[str, tuple[Sequence[str], Sequence[str]]],
+    output_dir: Path = PROCESSED_DIR,
+    max_size: int | None = VOCAB_MAX_SIZE,
+    min_count: int = VOCAB_MIN_COUNT,
+) -> None:
+    """
+    Write vocabularies and token-id shards for several splits.
+
+    The vocabularies are counted over all given splits, matching how the
+    trainer builds them from both train and valid pairs.
+
+    Args:
+        splits: Split name -> (source sentences, target sentences).
+        output_dir: Directory for `vocab.{src,tgt}` and the `.npy` shards.
+        max_size: Cap on non-special vocabulary entries per side.
+        min_count: Minimum token frequency to get its own id.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for side_idx, side in enumerate(("src", "tgt")):
+        vocab = Vocab.build(
+            chain.from_iterable(s[side_idx] for s in splits.values()),
+            max_size,
+            min_count,
+        )
+        vocab.save(output_dir / f"vocab.{side}")
+        for split_name, sentences in splits.items():
+            ids, offsets = vocab.encode_flat(sentences[side_idx])
+            np.save(output_dir / f"{split_name}.{side}.ids.npy", ids)
+            np.save(output_dir / f"{split_name}.{side}.offsets.npy", offsets)
+    print(f"[Export] Token-id shards written to {output_dir}")
+
+
+def shard_text_splits(
+    data_dir: Path, split_names: Sequence[str] = ("train", "valid")
+) -> None:
+    """Build token-id shards from existing `<split>.src` / `<split>.tgt` files."""
+    export_token_shards(
+        {
+            name: (
+                load_file(data_dir / f"{name}.src"),
+                load_file(data_dir / f"{name}.tgt"),
+            )
+            for name in split_names
+        },
+        data_dir,
+    )
+
+
+# ============================================================
+# Memory-mapped dataset
+# ============================================================
+
+
+class TokenShardDataset:
+    """
+    Map-style dataset over memory-mapped token-id shards.
+
+    Opening a split costs a few `mmap` calls regardless of its size, and the
+    arrays are shared through the page cache by every process that opens
+    them, so DataLoader workers add no per-worker copy of the corpus.
+    """
+
+    def __init__(self, data_dir: Path, split: str = "train"):
+        self.data_dir = Path(data_dir)
+        self.split = split
+        self.src_ids, self.src_offsets = self._open("src")
+        self.tgt_ids, self.tgt_offsets = self._open("tgt")
+        if len(self.src_offsets) != len(self.tgt_offsets):
+            raise ValueError(f"Source and target shards of '{split}' are not aligned.")
+
+    def _open(self, side: str) -> tuple[np.ndarray, np.ndarray]:
+        prefix = self.data_dir / f"{self.split}.{side}"
+        ids = np.load(f"{prefix}.ids.npy", mmap_mode="r")
+        offsets = np.load(f"{prefix}.offsets.npy", mmap_mode="r")
+        return ids, offsets
+
+    def vocab(self, side: str) -> Vocab:
+        return Vocab.load(self.data_dir / f"vocab.{side}")
+
+    def __len__(self) -> int:
+        return len(self.src_offsets) - 1
+
+    def __getitem__(self, idx: int) -> tuple[np.ndarray, np.ndarray]:
+        src = self.src_ids[self.src_offsets[idx] : self.src_offsets[idx + 1]]
+        tgt = self.tgt_ids[self.tgt_offsets[idx] : self.tgt_offsets[idx + 1]]
+        return src, tgt
+
+    def lengths(self, side: str = "src") -> np.ndarray:
+        """Encoded length (including `<sos>`/`<eos>`) of every sentence."""
+        offsets = self.src_offsets if side == "src" else self.tgt_offsets
+        return np.diff(offsets)
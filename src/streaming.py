@@ -0,0 +1,294 @@
+"""
+Out-of-core preprocessing for Neural Machine Translation.
+Streams raw CSVs in bounded chunks through normalization, filtering, and exact
+deduplication, and writes train/valid .src / .tgt files with a fixed memory ceiling.
+"""
+
+import hashlib
+import shutil
+import tempfile
+from collections.abc import Iterable, Iterator, Sequence
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.config import PROCESSED_DIR, SOURCE_COL, TARGET_COL, TRAIN_SPLIT
+from src.preprocessing_nmt import drop_invalid_rows, normalize_pairs
+from src.utils import chunked, parallel_imap
+
+STREAM_CHUNK_SIZE = 100_000
+DEDUP_MAX_IN_MEMORY = 8_000_000  # hashes kept in RAM (8 bytes each) before spilling
+
+# ============================================================
+# Pair hashing and deduplication
+# ============================================================
+
+
+def pair_hashes(src: list[str], tgt: list[str]) -> np.ndarray:
+    """
+    Stable 64-bit hashes of normalized sentence pairs.
+
+    Unlike the built-in `hash`, these are identical across processes and runs,
+    so they can be used both for deduplication and for the train/valid split.
+    """
+    digests = b"".join(
+        hashlib.blake2b(f"{s}\t{t}".encode(), digest_size=8).digest()
+        for s, t in zip(src, tgt, strict=True)
+    )
+    return np.frombuffer(digests, dtype="<u8").astype(np.uint64)
+
+
+class SpillingHashSet:
+    """
+    Compact set of 64-bit hashes that spills to disk past a memory cap.
+
+    Hashes live in a sorted `uint64` array (8 bytes per entry rather than the
+    ~70 of a Python `set`). Once it holds `max_in_memory` entries, it is written
+    out as a sorted run and memory-mapped back, so RAM use stays bounded no
+    matter how many distinct pairs the corpus has.
+
+    Two different pairs collide with probability ~n^2 / 2^65, i.e. well under
+    one in a million even for a billion pairs.
+    """
+
+    def __init__(
+        self,
+        max_in_memory: int = DEDUP_MAX_IN_MEMORY,
+        spill_dir: Path | None = None,
+    ):
+        self.max_in_memory = max_in_memory
+        self._owns_spill_dir = spill_dir is None
+        self.spill_dir = Path(spill_dir or tempfile.mkdtemp(prefix="pmt-dedup-"))
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        self._memory = np.empty(0, dtype=np.uint64)
+        self._runs: list[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return len(self._memory) + sum(len(run) for run in self._runs)
+
+    def add(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        Insert `hashes` and return a mask of the ones not seen before.
+
+        Within `hashes` itself, only the first occurrence counts as new, which
+        matches `DataFrame.drop_duplicates(keep="first")`.
+        """
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        is_new = np.zeros(len(hashes), dtype=bool)
+        _, first_idx = np.unique(hashes, return_index=True)
+        is_new[first_idx] = True
+
+        for seen in [self._memory, *self._runs]:
+            if len(seen):
+                is_new[is_new] = ~_sorted_contains(seen, hashes[is_new])
+
+        fresh = np.sort(hashes[is_new])
+        self._memory = np.sort(np.concatenate([self._memory, fresh]), kind="stable")
+        if len(self._memory) >= self.max_in_memory:
+            self._spill()
+        return is_new
+
+    def _spill(self) -> None:
+        path = self.spill_dir / f"run-{len(self._runs):05d}.npy"
+        np.save(path, self._memory)
+        self._runs.append(np.load(path, mmap_mode="r"))
+        self._memory = np.empty(0, dtype=np.uint64)
+
+    def close(self) -> None:
+        """Release memory-mapped runs and delete the spill directory if owned."""
+        self._runs.clear()
+        self._memory = np.empty(0, dtype=np.uint64)
+        if self._owns_spill_dir:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    def __enter__(self) -> "SpillingHashSet":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _sorted_contains(sorted_values: np.ndarray, queries: np.ndarray) -> np.ndarray:
+    """Vectorized membership test against a sorted array."""
+    pos = np.searchsorted(sorted_values, queries)
+    pos[pos == len(sorted_values)] = 0
+    return sorted_values[pos] == queries
+
+
+# ============================================================
+# Split writer
+# ============================================================
+
+
+class SplitWriter:
+    """
+    Append-only writer for train/valid .src and .tgt files.
+
+    Pairs are assigned to a split by their hash, so the assignment needs no
+    global shuffle and identical pairs always land in the same split. Lines
+    are written exactly as `export_opennmt_files` writes normalized text.
+    """
+
+    def __init__(
+        self, output_dir: Path = PROCESSED_DIR, train_split: float = TRAIN_SPLIT
+    ):
+        output_dir.mkdir(parents=True, exist_ok=True)
+        self.output_dir = output_dir
+        self._threshold = np.uint64(min(int(train_split * 2**64), 2**64 - 1))
+        self._files = {
+            (split, side): open(output_dir / f"{split}.{side}", "w", encoding="utf-8")
+            for split in ("train", "valid")
+            for side in ("src", "tgt")
+        }
+        self.counts = {"train": 0, "valid": 0}
+
+    def write(self, src: Sequence[str], tgt: Sequence[str], hashes: np.ndarray) -> None:
+        """Write one chunk of pairs, split according to `hashes`."""
+        is_valid = np.asarray(hashes, dtype=np.uint64) >= self._threshold
+        for split, mask in (("train", ~is_valid), ("valid", is_valid)):
+            idx = np.flatnonzero(mask)
+            if not len(idx):
+                continue
+            self._files[split, "src"].write("".join(f"{src[i]}\n" for i in idx))
+            self._files[split, "tgt"].write("".join(f"{tgt[i]}\n" for i in idx))
+            self.counts[split] += len(idx)
+
+    def close(self) -> None:
+        for f in self._files.values():
+            f.close()
+
+    def __enter__(self) -> "SplitWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# ============================================================
+# Streaming pipeline
+# ============================================================
+
+
+def iter_csv_chunks(
+    csv_paths: Iterable[Path],
+    src_col: str = SOURCE_COL,
+    tgt_col: str = TARGET_COL,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> Iterator[pd.DataFrame]:
+    """Yield bounded DataFrame chunks holding only the two text columns."""
+    for path in csv_paths:
+        yield from pd.read_csv(path, usecols=[src_col, tgt_col], chunksize=chunk_size)
+
+
+def _clean_csv_chunk(
+    args: tuple[pd.DataFrame, str, str],
+) -> tuple[list[str], list[str], np.ndarray]:
+    """Normalize, length-filter, and hash one raw chunk (runs in workers)."""
+    chunk, src_col, tgt_col = args
+    chunk = drop_invalid_rows(chunk, src_col, tgt_col)
+    src_tokens, tgt_tokens, keep = normalize_pairs(chunk[src_col], chunk[tgt_col])
+    src_tokens = [s for s, k in zip(src_tokens, keep, strict=True) if k]
+    tgt_tokens = [t for t, k in zip(tgt_tokens, keep, strict=True) if k]
+    return src_tokens, tgt_tokens, pair_hashes(src_tokens, tgt_tokens)
+
+
+def stream_preprocess_and_export(
+    csv_paths: Path | Iterable[Path],
+    output_dir: Path = PROCESSED_DIR,
+    src_col: str = SOURCE_COL,
+    tgt_col: str = TARGET_COL,
+    train_split: float = TRAIN_SPLIT,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    max_hashes_in_memory: int = DEDUP_MAX_IN_MEMORY,
+    spill_dir: Path | None = None,
+    n_jobs: int = 1,
+) -> dict[str, int]:
+    """
+    Preprocess raw CSVs and export train/valid splits without loading them whole.
+
+    Applies the same normalization and length filter as `preprocess_corpus`,
+    drops exact duplicate pairs across all inputs, and writes OpenNMT-style
+    files. Memory use is bounded by `chunk_size` (times `n_jobs`) plus the
+    deduplication cap, independent of corpus size.
+
+    Args:
+        csv_paths: One CSV or several, processed in order.
+        output_dir: Directory for train/valid .src and .tgt files.
+        src_col: Source column name.
+        tgt_col: Target column name.
+        train_split: Expected fraction of pairs assigned to train.
+        chunk_size: Rows read per chunk.
+        max_hashes_in_memory: Dedup entries held in RAM before spilling to disk.
+        spill_dir: Where dedup runs are spilled (defaults to a temp directory).
+        n_jobs: Worker processes for normalization.
+
+    Returns:
+        Counts of rows read, duplicates dropped, and pairs written per split.
+    """
+    if isinstance(csv_paths, (str, Path)):
+        csv_paths = [Path(csv_paths)]
+
+    print(f"\n[Streaming] Processing in chunks of {chunk_size:,} rows...")
+    stats = {"read": 0, "kept": 0, "duplicates": 0}
+    chunks = iter_csv_chunks(csv_paths, src_col, tgt_col, chunk_size)
+    tasks = ((chunk, src_col, tgt_col) for chunk in _count_rows(chunks, stats))
+
+    with (
+        SpillingHashSet(max_hashes_in_memory, spill_dir) as seen,
+        SplitWriter(output_dir, train_split) as writer,
+    ):
+        for src_tokens, tgt_tokens, hashes in parallel_imap(
+            _clean_csv_chunk, tasks, n_jobs=n_jobs
+        ):
+            is_new = seen.add(hashes)
+            idx = np.flatnonzero(is_new)
+            writer.write(
+                [src_tokens[i] for i in idx],
+                [tgt_tokens[i] for i in idx],
+                hashes[idx],
+            )
+            stats["kept"] += len(idx)
+            stats["duplicates"] += len(hashes) - len(idx)
+
+    stats.update(writer.counts)
+    print(
+        f"[Streaming] Read {stats['read']:,} rows, dropped "
+        f"{stats['duplicates']:,} duplicates, kept {stats['kept']:,} pairs."
+    )
+    print(
+        f"[Done] train={stats['train']:,}, valid={stats['valid']:,} "
+        f"written to {output_dir}"
+    )
+    return stats
+
+
+def write_pair_stream(
+    pairs: Iterable[tuple[str, str]],
+    output_dir: Path = PROCESSED_DIR,
+    train_split: float = TRAIN_SPLIT,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> dict[str, int]:
+    """
+    Export a stream of normalized pairs as train/valid .src and .tgt files.
+
+    Uses the same hash-based split as `stream_preprocess_and_export`, so any
+    pair lands in the same split no matter which stream it comes from.
+    """
+    with SplitWriter(output_dir, train_split) as writer:
+        for chunk in chunked(pairs, chunk_size):
+            src, tgt = zip(*chunk, strict=True)
+            writer.write(src, tgt, pair_hashes(src, tgt))
+    print(
+        f"[Exporting] train={writer.counts['train']:,}, "
+        f"valid={writer.counts['valid']:,} written to {output_dir}"
+    )
+    return writer.counts
+
+
+def _count_rows(
+    chunks: Iterable[pd.DataFrame], stats: dict[str, int]
+) -> Iterator[pd.DataFrame]:
+    for chunk in chunks:
+        stats["read"] += len(chunk)
+        yield chunk
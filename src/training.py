@@ -0,0 +1,441 @@
+"""
+Resumable training loop for the PyTorch Seq2Seq models.
+Writes full-state step checkpoints on a background thread, keeps the newest
+few like OpenNMT's `keep_checkpoint`, and resumes from the exact next batch.
+"""
+
+import os
+import queue
+import random
+import threading
+from itertools import chain
+from pathlib import Path
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.optim as optim
+from torch.utils.data import DataLoader, Dataset
+
+from src.augmentation import LazyAugmentedCorpus
+from src.batching import TokenBucketBatchSampler, collate_pairs
+from src.config import (
+    EPOCHS,
+    KEEP_CHECKPOINT,
+    LEARNING_RATE,
+    MAX_GRAD_NORM,
+    PATIENCE,
+    SAVE_CHECKPOINT_STEPS,
+)
+from src.model import build_model, checkpoint_state, default_device
+from src.vocab import PAD_ID, Vocab, tokenize
+
+# ============================================================
+# Data
+# ============================================================
+
+
+class MTDataset(Dataset):
+    """Sentence pairs encoded once into flat id arrays."""
+
+    def __init__(self, pairs, src_vocab: Vocab, tgt_vocab: Vocab):
+        srcs, tgts = zip(*pairs, strict=True)
+        self.src_ids, self.src_offsets = src_vocab.encode_flat(srcs)
+        self.tgt_ids, self.tgt_offsets = tgt_vocab.encode_flat(tgts)
+
+    def __len__(self):
+        return len(self.src_offsets) - 1
+
+    def __getitem__(self, idx):
+        src = self.src_ids[self.src_offsets[idx] : self.src_offsets[idx + 1]]
+        tgt = self.tgt_ids[self.tgt_offsets[idx] : self.tgt_offsets[idx + 1]]
+        return src, tgt
+
+    def lengths(self, side: str) -> np.ndarray:
+        return np.diff(self.src_offsets if side == "src" else self.tgt_offsets)
+
+
+class AugmentedMTDataset(Dataset):
+    """
+    Training pairs whose noisy copies are built on the fly each epoch.
+
+    Wraps a `LazyAugmentedCorpus` (same item layout as `augment_dataset`) and
+    encodes whole batches at once through `__getitems__`. Call `set_epoch`
+    before every epoch to draw that epoch's noise. Batches are bucketed by
+    the clean lengths: a noisy copy differs from its pair by only the few
+    tokens dropped or duplicated.
+    """
+
+    def __init__(self, corpus: LazyAugmentedCorpus, src_vocab: Vocab, tgt_vocab: Vocab):
+        self.corpus = corpus
+        self.src_vocab = src_vocab
+        self.tgt_vocab = tgt_vocab
+        self._lengths = {
+            side: np.repeat(
+                np.fromiter((len(tokenize(s)) + 2 for s in sentences), np.int64),
+                corpus.stride,
+            )
+            for side, sentences in (("src", corpus.src), ("tgt", corpus.tgt))
+        }
+
+    def set_epoch(self, epoch: int) -> None:
+        self.corpus.set_epoch(epoch)
+
+    def __len__(self):
+        return len(self.corpus)
+
+    def __getitem__(self, idx):
+        return self.__getitems__([idx])[0]
+
+    def __getitems__(self, indices):
+        srcs, tgts = zip(*self.corpus.__getitems__(indices), strict=True)
+        src_ids, src_offsets = self.src_vocab.encode_flat(srcs)
+        tgt_ids, tgt_offsets = self.tgt_vocab.encode_flat(tgts)
+        return list(
+            zip(
+                np.split(src_ids, src_offsets[1:-1]),
+                np.split(tgt_ids, tgt_offsets[1:-1]),
+                strict=True,
+            )
+        )
+
+    def lengths(self, side: str) -> np.ndarray:
+        return self._lengths[side]
+
+
+def collate_fn(batch):
+    src_pad, tgt_pad = collate_pairs(batch)
+    return torch.from_numpy(src_pad), torch.from_numpy(tgt_pad)
+
+
+def create_dataloaders(
+    train_pairs,
+    valid_pairs,
+    src_vocab: Vocab,
+    tgt_vocab: Vocab,
+    augment_copies: int = 0,
+) -> tuple[DataLoader, DataLoader]:
+    """
+    Token-budget loaders (`MAX_BATCH_TOKENS`) for training and validation.
+
+    With `augment_copies`, every training pair is followed by that many
+    noisy copies, injected on the fly by an `AugmentedMTDataset`; call its
+    `set_epoch` (via `train_loader.dataset`) at the start of every epoch.
+    Validation pairs are never augmented.
+
+    Both loaders draw their worker seed from a private generator, so creating
+    an iterator does not advance the global torch RNG that dropout uses.
+    """
+    if augment_copies > 0:
+        srcs, tgts = zip(*train_pairs, strict=True)
+        corpus = LazyAugmentedCorpus(srcs, tgts, n_copies=augment_copies)
+        train_data = AugmentedMTDataset(corpus, src_vocab, tgt_vocab)
+    else:
+        train_data = MTDataset(train_pairs, src_vocab, tgt_vocab)
+    valid_data = MTDataset(valid_pairs, src_vocab, tgt_vocab)
+    train_sampler = TokenBucketBatchSampler.from_dataset(train_data)
+    valid_sampler = TokenBucketBatchSampler.from_dataset(valid_data, shuffle=False)
+    train_sampler.report()
+    train_loader = DataLoader(
+        train_data,
+        batch_sampler=train_sampler,
+        collate_fn=collate_fn,
+        generator=torch.Generator(),
+    )
+    valid_loader = DataLoader(
+        valid_data,
+        batch_sampler=valid_sampler,
+        collate_fn=collate_fn,
+        generator=torch.Generator(),
+    )
+    return train_loader, valid_loader
+
+
+def load_parallel_corpus(folder_path: Path) -> tuple[list, list]:
+    """Read `train.{src,tgt}` and `valid.{src,tgt}` as lists of pairs."""
+
+    def read_file(name):
+        with open(os.path.join(folder_path, name), encoding="utf-8") as f:
+            return [line.strip() for line in f]
+
+    train_pairs = list(zip(read_file("train.src"), read_file("train.tgt"), strict=True))
+    valid_pairs = list(zip(read_file("valid.src"), read_file("valid.tgt"), strict=True))
+    return train_pairs, valid_pairs
+
+
+# ============================================================
+# Checkpoint state
+# ============================================================
+
+
+def _to_cpu(obj):
+    """Copy every tensor in a nested state to the CPU, detached from training."""
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to("cpu", copy=True)
+    if isinstance(obj, dict):
+        return {k: _to_cpu(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_to_cpu(v) for v in obj)
+    return obj
+
+
+def rng_state() -> dict:
+    """Python, NumPy, and torch RNG states in a `weights_only`-loadable form."""
+    np_state = np.random.get_state(legacy=False)
+    np_state["state"]["key"] = np_state["state"]["key"].tolist()
+    state = {
+        "python": random.getstate(),
+        "numpy": np_state,
+        "torch": torch.get_rng_state(),
+    }
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def set_rng_state(state: dict) -> None:
+    random.setstate(state["python"])
+    np_state = dict(state["numpy"])
+    np_state["state"] = dict(np_state["state"])
+    np_state["state"]["key"] = np.asarray(np_state["state"]["key"], dtype=np.uint32)
+    np.random.set_state(np_state)
+    torch.set_rng_state(state["torch"])
+    if "cuda" in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["cuda"])
+
+
+def step_checkpoints(directory: Path) -> list[Path]:
+    """Step checkpoints in `directory`, oldest first."""
+    return sorted(Path(directory).glob("step_*.pt"))
+
+
+# ============================================================
+# Background checkpoint writer
+# ============================================================
+
+
+class CheckpointWriter:
+    """
+    Saves checkpoints on a background thread.
+
+    `submit` only takes a CPU snapshot of the state; serialization and disk
+    I/O happen on the writer thread while training continues. At most one
+    snapshot waits in the queue, which bounds the extra memory. Files are
+    written to a temporary name and renamed, so an interrupted save never
+    leaves a truncated checkpoint behind.
+
+    Args:
+        directory: Where step checkpoints (`step_<n>.pt`) are kept.
+        keep: Number of step checkpoints to keep; -1 keeps all.
+    """
+
+    def __init__(self, directory: Path, keep: int = KEEP_CHECKPOINT):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.keep = keep
+        self._queue: queue.Queue = queue.Queue(maxsize=1)
+        self._error: BaseException | None = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, state: dict, path: Path | None = None, step: int | None = None):
+        """
+        Queue a checkpoint; blocks only while the previous one is still queued.
+
+        Pass `step` for a rotated step checkpoint, or `path` for a file that
+        is kept regardless (e.g. the best model).
+        """
+        self._raise_error()
+        if path is None:
+            path = self.directory / f"step_{step:08d}.pt"
+        self._queue.put((_to_cpu(state), Path(path), step is not None))
+
+    def close(self) -> None:
+        """Wait for all queued checkpoints to be written."""
+        self._queue.put(None)
+        self._thread.join()
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise RuntimeError("Checkpoint writer failed") from self._error
+
+    def _run(self) -> None:
+        while (item := self._queue.get()) is not None:
+            state, path, rotate = item
+            try:
+                tmp_path = path.with_name(path.name + ".tmp")
+                torch.save(state, tmp_path)
+                os.replace(tmp_path, path)
+                if rotate:
+                    self._rotate()
+            except BaseException as e:  # re-raised on the main thread
+                self._error = e
+
+    def _rotate(self) -> None:
+        if self.keep < 0:
+            return
+        checkpoints = step_checkpoints(self.directory)
+        for path in checkpoints[: max(0, len(checkpoints) - self.keep)]:
+            path.unlink(missing_ok=True)
+
+
+# ============================================================
+# Training
+# ============================================================
+
+
+def train_model(
+    folder_name: str,
+    train_pairs,
+    valid_pairs,
+    output_dir: Path | str = "outputs",
+    device: torch.device | None = None,
+    epochs: int = EPOCHS,
+    patience: int = PATIENCE,
+    save_checkpoint_steps: int = SAVE_CHECKPOINT_STEPS,
+    keep_checkpoint: int = KEEP_CHECKPOINT,
+    resume: bool = True,
+    augment_copies: int = 0,
+):
+    """
+    Train a GRU model with early stopping, resuming any interrupted run.
+
+    The best model (by validation loss) is saved to
+    `<output_dir>/gru_<folder_name>_model.pt`. Every `save_checkpoint_steps`
+    batches and at the end of each epoch, the full training state (model,
+    optimizer, RNG, sampler position, loss and early-stopping counters) goes
+    to `<output_dir>/checkpoints/gru_<folder_name>/`. With `resume`, the
+    newest of those is loaded and training continues with the batch after
+    it, giving the same result as an uninterrupted run.
+
+    With `augment_copies` (e.g. `AUGMENT_N_COPIES`), the model trains on the
+    clean pairs plus that many noisy copies of each, drawn afresh every epoch
+    by `LazyAugmentedCorpus` (the GRU-Aug setup). Noise depends only on the
+    epoch, so resumed runs see the same copies.
+
+    Returns:
+        (model, src_vocab, tgt_vocab)
+    """
+    device = device or default_device()
+    output_dir = Path(output_dir)
+    checkpoint_dir = output_dir / "checkpoints" / f"gru_{folder_name}"
+    best_path = output_dir / f"gru_{folder_name}_model.pt"
+
+    checkpoints = step_checkpoints(checkpoint_dir) if resume else []
+    state = None
+    if checkpoints:
+        state = torch.load(checkpoints[-1], map_location=device, weights_only=True)
+        src_vocab = Vocab.from_state(state["src_vocab"])
+        tgt_vocab = Vocab.from_state(state["tgt_vocab"])
+        print(f"[{folder_name}] Resuming from {checkpoints[-1]}")
+    else:
+        # Single pass, capped at VOCAB_MAX_SIZE with <unk>
+        src_vocab = Vocab.build(
+            chain((s for s, _ in train_pairs), (s for s, _ in valid_pairs))
+        )
+        tgt_vocab = Vocab.build(
+            chain((t for _, t in train_pairs), (t for _, t in valid_pairs))
+        )
+
+    train_loader, valid_loader = create_dataloaders(
+        train_pairs, valid_pairs, src_vocab, tgt_vocab, augment_copies
+    )
+    sampler = train_loader.batch_sampler
+    model = build_model(len(src_vocab), len(tgt_vocab), device)
+    optimizer = optim.Adam(model.parameters(), lr=LEARNING_RATE)
+    criterion = nn.CrossEntropyLoss(ignore_index=PAD_ID)
+
+    progress = {
+        "epoch": 0,
+        "step": 0,
+        "consumed": 0,
+        "train_loss": 0.0,
+        "best_valid_loss": float("inf"),
+        "epochs_no_improve": 0,
+        "stopped": False,
+    }
+    if state is not None:
+        model.load_state_dict(state["model_state"])
+        optimizer.load_state_dict(state["optimizer_state"])
+        sampler.load_state_dict(state["sampler_state"])
+        set_rng_state(state["rng_state"])
+        progress.update(state["progress"])
+        if progress["stopped"] or progress["epoch"] >= epochs:
+            print(f"[{folder_name}] Training already finished.")
+            return model, src_vocab, tgt_vocab
+
+    def snapshot() -> dict:
+        return {
+            **checkpoint_state(model, src_vocab, tgt_vocab),
+            "optimizer_state": optimizer.state_dict(),
+            "sampler_state": sampler.state_dict(progress["consumed"]),
+            "rng_state": rng_state(),
+            "progress": dict(progress),
+        }
+
+    with CheckpointWriter(checkpoint_dir, keep_checkpoint) as writer:
+        for epoch in range(progress["epoch"], epochs):
+            model.train()
+            sampler.set_epoch(epoch)
+            if isinstance(train_loader.dataset, AugmentedMTDataset):
+                train_loader.dataset.set_epoch(epoch)
+            for src, tgt in train_loader:
+                src, tgt = src.to(device), tgt.to(device)
+                optimizer.zero_grad()
+                output = model(src, tgt)
+                loss = criterion(
+                    output.view(-1, output.size(-1)), tgt[:, 1:].contiguous().view(-1)
+                )
+                loss.backward()
+                torch.nn.utils.clip_grad_norm_(model.parameters(), MAX_GRAD_NORM)
+                optimizer.step()
+                progress["train_loss"] += loss.item()
+                progress["consumed"] += 1
+                progress["step"] += 1
+                if progress["step"] % save_checkpoint_steps == 0:
+                    writer.submit(snapshot(), step=progress["step"])
+            avg_train_loss = progress["train_loss"] / max(1, progress["consumed"])
+
+            model.eval()
+            val_loss = 0
+            with torch.no_grad():
+                for src, tgt in valid_loader:
+                    src, tgt = src.to(device), tgt.to(device)
+                    output = model(src, tgt)
+                    loss = criterion(
+                        output.view(-1, output.size(-1)),
+                        tgt[:, 1:].contiguous().view(-1),
+                    )
+                    val_loss += loss.item()
+            avg_val_loss = val_loss / max(1, len(valid_loader))
+
+            print(
+                f"[{folder_name}] Epoch {epoch + 1}/{epochs} | "
+                f"Train Loss: {avg_train_loss:.4f} | Valid Loss: {avg_val_loss:.4f}"
+            )
+
+            if avg_val_loss < progress["best_valid_loss"]:
+                progress["best_valid_loss"] = avg_val_loss
+                progress["epochs_no_improve"] = 0
+                writer.submit(checkpoint_state(model, src_vocab, tgt_vocab), best_path)
+            else:
+                progress["epochs_no_improve"] += 1
+                if progress["epochs_no_improve"] >= patience:
+                    print(
+                        f"[{folder_name}] Early stopping triggered at epoch {epoch + 1}"
+                    )
+                    progress["stopped"] = True
+
+            progress.update(epoch=epoch + 1, consumed=0, train_loss=0.0)
+            writer.submit(snapshot(), step=progress["step"])
+            if progress["stopped"]:
+                break
+
+    return model, src_vocab, tgt_vocab
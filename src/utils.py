@@ -1,6 +1,20 @@
+import errno
+import io
+import os
+import queue
 import tarfile
+import threading
 import zipfile
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice, zip_longest
 from pathlib import Path
+from typing import IO, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
 
 
 def extract_archives(
@@ -83,3 +97,294 @@ def extract_archives(
 def load_file(path) -> list[str]:
     with open(path, encoding="utf-8") as f:
         return [line.strip() for line in f.readlines()]
+
+
+def iter_file(path) -> Iterator[str]:
+    """Generator version of `load_file`: yields stripped lines one at a time."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            yield line.strip()
+
+
+def _aligned(
+    src_lines: Iterable[str], tgt_lines: Iterable[str], src_name, tgt_name
+) -> Iterator[tuple[str, str]]:
+    for n_lines, (src, tgt) in enumerate(zip_longest(src_lines, tgt_lines)):
+        if src is None or tgt is None:
+            shorter = src_name if src is None else tgt_name
+            raise ValueError(
+                f"File line counts do not match: '{shorter}' ends after "
+                f"{n_lines:,} lines."
+            )
+        yield src.strip(), tgt.strip()
+
+
+def iter_line_pairs(src_path, tgt_path) -> Iterator[tuple[str, str]]:
+    """
+    Stream aligned, stripped line pairs from two parallel text files.
+
+    Raises a ValueError as soon as one file runs out before the other.
+    """
+    with (
+        open(src_path, encoding="utf-8") as f_src,
+        open(tgt_path, encoding="utf-8") as f_tgt,
+    ):
+        yield from _aligned(f_src, f_tgt, src_path, tgt_path)
+
+
+def count_lines(path) -> int:
+    """Count newline-terminated lines without decoding the file."""
+    n_lines = 0
+    with open(path, "rb") as f:
+        while block := f.read(1 << 20):
+            n_lines += block.count(b"\n")
+    return n_lines
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    """Split an iterable into lists of at most `size` items."""
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def resolve_n_jobs(n_jobs: int) -> int:
+    """
+    Translate an `n_jobs` argument into a concrete worker count.
+
+    Follows the scikit-learn convention: positive values are used as-is,
+    `-1` means all cores, `-2` all cores but one, and so on.
+    """
+    if n_jobs == 0:
+        raise ValueError("n_jobs must be a non-zero integer.")
+    if n_jobs > 0:
+        return n_jobs
+    return max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+
+
+def parallel_imap(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    n_jobs: int = 1,
+    prefetch: int = 2,
+) -> Iterator[R]:
+    """
+    Lazily apply `func` to every item, yielding results in input order.
+
+    Parameters
+    ----------
+    func : Callable
+        A picklable (module-level) function applied to each item.
+    items : Iterable
+        Work items, typically chunks of a larger corpus. Consumed lazily.
+    n_jobs : int, optional
+        Number of worker processes (default: 1, i.e. run in-process).
+    prefetch : int, optional
+        Number of in-flight items per worker. Bounds memory use when `items`
+        is a stream (default: 2).
+
+    Notes
+    -----
+    - With `n_jobs=1` no pool is created and no pickling takes place.
+    - Unlike `ProcessPoolExecutor.map`, `items` is never materialized, so only
+      about `n_jobs * prefetch` chunks are held in memory at any time.
+    """
+    n_workers = resolve_n_jobs(n_jobs)
+    if n_workers == 1:
+        yield from map(func, items)
+        return
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= n_workers * prefetch:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# ============================================================
+# Streaming archive readers
+# ============================================================
+
+ARCHIVE_CHUNK_LINES = 10_000  # line pairs handed over per background read
+
+
+def _is_zip(archive: Path) -> bool:
+    return Path(archive).suffix.lower() == ".zip"
+
+
+def archive_members(archive: Path) -> list[str]:
+    """Names of the regular files in a `.zip` or `.tar(.gz)` archive."""
+    if _is_zip(archive):
+        with zipfile.ZipFile(archive) as zf:
+            return [info.filename for info in zf.infolist() if not info.is_dir()]
+    with tarfile.open(archive, "r:*") as tf:
+        return [member.name for member in tf.getmembers() if member.isfile()]
+
+
+def _missing_member(archive: Path, member: str) -> FileNotFoundError:
+    return FileNotFoundError(
+        errno.ENOENT, "No such archive member", f"{archive}:{member}"
+    )
+
+
+@contextmanager
+def open_archive_member(archive: Path, member: str) -> Iterator[IO[str]]:
+    """
+    Open one archive member as a UTF-8 text stream, decompressed on the fly.
+
+    Each call opens the archive anew, so members can be read from several
+    threads at once.
+    """
+    if _is_zip(archive):
+        with zipfile.ZipFile(archive) as zf:
+            if member not in zf.NameToInfo:
+                raise _missing_member(archive, member)
+            with zf.open(member) as raw:
+                yield io.TextIOWrapper(raw, encoding="utf-8")
+    else:
+        with tarfile.open(archive, "r:*") as tf:
+            try:
+                raw = tf.extractfile(member)
+            except KeyError:
+                raise _missing_member(archive, member) from None
+            if raw is None:
+                raise ValueError(f"'{member}' in '{archive}' is not a regular file.")
+            with raw:
+                yield io.TextIOWrapper(raw, encoding="utf-8")
+
+
+def iter_archive_lines(archive: Path, member: str) -> Iterator[str]:
+    """`iter_file` for a member of an archive; nothing is extracted to disk."""
+    with open_archive_member(archive, member) as f:
+        for line in f:
+            yield line.strip()
+
+
+def iter_archive_pairs(
+    archive: Path, src_member: str, tgt_member: str
+) -> Iterator[tuple[str, str]]:
+    """
+    `iter_line_pairs` for two members of the same archive.
+
+    Raises a ValueError as soon as one member runs out before the other.
+    """
+    with (
+        open_archive_member(archive, src_member) as f_src,
+        open_archive_member(archive, tgt_member) as f_tgt,
+    ):
+        yield from _aligned(f_src, f_tgt, src_member, tgt_member)
+
+
+def find_parallel_members(
+    archive: Path, src_ext: str, tgt_ext: str
+) -> list[tuple[str, str]]:
+    """
+    Aligned member pairs in an OPUS-style archive.
+
+    Members are paired by stem, e.g. `find_parallel_members(path, "ceb", "es")`
+    returns `[("TED2020.ceb-es.ceb", "TED2020.ceb-es.es")]` for TED2020.zip.
+    """
+    names = set(archive_members(archive))
+    src_suffix, tgt_suffix = f".{src_ext}", f".{tgt_ext}"
+    return [
+        (name, name.removesuffix(src_suffix) + tgt_suffix)
+        for name in sorted(names)
+        if name.endswith(src_suffix)
+        and name.removesuffix(src_suffix) + tgt_suffix in names
+    ]
+
+
+class _Prefetcher:
+    """Run an iterator in a daemon thread, buffering at most `buffer` items."""
+
+    _DONE = object()
+
+    def __init__(self, produce: Callable[[], Iterable[T]], buffer: int = 2):
+        self._queue: queue.Queue = queue.Queue(maxsize=buffer)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(produce,), daemon=True)
+        self._thread.start()
+
+    def _put(self, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self, produce: Callable[[], Iterable[T]]) -> None:
+        try:
+            for item in produce():
+                if not self._put(item):
+                    return
+        except BaseException as e:  # re-raised in the consuming thread
+            self._put(e)
+        else:
+            self._put(self._DONE)
+
+    def __iter__(self) -> Iterator[T]:
+        while (item := self._queue.get()) is not self._DONE:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    def close(self) -> None:
+        self._stop.set()
+
+
+def stream_archive_pairs(
+    members: Iterable[tuple[Path, str, str]],
+    n_jobs: int = 1,
+    chunk_size: int = ARCHIVE_CHUNK_LINES,
+) -> Iterator[tuple[str, str]]:
+    """
+    Stream aligned line pairs from many archive members, in order.
+
+    Parameters
+    ----------
+    members : Iterable[tuple[Path, str, str]]
+        `(archive, src_member, tgt_member)` triples, e.g. built with
+        `find_parallel_members`.
+    n_jobs : int, optional
+        Member pairs decompressed concurrently (default: 1, i.e. one at a
+        time in the calling thread).
+    chunk_size : int, optional
+        Line pairs per chunk handed over by a background reader.
+
+    Notes
+    -----
+    - With `n_jobs > 1`, the next member pairs are read in background threads
+      while the current one is consumed. zlib, bz2, and lzma release the GIL,
+      so decompression of independent members runs in parallel.
+    - Each reader buffers at most two chunks, so memory use is bounded by
+      about `2 * n_jobs * chunk_size` pairs regardless of archive size.
+    """
+    members = iter(members)
+    if n_jobs == 1:
+        for archive, src_member, tgt_member in members:
+            yield from iter_archive_pairs(archive, src_member, tgt_member)
+        return
+
+    def reader(archive: Path, src_member: str, tgt_member: str) -> _Prefetcher:
+        return _Prefetcher(
+            lambda: chunked(
+                iter_archive_pairs(archive, src_member, tgt_member), chunk_size
+            )
+        )
+
+    readers = deque(reader(*m) for m in islice(members, resolve_n_jobs(n_jobs)))
+    try:
+        while readers:
+            for chunk in readers[0]:
+                yield from chunk
+            readers.popleft()
+            for m in islice(members, 1):
+                readers.append(reader(*m))
+    finally:
+        for r in readers:
+            r.close()
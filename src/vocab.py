@@ -0,0 +1,203 @@
+"""
+Vocabulary for the PyTorch Seq2Seq models.
+Frequency-capped token <-> id mapping with `<unk>`, stored as arrays and
+encoding or decoding whole batches of sentences at once.
+"""
+
+from collections import Counter
+from collections.abc import Iterable, Mapping, Sequence
+from itertools import chain
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.config import VOCAB_MAX_SIZE, VOCAB_MIN_COUNT
+
+SPECIAL_TOKENS = ("<pad>", "<sos>", "<eos>", "<unk>")
+PAD_ID, SOS_ID, EOS_ID, UNK_ID = range(len(SPECIAL_TOKENS))
+
+
+def tokenize(sentence: str) -> list[str]:
+    """Whitespace tokenization of lowercased text, as used in training."""
+    return sentence.lower().split()
+
+
+class Vocab:
+    """
+    Array-backed vocabulary.
+
+    Ids are positions in `tokens`; reverse lookups go through a `pd.Index`
+    hash table, so a batch is encoded with one vectorized `get_indexer` call
+    instead of a dict lookup per token, and decoding is a single `take`.
+    The special tokens always hold ids 0-3, matching the `<pad>`=0,
+    `<sos>`=1, `<eos>`=2 layout of older checkpoints.
+    """
+
+    def __init__(self, tokens: Sequence[str], counts: Sequence[int] | None = None):
+        self.tokens = np.asarray(tokens, dtype=object)
+        self.counts = np.asarray(
+            counts if counts is not None else np.zeros(len(tokens)), dtype=np.int64
+        )
+        self._index = pd.Index(self.tokens)
+        if not self._index.is_unique:
+            raise ValueError("Vocabulary tokens must be unique.")
+        if list(self.tokens[:3]) != list(SPECIAL_TOKENS[:3]):
+            raise ValueError(f"Vocabulary must start with {SPECIAL_TOKENS[:3]}.")
+        # Older vocabularies have no <unk>; unknown words then map to <eos>,
+        # as the original `translate` did.
+        self.unk_id = self._index.get_loc("<unk>") if "<unk>" in self._index else EOS_ID
+
+    # ------------------------------------------------------------
+    # Construction and serialization
+    # ------------------------------------------------------------
+
+    @classmethod
+    def build(
+        cls,
+        sentences: Iterable[str],
+        max_size: int | None = VOCAB_MAX_SIZE,
+        min_count: int = VOCAB_MIN_COUNT,
+    ) -> "Vocab":
+        """
+        Count tokens in a single pass and keep the most frequent ones.
+
+        Args:
+            sentences: Any iterable of sentences, e.g. `chain(train, valid)`;
+                it is consumed once and never materialized.
+            max_size: Maximum number of non-special tokens (None for no cap).
+            min_count: Minimum frequency for a token to be kept.
+
+        Returns:
+            Vocabulary ordered by descending frequency, ties by first appearance.
+        """
+        counts = Counter(chain.from_iterable(map(tokenize, sentences)))
+        for token in SPECIAL_TOKENS:
+            counts.pop(token, None)
+        kept = [(t, c) for t, c in counts.most_common(max_size) if c >= min_count]
+        return cls(
+            [*SPECIAL_TOKENS, *(t for t, _ in kept)],
+            [0] * len(SPECIAL_TOKENS) + [c for _, c in kept],
+        )
+
+    @classmethod
+    def from_dict(cls, stoi: Mapping[str, int]) -> "Vocab":
+        """Wrap a legacy `{token: id}` dict, as saved in older checkpoints."""
+        tokens = sorted(stoi, key=stoi.__getitem__)
+        if [stoi[t] for t in tokens] != list(range(len(tokens))):
+            raise ValueError("Vocabulary ids must be contiguous from 0.")
+        return cls(tokens)
+
+    @classmethod
+    def from_state(cls, state: Mapping) -> "Vocab":
+        """Load from `state_dict()` output or a legacy `{token: id}` dict."""
+        if "tokens" in state and isinstance(state["tokens"], list):
+            return cls(state["tokens"], state.get("counts"))
+        return cls.from_dict(state)
+
+    def state_dict(self) -> dict[str, list]:
+        """Plain lists, safe to store in a `torch.save` checkpoint."""
+        return {"tokens": self.tokens.tolist(), "counts": self.counts.tolist()}
+
+    def save(self, path: Path) -> None:
+        """Write one `token<TAB>count` line per id."""
+        Path(path).write_text(
+            "".join(
+                f"{t}\t{c}\n" for t, c in zip(self.tokens, self.counts, strict=True)
+            ),
+            encoding="utf-8",
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "Vocab":
+        rows = [line.split("\t") for line in Path(path).read_text("utf-8").splitlines()]
+        return cls([t for t, _ in rows], [int(c) for _, c in rows])
+
+    # ------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def __contains__(self, token: str) -> bool:
+        return token in self._index
+
+    def __getitem__(self, token: str) -> int:
+        return self._index.get_loc(token) if token in self._index else self.unk_id
+
+    def lookup(self, tokens: Sequence[str]) -> np.ndarray:
+        """Ids of `tokens`, with unknown tokens mapped to `unk_id`."""
+        ids = self._index.get_indexer(np.asarray(tokens, dtype=object))
+        ids[ids < 0] = self.unk_id
+        return ids
+
+    # ------------------------------------------------------------
+    # Batch encoding and decoding
+    # ------------------------------------------------------------
+
+    def encode_flat(
+        self, sentences: Sequence[str], add_specials: bool = True
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Encode sentences into one flat int32 array.
+
+        Returns:
+            (ids, offsets): sentence `i` is `ids[offsets[i]:offsets[i + 1]]`,
+            wrapped in `<sos>` ... `<eos>` when `add_specials` is set.
+        """
+        token_lists = [tokenize(s) for s in sentences]
+        extra = 2 if add_specials else 0
+        lengths = np.fromiter(map(len, token_lists), np.int64, len(token_lists))
+        offsets = np.zeros(len(token_lists) + 1, dtype=np.int64)
+        np.cumsum(lengths + extra, out=offsets[1:])
+
+        ids = np.empty(offsets[-1], dtype=np.int32)
+        is_token = np.ones(len(ids), dtype=bool)
+        if add_specials:
+            starts, ends = offsets[:-1], offsets[1:] - 1
+            is_token[starts] = is_token[ends] = False
+            ids[starts], ids[ends] = SOS_ID, EOS_ID
+        ids[is_token] = self.lookup(list(chain.from_iterable(token_lists)))
+        return ids, offsets
+
+    def encode(self, sentence: str) -> list[int]:
+        return self.encode_flat([sentence])[0].tolist()
+
+    def encode_batch(self, sentences: Sequence[str]) -> np.ndarray:
+        """Encode sentences into a `<pad>`-padded (batch, max_len) int64 matrix."""
+        ids, offsets = self.encode_flat(sentences)
+        return pad_flat(ids, offsets)
+
+    def decode_batch(self, ids: np.ndarray, strip_specials: bool = True) -> list[str]:
+        """
+        Turn a (batch, seq_len) matrix of ids back into sentences.
+
+        Each row is cut at its first `<eos>`. With `strip_specials`, `<pad>`
+        and `<sos>` before it are dropped; otherwise they are kept as words,
+        as the notebook's `translate` did with model predictions.
+        """
+        ids = np.asarray(ids)
+        if ids.ndim == 1:
+            ids = ids[None, :]
+        is_eos = ids == EOS_ID
+        ends = np.where(is_eos.any(axis=1), is_eos.argmax(axis=1), ids.shape[1])
+        keep = np.arange(ids.shape[1]) < ends[:, None]
+        if strip_specials:
+            keep &= (ids != PAD_ID) & (ids != SOS_ID)
+        words = self.tokens[ids[keep]]
+        bounds = np.cumsum(keep.sum(axis=1))[:-1]
+        return [" ".join(row) for row in np.split(words, bounds)]
+
+    def decode(self, ids: Sequence[int]) -> str:
+        return self.decode_batch(np.asarray(ids))[0]
+
+
+def pad_flat(ids: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Scatter flat `(ids, offsets)` sequences into a `<pad>`-padded matrix."""
+    lengths = np.diff(offsets)
+    out = np.full((len(lengths), lengths.max(initial=0)), PAD_ID, dtype=np.int64)
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    cols = np.arange(len(ids)) - np.repeat(offsets[:-1], lengths)
+    out[rows, cols] = ids
+    return out
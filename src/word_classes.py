@@ -0,0 +1,215 @@
+"""
+Binary, memory-mapped word-class store for the SMT pipeline.
+Replaces parsing `word_classes.json` into a dict: one file holds a sorted
+64-bit hash index, uint16 class ids, and the words themselves.
+
+Convert an existing mapping:
+    python -m src.word_classes data/processed/word_classes.json
+"""
+
+import argparse
+import json
+import struct
+from collections.abc import Iterator, Mapping, Sequence
+from hashlib import blake2b
+from pathlib import Path
+
+import numpy as np
+
+from src.config import PROCESSED_DIR
+
+MAGIC = b"PMTWCLS1"
+HEADER = struct.Struct("<8sQQQ")  # magic, number of words, blob size, reserved
+MAX_CLASS = np.iinfo(np.uint16).max
+
+# ============================================================
+# Hashing
+# ============================================================
+
+
+def _digest(word: str) -> bytes:
+    return blake2b(word.encode("utf-8"), digest_size=8).digest()
+
+
+def hash_words(words: Sequence[str]) -> np.ndarray:
+    """Stable 64-bit hashes (BLAKE2b) of `words` as a uint64 array."""
+    return np.frombuffer(b"".join(map(_digest, words)), dtype="<u8")
+
+
+def _align(n: int) -> int:
+    return (n + 7) // 8 * 8
+
+
+# ============================================================
+# Writing
+# ============================================================
+
+
+def write_word_classes(word2class: Mapping[str, int], path: Path) -> Path:
+    """
+    Write a word-to-class mapping as a binary store.
+
+    Layout after the 32-byte header, each section 8-byte aligned:
+    `hashes` (uint64, sorted), `offsets` (uint64, n + 1) into the word blob,
+    `classes` (uint16), and the UTF-8 `blob` of all words in hash order.
+    """
+    path = Path(path)
+    words = list(word2class)
+    classes = np.fromiter(word2class.values(), dtype=np.int64, count=len(words))
+    if len(classes) and (classes.min() < 0 or classes.max() > MAX_CLASS):
+        raise ValueError(f"Class ids must be in [0, {MAX_CLASS}].")
+
+    hashes = hash_words(words)
+    order = np.argsort(hashes, kind="stable")
+    hashes = hashes[order]
+    if np.any(hashes[1:] == hashes[:-1]):
+        raise ValueError("64-bit hash collision between two words.")
+
+    encoded = [words[i].encode("utf-8") for i in order]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    blob = b"".join(encoded)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(words), len(blob), 0))
+        for array in (hashes, offsets, classes[order].astype("<u2")):
+            data = array.tobytes()
+            f.write(data + b"\0" * (_align(len(data)) - len(data)))
+        f.write(blob)
+    return path
+
+
+def convert_json(json_path: Path, output_path: Path | None = None) -> Path:
+    """Convert a `save_word_classes` JSON file; defaults to `<name>.bin`."""
+    json_path = Path(json_path)
+    output_path = Path(output_path or json_path.with_suffix(".bin"))
+    with open(json_path, encoding="utf8") as f:
+        word2class = json.load(f)
+    write_word_classes(word2class, output_path)
+    print(f"[Save] {len(word2class):,} word classes written to {output_path}")
+    return output_path
+
+
+# ============================================================
+# Reading
+# ============================================================
+
+
+class WordClassStore(Mapping):
+    """
+    Read-only, memory-mapped word-to-class mapping.
+
+    Opening the store reads only the header; lookups binary-search the
+    sorted hash index, so pages are loaded on demand and processes that open
+    the same file share one page-cached copy. It is a `Mapping`, so it can
+    stand in for the JSON dict, but `lookup` and `lookup_batch` resolve
+    whole token lists at once and are much faster than per-word indexing.
+
+    Lookups compare 64-bit hashes only; for a 1M-word store the chance that
+    an unknown word collides with a stored one is about 1e-13.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        buf = np.memmap(self.path, dtype=np.uint8, mode="r")
+        magic, n, blob_size, _ = HEADER.unpack(bytes(buf[: HEADER.size]))
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a word-class store.")
+
+        pos = HEADER.size
+        sections = {}
+        for name, dtype, count in (
+            ("hashes", "<u8", n),
+            ("offsets", "<u8", n + 1),
+            ("classes", "<u2", n),
+        ):
+            size = count * np.dtype(dtype).itemsize
+            sections[name] = buf[pos : pos + size].view(dtype)
+            pos += _align(size)
+        self._hashes = sections["hashes"]
+        self._offsets = sections["offsets"]
+        self._classes = sections["classes"]
+        self._blob = buf[pos : pos + blob_size]
+
+    def __reduce__(self):
+        # Pickle (e.g. for worker processes) by path, not by content
+        return (type(self), (self.path,))
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def __iter__(self) -> Iterator[str]:
+        blob = self._blob.tobytes()
+        offsets = self._offsets.tolist()
+        for start, end in zip(offsets[:-1], offsets[1:], strict=True):
+            yield blob[start:end].decode("utf-8")
+
+    def __getitem__(self, word: str) -> int:
+        (cls,) = self.lookup([word])
+        if cls < 0:
+            raise KeyError(word)
+        return int(cls)
+
+    def __contains__(self, word: object) -> bool:
+        return isinstance(word, str) and self.lookup([word])[0] >= 0
+
+    def lookup(self, words: Sequence[str], default: int = -1) -> np.ndarray:
+        """Class id of every word as int32, `default` for unknown words."""
+        if len(self._hashes) == 0:
+            return np.full(len(words), default, np.int32)
+        hashes = hash_words(words)
+        idx = np.searchsorted(self._hashes, hashes)
+        idx[idx == len(self._hashes)] = 0
+        found = self._hashes[idx] == hashes
+        return np.where(found, self._classes[idx].astype(np.int32), default)
+
+    def lookup_batch(
+        self, sentences: Sequence[Sequence[str]], default: int = -1
+    ) -> list[np.ndarray]:
+        """Class ids of every token of every sentence, in one flat lookup."""
+        if not len(sentences):
+            return []
+        lengths = np.fromiter(map(len, sentences), np.int64, len(sentences))
+        flat = self.lookup([w for sent in sentences for w in sent], default)
+        return np.split(flat, np.cumsum(lengths)[:-1])
+
+    def to_dict(self) -> dict[str, int]:
+        """Materialize the whole mapping as a dict."""
+        return dict(zip(self, self._classes.tolist(), strict=True))
+
+
+def open_word_classes(
+    json_path: Path = PROCESSED_DIR / "word_classes.json",
+) -> WordClassStore:
+    """
+    Memory-map the store next to `json_path` (`<name>.bin`).
+
+    The JSON is converted first if the store is missing or older than it.
+    """
+    json_path = Path(json_path)
+    store_path = json_path.with_suffix(".bin")
+    if not store_path.exists() or (
+        json_path.exists() and json_path.stat().st_mtime > store_path.stat().st_mtime
+    ):
+        convert_json(json_path, store_path)
+    return WordClassStore(store_path)
+
+
+# ============================================================
+# Command-line entry point
+# ============================================================
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "json_path", nargs="?", default=PROCESSED_DIR / "word_classes.json"
+    )
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+    convert_json(Path(args.json_path), Path(args.output) if args.output else None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""Tests for the streaming multi-corpus sampler in `src.augmentation`."""
+
+from itertools import islice
+
+from src.augmentation import interleave_corpora
+
+
+def _corpus(name: str, n: int):
+    return lambda: ((f"{name}-src-{i}", f"{name}-tgt-{i}") for i in range(n))
+
+
+def test_cycle_stops_when_primary_is_exhausted():
+    corpora = {"base": _corpus("base", 50), "aux": _corpus("aux", 5)}
+    weights = {"base": 0.5, "aux": 0.5}
+
+    # islice guards against an endless stream if primary were restarted
+    stream = interleave_corpora(
+        corpora, weights, buffer_size=8, primary="base", cycle=True
+    )
+    samples = list(islice(stream, 10_000))
+
+    base = [src for name, src, _ in samples if name == "base"]
+    assert sorted(base) == sorted(f"base-src-{i}" for i in range(50))
+    assert len(samples) < 10_000
+    # The small auxiliary corpus was restarted rather than dropped
+    assert sum(name == "aux" for name, _, _ in samples) > 5
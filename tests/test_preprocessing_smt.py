@@ -0,0 +1,38 @@
+"""Tests for the nltk-free batch tokenizer in `src.preprocessing_smt`."""
+
+import pytest
+
+from src.preprocessing_smt import tokenizer_mismatches
+
+nltk = pytest.importorskip("nltk")
+
+MIXED_LINES = [
+    "Sa sinugdan gibuhat sa Dios ang langit ug ang yuta.",
+    "En el principio creó Dios los cielos y la tierra.",
+    "¿Qué harás cuando él venga? ¡No lo sé!",
+    "Dili ako makaadto, I cannot go today.",
+    "CANNOT, Cannot; cannot... cannots, cannotcannot",
+    "We're gonna sing, wanna come? Gimme the book, lemme see.",
+    "Gotta go: sila gotta-mobiya ug gonna2 wanna's",
+    "Niños, señor, pingüino — año 2024, capítulo 3:16.",
+    "   ",
+    "",
+]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def punkt():
+    try:
+        nltk.word_tokenize("punkt check")
+    except LookupError:
+        pytest.skip("nltk Punkt data is not installed")
+
+
+def test_batch_tokenizer_matches_nltk():
+    assert tokenizer_mismatches(MIXED_LINES) == []
+
+
+def test_batch_tokenizer_matches_nltk_on_each_contraction():
+    words = ["cannot", "gimme", "gonna", "gotta", "lemme", "wanna"]
+    lines = [f"ikaw {word} ir" for word in words] + [" ".join(words)]
+    assert tokenizer_mismatches(lines) == []